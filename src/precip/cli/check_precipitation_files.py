@@ -12,7 +12,7 @@
 
 import os
 import argparse
-from precip.objects.classes.providers.jetstream import JetStream
+from precip.objects.classes.providers.session_manager import SessionManager
 from precip.objects.classes.file_manager.cloud_file_manager import CloudFileManager
 from precip.objects.classes.file_manager.local_file_manager import LocalFileManager
 from precip.objects.classes.credentials_settings.credentials import PrecipVMCredentials
@@ -26,6 +26,15 @@ Check if the downloaded files are corrupted:
 Check if the downloaded files are corrupted on cloud server:
     check_precipitation_files.py --use-ssh
 
+Check the local files decompressing the whole precipitation variable, using 16 processes:
+    check_precipitation_files.py --deep --parallel 16
+
+Check the files on the cloud server itself with 16 processes, skipping files already verified:
+    check_precipitation_files.py --use-ssh --remote --parallel 16
+
+Check the files on the cloud server itself, decompressing the whole precipitation variable:
+    check_precipitation_files.py --use-ssh --remote --deep
+
 """
 
 
@@ -49,6 +58,17 @@ def create_parser(iargs=None, namespace=None):
                         action='store_true',
                         dest='use_ssh',
                         help='Use ssh')
+    parser.add_argument('--remote',
+                        action='store_true',
+                        help='Run the verification on the cloud server (requires --use-ssh)')
+    parser.add_argument('--deep',
+                        action='store_true',
+                        help='Decompress the whole variable instead of reading the header only')
+    parser.add_argument('-p', '--parallel',
+                        type=int,
+                        default=None,
+                        help='Number of parallel checks, default is the number of CPUs of the machine running them\n'
+                             '(the cloud server with --remote)')
     parser.add_argument('-d', '--dir',
                         type=str,
                         default=PRECIP_DIR,
@@ -69,12 +89,12 @@ def check_files(inps):
         inps (argparse.Namespace): Parsed command line arguments
     """
     if inps.use_ssh:
-        jtstream = JetStream(PrecipVMCredentials())
-        CloudFileManager(jtstream).check_files()
+        jtstream = SessionManager.get_provider(PrecipVMCredentials())
+        CloudFileManager(jtstream).check_files(inps.remote, inps.parallel, 'deep' if inps.deep else 'header')
 
     else:
         local = LocalFileManager(inps.dir)
-        local.check_files()
+        local.check_files('deep' if inps.deep else 'header', inps.parallel)
 
 
 
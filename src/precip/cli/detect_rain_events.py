@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+#############################################################################
+# Data from:                                                                #
+# Huffman, G.J., E.F. Stocker, D.T. Bolvin, E.J. Nelkin, Jackson Tan (2023),#
+# GPM IMERG Final Precipitation L3 1 day 0.1 degree x 0.1 degree V07,       #
+# GPM IMERG Late Precipitation L3 1 day 0.1 degree x 0.1 degree V06,        #
+# Edited by Andrey Savtchenko, Greenbelt, MD,                               #
+# Goddard Earth Sciences Data and Information Services Center (GES DISC),   #
+# Accessed: [Data Access Date], 10.5067/GPM/IMERGDF/DAY/07                  #
+#############################################################################
+
+import os
+import argparse
+from datetime import datetime
+from precip.config import JSON_VOLCANO
+from precip.data_extraction_functions import get_site_matrix
+from precip.helper_functions import generate_date_list
+from precip.volcano_functions import eruption_catalog, get_volcanoes
+from precip.objects.classes.utils.event_detection import detect_events
+from precip.utils.argument_parsers import add_date_arguments, add_catalog_arguments, add_save_arguments
+
+PRECIP_DIR = os.getenv('PRECIP_DIR')
+
+EXAMPLE = """
+Date format: YYYYMMDD
+
+Example:
+
+Days and 30/90 days windows above the 95th percentile of each volcano of the volcano file, saved in the current folder:
+    detect_rain_events.py --windows 1 30 90
+
+Single days above the 99th percentile of two volcanoes, preceding an eruption of VEI 2 or more by 60 days at most:
+    detect_rain_events.py --ids 353060 263310 --percentile 99 --lead 60 --vei 2 --period 20100101:20201231
+"""
+
+
+def create_parser(iargs=None, namespace=None):
+    """ Creates command line argument parser object. """
+    parser = argparse.ArgumentParser(
+        description='Detect extreme precipitation events of every volcano and match them with the eruptions',
+        formatter_class=argparse.RawTextHelpFormatter,
+        epilog=EXAMPLE)
+
+    parser.add_argument('--windows',
+                        nargs='+',
+                        type=int,
+                        default=[1],
+                        metavar='DAYS',
+                        help='Rolling windows in days, 1 for single days, default is %(default)s')
+    parser.add_argument('--percentile',
+                        type=float,
+                        default=95,
+                        help='Percentile of each volcano used as threshold, default is %(default)s')
+    parser.add_argument('--lead',
+                        type=int,
+                        default=90,
+                        metavar='DAYS',
+                        help='Maximum number of days between an event and the eruption, default is %(default)s')
+
+    parser = add_date_arguments(parser)
+    parser = add_catalog_arguments(parser)
+    parser = add_save_arguments(parser)
+
+    inps = parser.parse_args(iargs, namespace)
+
+    inps.dir = PRECIP_DIR
+    inps.gpm_dir = inps.dir
+
+    if inps.period:
+        dates = inps.period.replace(',', ':').split(':')
+        inps.start_date, inps.end_date = dates[0], dates[1]
+
+    inps.start_date = datetime.strptime(inps.start_date, '%Y%m%d').date()
+    inps.end_date = datetime.strptime(inps.end_date, '%Y%m%d').date()
+    inps.date_list = generate_date_list(inps.start_date, inps.end_date)
+
+    return inps
+
+
+def load_catalog(inps):
+    """
+    Returns the site matrix of the selected volcanoes and the start dates of their eruptions.
+
+    Args:
+        inps (object): The input parameters (ids, vei, date_list, gpm_dir, use_ssh, persist_matrix).
+
+    Returns:
+        tuple: SiteMatrix and {volcano id: [eruption start dates]}.
+    """
+    volcanoes = get_volcanoes()
+
+    if inps.ids:
+        missing = set(inps.ids) - set(volcanoes)
+
+        if missing:
+            raise ValueError(f'Error: volcano id/s {sorted(missing)} not in the volcano file')
+
+        volcanoes = {id: volcanoes[id] for id in inps.ids}
+
+    catalog = eruption_catalog(os.path.join(inps.dir, JSON_VOLCANO), inps.vei)
+    matrix = get_site_matrix(inps, volcanoes, inps.persist_matrix)
+
+    return matrix, catalog
+
+
+def main(iargs=None, namespace=None):
+    inps = create_parser(iargs, namespace)
+
+    matrix, catalog = load_catalog(inps)
+    events = detect_events(matrix, catalog, inps.windows, inps.percentile, inps.lead)
+
+    print('-' * 50)
+
+    for window, group in events.groupby('Window'):
+        print(f"{window} day window: {len(group)} events at {group['Id'].nunique()} volcanoes, {group['Precedes'].sum()} within {inps.lead} days of an eruption")
+
+    os.makedirs(inps.outdir, exist_ok=True)
+    path = os.path.join(inps.outdir, f'rain_events_{inps.start_date:%Y%m%d}_{inps.end_date:%Y%m%d}.csv')
+    events.to_csv(path, index=False)
+
+    print(f"Events saved in {path}")
+
+    return events
+
+
+if __name__ == "__main__":
+    main()
@@ -13,12 +13,14 @@
 import os
 import argparse
 from datetime import datetime
-from precip.objects.classes.providers.jetstream import JetStream
+from precip.objects.classes.providers.session_manager import SessionManager
 from precip.objects.classes.file_manager.cloud_file_manager import CloudFileManager
 from precip.objects.classes.file_manager.local_file_manager import LocalFileManager
 from precip.objects.classes.credentials_settings.credentials import PrecipVMCredentials
-from precip.helper_functions import generate_date_list
+from precip.helper_functions import generate_date_list, adapt_coordinates
+from precip.download_functions import archive_missing_dates
 from precip.utils.argument_parsers import add_date_arguments
+from precip.config import OPENDAP_URL
 
 # TODO Add proper CITATION for GPM data and Volcano data
 PRECIP_DIR = os.getenv('PRECIP_DIR')
@@ -34,6 +36,9 @@ Download whole dataset in the specified directory:
 Download dataset from 2019-01-01 to 2021-09-29 in the specific directory on cloud:
     download_precipitation.py --period 20190101:20210929 --use-ssh
 
+Download only the subsets of two regions (saved in $PRECIP_DIR/regions):
+    download_precipitation.py --region 19:20,-156:-155 --region -1:0,-92:-90
+
 """
 
 
@@ -59,12 +64,18 @@ def create_parser(iargs=None, namespace=None):
     parser.add_argument('-p', '--parallel',
                         type=int,
                         default=5,
-                        help='Number of parallel downloads')
+                        help='Maximum number of parallel downloads, concurrency adapts to the server up to this value')
     parser.add_argument('-d', '--dir',
                         type=str,
                         default=PRECIP_DIR,
                         help='Specify path to download the data, default is %(default)s')
-
+    parser.add_argument('--region',
+                        action='append',
+                        metavar='LATITUDE:LATITUDE,LONGITUDE:LONGITUDE',
+                        help='Download only the server-side subset of this box, can be repeated')
+    parser.add_argument('--opendap-url',
+                        default=OPENDAP_URL,
+                        help='OPeNDAP server used for the regional subsets, default is %(default)s')
 
     parser = add_date_arguments(parser)
 
@@ -86,23 +97,43 @@ def create_parser(iargs=None, namespace=None):
         inps.start_date = datetime.strptime(dates[0], '%Y%m%d').date()
         inps.end_date = datetime.strptime(dates[1], '%Y%m%d').date()
 
+    if inps.region:
+        regions = []
+
+        for region in inps.region:
+            latitude, longitude = (bounds.split(':') for bounds in region.split(','))
+            regions.append(adapt_coordinates(latitude, longitude))
+
+        inps.region = regions
+
     return inps
 
 
-def download_precipitation(use_ssh, date_list, dir, parallel=5):
+def download_precipitation(use_ssh, date_list, dir, parallel=5, on_complete=None, backfill=False, regions=None, opendap_url=OPENDAP_URL):
     """Downloads precipitation data based on the provided command line arguments.
 
     Args:
-        inps (argparse.Namespace): Parsed command line arguments.
+        use_ssh (bool): Download on the cloud server instead of locally.
+        date_list (list): The dates to download.
+        dir (str): The local download folder.
+        parallel (int): Maximum number of parallel downloads.
+        on_complete (callable): Local only, called with each file of `date_list` as soon as it is available.
+        backfill (bool): Local only, keep downloading the rest of the archive in the background at lower priority.
+        regions (list): Local only, (latitude, longitude) boxes to download as server-side subsets instead of the global files.
+        opendap_url (str): OPeNDAP server used for the regional subsets.
     """
 
-    if use_ssh:
-        jtstream = JetStream(PrecipVMCredentials())
+    if regions:
+        LocalFileManager(dir).download_regions(date_list, regions, parallel, opendap_url)
+
+    elif use_ssh:
+        jtstream = SessionManager.get_provider(PrecipVMCredentials())
         CloudFileManager(jtstream).download(date_list, parallel)
 
     else:
         local = LocalFileManager(dir)
-        local.download(date_list, parallel)
+        backfill_dates = archive_missing_dates(dir) if backfill else None
+        local.download(date_list, parallel, on_complete, backfill_dates)
 
 
 
@@ -123,7 +154,7 @@ def main(iargs=None, namespace=None, date_list=None):
     else:
         date_list = date_list
 
-    download_precipitation(inps.use_ssh, date_list, inps.dir, inps.parallel)
+    download_precipitation(inps.use_ssh, date_list, inps.dir, inps.parallel, regions=inps.region, opendap_url=inps.opendap_url)
 
 
 if __name__ == "__main__":
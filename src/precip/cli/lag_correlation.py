@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+#############################################################################
+# Data from:                                                                #
+# Huffman, G.J., E.F. Stocker, D.T. Bolvin, E.J. Nelkin, Jackson Tan (2023),#
+# GPM IMERG Final Precipitation L3 1 day 0.1 degree x 0.1 degree V07,       #
+# GPM IMERG Late Precipitation L3 1 day 0.1 degree x 0.1 degree V06,        #
+# Edited by Andrey Savtchenko, Greenbelt, MD,                               #
+# Goddard Earth Sciences Data and Information Services Center (GES DISC),   #
+# Accessed: [Data Access Date], 10.5067/GPM/IMERGDF/DAY/07                  #
+#############################################################################
+
+import os
+import argparse
+import numpy as np
+from datetime import datetime
+from precip.cli.detect_rain_events import load_catalog
+from precip.helper_functions import generate_date_list
+from precip.objects.classes.utils.lag_correlation import lag_correlation
+from precip.utils.argument_parsers import add_date_arguments, add_catalog_arguments
+
+PRECIP_DIR = os.getenv('PRECIP_DIR')
+
+EXAMPLE = """
+Date format: YYYYMMDD
+
+Example:
+
+Correlation of the daily precipitation of every volcano of the volcano file with its eruptions, lags up to 365 days:
+    lag_correlation.py
+
+90 days rolling precipitation, lags up to 180 days, 2000 surrogates, eruptions of VEI 2 or more:
+    lag_correlation.py --roll 90 --max-lag 180 --surrogates 2000 --vei 2
+
+Two volcanoes only, saved in a specific folder:
+    lag_correlation.py --ids 353060 263310 --outdir /path/to/dir
+"""
+
+
+def create_parser(iargs=None, namespace=None):
+    """ Creates command line argument parser object. """
+    parser = argparse.ArgumentParser(
+        description='Lagged correlation between the precipitation and the eruption onsets of every volcano',
+        formatter_class=argparse.RawTextHelpFormatter,
+        epilog=EXAMPLE)
+
+    parser.add_argument('--max-lag',
+                        type=int,
+                        default=365,
+                        metavar='DAYS',
+                        help='Largest lag in days, default is %(default)s')
+    parser.add_argument('--roll',
+                        type=int,
+                        default=1,
+                        metavar='DAYS',
+                        help='Rolling sum of the precipitation in days, default is %(default)s')
+    parser.add_argument('--surrogates',
+                        type=int,
+                        default=500,
+                        help='Number of shifted eruption series of the significance test, default is %(default)s')
+    parser.add_argument('--seed',
+                        type=int,
+                        help='Seed of the surrogates')
+    parser.add_argument('--alpha',
+                        type=float,
+                        default=0.05,
+                        help='Significance level of the report, default is %(default)s')
+    parser.add_argument('--outdir',
+                        type=str,
+                        default=os.getcwd(),
+                        metavar='PATH',
+                        help='Folder of the results, default is %(default)s')
+
+    parser = add_date_arguments(parser)
+    parser = add_catalog_arguments(parser)
+
+    inps = parser.parse_args(iargs, namespace)
+
+    inps.dir = PRECIP_DIR
+    inps.gpm_dir = inps.dir
+
+    if inps.period:
+        dates = inps.period.replace(',', ':').split(':')
+        inps.start_date, inps.end_date = dates[0], dates[1]
+
+    inps.start_date = datetime.strptime(inps.start_date, '%Y%m%d').date()
+    inps.end_date = datetime.strptime(inps.end_date, '%Y%m%d').date()
+    inps.date_list = generate_date_list(inps.start_date, inps.end_date)
+
+    return inps
+
+
+def main(iargs=None, namespace=None):
+    inps = create_parser(iargs, namespace)
+
+    matrix, catalog = load_catalog(inps)
+    summary, lags, correlation, p_value = lag_correlation(matrix, catalog, inps.max_lag, inps.roll, inps.surrogates, inps.seed)
+
+    significant = summary[summary['Global p-value'] < inps.alpha]
+
+    print('-' * 50)
+    print(f"{len(summary)} volcanoes with eruptions, {len(significant)} with a significant peak (global p-value < {inps.alpha})")
+
+    for _, row in significant.sort_values('Global p-value').iterrows():
+        print(f"{row['Volcano']} (id: {row['Id']}): correlation {row['Peak correlation']:.3f} at lag {row['Peak lag']} days, p-value {row['Global p-value']:.4f}")
+
+    os.makedirs(inps.outdir, exist_ok=True)
+    name = f'lag_correlation_roll_{inps.roll}_{inps.start_date:%Y%m%d}_{inps.end_date:%Y%m%d}'
+
+    summary.to_csv(os.path.join(inps.outdir, name + '.csv'), index=False)
+    np.savez(os.path.join(inps.outdir, name + '.npz'), ids=summary['Id'].to_numpy(), lags=lags, correlation=correlation, p_value=p_value)
+
+    print(f"Results saved in {os.path.join(inps.outdir, name)}.csv/.npz")
+
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -18,7 +18,7 @@ from precip.objects.classes.configuration import PlotConfiguration
 from precip.objects.classes.plotters.plotters import MapPlotter, BarPlotter, AnnualPlotter
 from matplotlib import pyplot as plt
 from matplotlib import gridspec
-from precip.data_extraction_functions import get_precipitation_data
+from precip.data_extraction_functions import get_precipitation_data, get_precipitation_map, get_climatology
 from precip.utils.argument_parsers import add_plot_parameters_arguments, add_date_arguments, add_location_arguments, add_save_arguments, add_map_parameters_arguments
 from precip.config import END_DATE,START_DATE
 
@@ -50,6 +50,9 @@ Plot map style of volcano with 3 levels (default is 1) of BLACK isolines (defaul
 Plot map style of Volcano with precipitation values between -3 and 3, and interpolate:
     plot_precipitation.py --id 353060 --style map --vlim -3 3 --interpolate 3
 
+Plot bar style of the standardized anomaly from the monthly climatology of 2001-2020 (default reference period):
+    plot_precipitation.py --id 353060 --style bar --anomaly standardized --baseline month
+
 """
 
 
@@ -87,6 +90,12 @@ def create_parser(iargs=None, namespace=None):
                         action='store_true',
                         dest='use_ssh',
                         help='Use ssh')
+    parser.add_argument('--backfill',
+                        action='store_true',
+                        help='After the missing dates of the query, keep downloading the rest of the archive in the background')
+    parser.add_argument('--erddap',
+                        action='store_true',
+                        help='Read the missing dates from the ERDDAP dataset instead of downloading the GPM files')
 
     parser = add_location_arguments(parser)
     parser = add_date_arguments(parser)
@@ -163,6 +172,10 @@ def create_parser(iargs=None, namespace=None):
         inps.average = 'D'
 
     elif inps.style == 'map':
+        # The map is reduced over the whole period (total or daily mean), there is no series to average
+        if inps.average:
+            parser.error("--average cannot be used with --style map, use --cumulate for the total of the period")
+
         inps.add_event = None
 
     if inps.add_event:
@@ -303,7 +316,23 @@ def main(iargs=None, namespace=None, main_gs=None, fig=None):
     os.makedirs(PRECIP_DIR, exist_ok=True)
 
     input_config = PlotConfiguration(inps)
-    precipitation = get_precipitation_data(input_config)
+
+    if inps.style == 'map':
+        # Streamed, the daily grids of the period are never held together
+        precipitation = get_precipitation_map(input_config, inps.persist_map)
+
+    else:
+        precipitation = get_precipitation_data(input_config)
+
+    if inps.anomaly:
+        climatology = get_climatology(input_config, inps.reference_period)
+        standardized = inps.anomaly == 'standardized'
+
+        if inps.style == 'map':
+            precipitation = climatology.anomaly_map(precipitation, input_config.date_list, inps.cumulate, inps.baseline, standardized)
+
+        else:
+            precipitation = climatology.anomaly(precipitation, inps.baseline, standardized)
 
     if main_gs is None:
         fig = plt.figure(constrained_layout=True)
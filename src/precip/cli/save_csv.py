@@ -211,7 +211,7 @@ def main(iargs=None, namespace=None):
 
     inps.latitude, inps.longitude = adapt_coordinates(inps.latitude, inps.longitude)
 
-    precipitation = get_precipitation_data(inps)
+    precipitation = get_precipitation_data(inps).to_frame()
 
     if name:
         name = name.replace(',', '').replace(' ', '')
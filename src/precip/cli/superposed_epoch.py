@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+#############################################################################
+# Data from:                                                                #
+# Huffman, G.J., E.F. Stocker, D.T. Bolvin, E.J. Nelkin, Jackson Tan (2023),#
+# GPM IMERG Final Precipitation L3 1 day 0.1 degree x 0.1 degree V07,       #
+# GPM IMERG Late Precipitation L3 1 day 0.1 degree x 0.1 degree V06,        #
+# Edited by Andrey Savtchenko, Greenbelt, MD,                               #
+# Goddard Earth Sciences Data and Information Services Center (GES DISC),   #
+# Accessed: [Data Access Date], 10.5067/GPM/IMERGDF/DAY/07                  #
+#############################################################################
+
+import os
+import argparse
+from datetime import datetime
+from matplotlib import pyplot as plt
+from matplotlib import gridspec
+from precip.cli.detect_rain_events import load_catalog
+from precip.helper_functions import generate_date_list
+from precip.objects.classes.plotters.plotters import EpochPlotter
+from precip.objects.classes.utils.superposed_epoch import superposed_epoch
+from precip.utils.argument_parsers import add_date_arguments, add_catalog_arguments
+
+PRECIP_DIR = os.getenv('PRECIP_DIR')
+
+EXAMPLE = """
+Date format: YYYYMMDD
+
+Example:
+
+Standardized precipitation anomaly 90 days before to 30 days after every eruption of the volcano file:
+    superposed_epoch.py
+
+Daily precipitation 180 days before the eruptions of VEI 2 or more, smoothed over 7 days, saved in the current folder:
+    superposed_epoch.py --anomaly none --before 180 --after 0 --vei 2 --roll 7 --save
+
+Absolute anomaly of two volcanoes with 5000 bootstrap resamples and 90% bands:
+    superposed_epoch.py --ids 353060 263310 --anomaly absolute --samples 5000 --confidence 0.9
+"""
+
+
+def create_parser(iargs=None, namespace=None):
+    """ Creates command line argument parser object. """
+    parser = argparse.ArgumentParser(
+        description='Superposed epoch analysis of the precipitation around the eruptions of the catalog',
+        formatter_class=argparse.RawTextHelpFormatter,
+        epilog=EXAMPLE)
+
+    parser.add_argument('--before',
+                        type=int,
+                        default=90,
+                        metavar='DAYS',
+                        help='Days before the eruptions, default is %(default)s')
+    parser.add_argument('--after',
+                        type=int,
+                        default=30,
+                        metavar='DAYS',
+                        help='Days after the eruptions, default is %(default)s')
+    parser.add_argument('--anomaly',
+                        choices=['none', 'absolute', 'standardized'],
+                        default='standardized',
+                        help='Departure of each volcano from its own day-of-year climatology, default is %(default)s')
+    parser.add_argument('--samples',
+                        type=int,
+                        default=1000,
+                        help='Number of bootstrap resamples, default is %(default)s')
+    parser.add_argument('--confidence',
+                        type=float,
+                        default=0.95,
+                        help='Confidence level of the bands, default is %(default)s')
+    parser.add_argument('--seed',
+                        type=int,
+                        help='Seed of the bootstrap resampling')
+    parser.add_argument('--roll',
+                        type=int,
+                        default=1,
+                        metavar='DAYS',
+                        help='Centered moving average of the plotted composite, default is %(default)s')
+    parser.add_argument('--save',
+                        action='store_true',
+                        help='Save the plot')
+    parser.add_argument('--outdir',
+                        type=str,
+                        default=os.getcwd(),
+                        metavar='PATH',
+                        help='Folder of the composite table and of the plot, default is %(default)s')
+    parser.add_argument('--no-show',
+                        dest='show_flag',
+                        action='store_false',
+                        default=True,
+                        help='Do not show the plot')
+
+    parser = add_date_arguments(parser)
+    parser = add_catalog_arguments(parser)
+
+    inps = parser.parse_args(iargs, namespace)
+
+    inps.dir = PRECIP_DIR
+    inps.gpm_dir = inps.dir
+
+    if inps.period:
+        dates = inps.period.replace(',', ':').split(':')
+        inps.start_date, inps.end_date = dates[0], dates[1]
+
+    inps.start_date = datetime.strptime(inps.start_date, '%Y%m%d').date()
+    inps.end_date = datetime.strptime(inps.end_date, '%Y%m%d').date()
+    inps.date_list = generate_date_list(inps.start_date, inps.end_date)
+
+    return inps
+
+
+def main(iargs=None, namespace=None, main_gs=None, fig=None):
+    inps = create_parser(iargs, namespace)
+
+    matrix, catalog = load_catalog(inps)
+
+    if inps.anomaly != 'none':
+        matrix = matrix.anomaly(standardized=inps.anomaly == 'standardized')
+
+    composite, summary = superposed_epoch(matrix, catalog, inps.before, inps.after, inps.samples, inps.confidence, inps.seed)
+
+    print('-' * 50)
+    print(f"{summary['eruptions']} eruptions of {summary['volcanoes']} volcanoes, {summary['count']} with data")
+    print(f"Mean of the {summary['days']} days before the eruptions: {summary['mean']:.3f} "
+          f"({inps.confidence:.0%} interval {summary['lower']:.3f} to {summary['upper']:.3f})")
+
+    os.makedirs(inps.outdir, exist_ok=True)
+    name = f'superposed_epoch_{inps.anomaly}_{inps.start_date:%Y%m%d}_{inps.end_date:%Y%m%d}'
+    composite.to_csv(os.path.join(inps.outdir, name + '.csv'), index=False)
+
+    units = {'none': 'Daily precipitation\n(mm)', 'absolute': 'Daily precipitation\nanomaly (mm)', 'standardized': 'Standardized\nprecipitation anomaly'}
+    inps.labels = {'title': f"{summary['eruptions']} eruptions, {summary['volcanoes']} volcanoes", 'ylabel': units[inps.anomaly]}
+    inps.save_path = os.path.join(inps.outdir, name + '.png')
+
+    if main_gs is None:
+        fig = plt.figure(constrained_layout=True)
+        main_gs = gridspec.GridSpec(1, 1, figure=fig)[0]
+
+    EpochPlotter(fig, main_gs, inps).plot(composite)
+
+    return fig
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+#############################################################################
+# Data from:                                                                #
+# Huffman, G.J., E.F. Stocker, D.T. Bolvin, E.J. Nelkin, Jackson Tan (2023),#
+# GPM IMERG Final Precipitation L3 1 day 0.1 degree x 0.1 degree V07,       #
+# GPM IMERG Late Precipitation L3 1 day 0.1 degree x 0.1 degree V06,        #
+# Edited by Andrey Savtchenko, Greenbelt, MD,                               #
+# Goddard Earth Sciences Data and Information Services Center (GES DISC),   #
+# Accessed: [Data Access Date], 10.5067/GPM/IMERGDF/DAY/07                  #
+#############################################################################
+
+import os
+import argparse
+from datetime import datetime
+from dateutil.relativedelta import relativedelta
+from precip.objects.classes.file_manager.download_scheduler import DownloadScheduler
+from precip.objects.classes.file_manager.http_downloader import EarthdataSession
+from precip.objects.classes.utils.verification_ledger import VerificationLedger
+from precip.download_functions import generate_urls_list, local_catalog, latest_final_date
+from precip.data_extraction_functions import reextract_dates
+from precip.helper_functions import generate_date_list
+from precip.config import START_DATE, VERIFICATION_LEDGER
+
+PRECIP_DIR = os.getenv('PRECIP_DIR')
+EXAMPLE = f"""
+Bring the local archive in $PRECIP_DIR ({os.getenv('PRECIP_DIR')}) up to date, replacing Late run files with Final run ones when published:
+    sync_precipitation.py
+
+Sync the archive in a specific directory with 10 parallel downloads:
+    sync_precipitation.py --dir /path/to/directory --parallel 10
+
+Only download the new days, without upgrading the Late run files:
+    sync_precipitation.py --no-upgrade
+
+"""
+
+
+def create_parser(iargs=None, namespace=None):
+    """Creates command line argument parser object.
+
+    Args:
+        iargs (list): List of command line arguments (default: None).
+        namespace (argparse.Namespace): Namespace object to store parsed arguments (default: None).
+
+    Returns:
+        argparse.Namespace: Parsed command line arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description='Incrementally sync the local GPM archive, upgrading Late run days to Final run',
+        formatter_class=argparse.RawTextHelpFormatter,
+        epilog=EXAMPLE)
+
+    parser.add_argument('-p', '--parallel',
+                        type=int,
+                        default=5,
+                        help='Maximum number of parallel downloads, default is %(default)s')
+    parser.add_argument('-d', '--dir',
+                        type=str,
+                        default=PRECIP_DIR,
+                        help='Path of the local archive, default is %(default)s')
+    parser.add_argument('--start-date',
+                        default=START_DATE,
+                        metavar='YYYYMMDD',
+                        help='First day of the archive when it is empty, default is %(default)s')
+    parser.add_argument('--no-upgrade',
+                        dest='upgrade',
+                        action='store_false',
+                        help='Do not replace Late run files with Final run ones')
+
+    inps = parser.parse_args(iargs, namespace)
+
+    inps.start_date = datetime.strptime(inps.start_date, '%Y%m%d').date()
+
+    return inps
+
+
+def sync_precipitation(folder, start_date, parallel=5, upgrade=True):
+    """
+    Downloads the days newer than the local archive and upgrades Late run days whose Final run is out.
+
+    Args:
+        folder (str): Path of the local archive.
+        start_date (datetime.date): First day to download if the archive is empty.
+        parallel (int): Maximum number of parallel downloads.
+        upgrade (bool): Replace the Late run files with Final run ones when available.
+
+    Returns:
+        list: The dates upgraded from Late to Final run.
+    """
+    catalog = local_catalog(folder)
+
+    for run in ['final', 'late']:
+        newest = max(catalog[run]) if catalog[run] else None
+        print(f"Newest {run} run day in {folder}: {newest}")
+
+    known = set(catalog['final']) | set(catalog['late'])
+    first_new = max(known) + relativedelta(days=1) if known else start_date
+    yesterday = datetime.today().date() - relativedelta(days=1)
+
+    new_days = list(generate_date_list(first_new, yesterday)) if first_new <= yesterday else []
+    late_days = sorted(set(catalog['late']) - set(catalog['final'])) if upgrade else []
+
+    # One authenticated session for all the availability probes
+    latest_final = latest_final_date(late_days + new_days, EarthdataSession()) if late_days + new_days else None
+    print(f"Final run available up to: {latest_final}")
+
+    final_days = [d for d in new_days if latest_final and d <= latest_final]
+    late_new_days = [d for d in new_days if not latest_final or d > latest_final]
+    upgrade_days = [d for d in late_days if latest_final and d <= latest_final]
+
+    print(f"New days: {len(new_days)} ({len(final_days)} final, {len(late_new_days)} late), Late days to upgrade: {len(upgrade_days)}")
+
+    urls = generate_urls_list(final_days + upgrade_days, run='final') + generate_urls_list(late_new_days, run='late')
+
+    if urls:
+        # Files are validated as they land, later checks skip them
+        ledger = VerificationLedger(os.path.join(folder, VERIFICATION_LEDGER)).load()
+        DownloadScheduler(folder, max_parallel=parallel, ledger=ledger).download(urls)
+
+    # Drop the Late files now superseded by a Final one
+    catalog = local_catalog(folder)
+    upgraded = []
+
+    for day in upgrade_days:
+        if day in catalog['final'] and day in catalog['late']:
+            os.remove(catalog['late'][day])
+            upgraded.append(day)
+
+    print(f"Upgraded {len(upgraded)} days from Late to Final run")
+
+    # Only the upgraded dates of the locations already stored need to be extracted again
+    reextract_dates(folder, upgraded)
+
+    return upgraded
+
+
+def main(iargs=None, namespace=None):
+    """Main function to execute the script.
+
+    Args:
+        iargs (list): List of command line arguments (default: None).
+        namespace (argparse.Namespace): Namespace object to store parsed arguments (default: None).
+    """
+    inps = create_parser(iargs, namespace)
+
+    os.makedirs(inps.dir, exist_ok=True)
+
+    sync_precipitation(inps.dir, inps.start_date, inps.parallel, inps.upgrade)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,34 @@ JSON_VOLCANO = 'volcanoes.json'
 DATABASE = 'volcanoes.db'
 RELIABLE_VERSION = 7
 
+# Local cache for granules fetched from the cloud provider
+CACHE_FOLDER = 'granule_cache'
+CACHE_MAX_SIZE = 20 * 1024 ** 3  # 20GB
+
+# Ledger of the integrity checks, stored in the data folder
+VERIFICATION_LEDGER = 'verification_ledger.json'
+
+# OPeNDAP server for the regional subsets, any server exposing the same paths can be used
+OPENDAP_URL = 'https://gpm1.gesdisc.eosdis.nasa.gov/opendap/GPM_L3/'
+# Regional subsets are stored in <data folder>/regions/<lat_min>_<lat_max>_<lon_min>_<lon_max>
+SUBSET_FOLDER = 'regions'
+
+# ERDDAP griddap dataset of the IMERG daily precipitation, serves a point timeseries in one request
+ERDDAP_URL = 'https://apdrc.soest.hawaii.edu/erddap/griddap/hawaii_soest_85a4_81b2_7f69'
+ERDDAP_VARIABLE = 'prec'
+ERDDAP_CACHE = 'erddap_cache'
+
+# Yearly map accumulators, stored in <data folder>/map_accumulators/<lat_min>_<lat_max>_<lon_min>_<lon_max>
+MAP_ACCUMULATORS = 'map_accumulators'
+
+# Baselines of the anomalies, stored in <data folder>/climatology, the day-of-year baseline is pooled over CLIMATOLOGY_WINDOW days
+CLIMATOLOGY_FOLDER = 'climatology'
+CLIMATOLOGY_PERIOD = '20010101:20201231'
+CLIMATOLOGY_WINDOW = 31
+
+# Area averaged series of the catalog, stored in <data folder>/site_matrix
+SITE_MATRIX = 'site_matrix'
+
 #End Date may vary, check on https://disc.gsfc.nasa.gov/datasets?keywords=%22IMERG%20Late%22&page=1
 if True:
     END_DATE ='20240430' 
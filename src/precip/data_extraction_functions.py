@@ -1,18 +1,38 @@
 from precip.objects.classes.Queries.queries import Queries
 from precip.objects.classes.database.database import Database
 from precip.objects.classes.providers.jetstream import JetStream
+from precip.objects.classes.providers.session_manager import SessionManager
+from precip.objects.classes.utils.granule_cache import GranuleCache
+from precip.objects.classes.utils.precip_cube import PrecipCube, grid_axes
+from precip.objects.classes.utils.map_accumulator import MapAccumulator
+from precip.objects.classes.utils.climatology import Climatology, BaselineAccumulator
+from precip.objects.classes.utils.site_matrix import SiteMatrix
 from precip.objects.classes.database.sqlite3_database import SQLite3Database
 from precip.objects.classes.data_extractor.local_nc4_data import LocalNC4Data
 from precip.objects.classes.data_extractor.cloud_nc4_data import CloudNC4Data
 from precip.objects.classes.data_extractor.nc4_datasource import NC4DataSource
+from precip.objects.classes.data_extractor.erddap_datasource import ERDDAPDataSource
 from precip.objects.classes.file_manager.cloud_file_manager import CloudFileManager
 from precip.objects.classes.credentials_settings.credentials import PrecipVMCredentials
 from precip.objects.classes.database.cloud_sqlite3_database import CloudSQLite3Database
 from precip.objects.classes.database_operations.sqlite3_operations import SQLite3Operations
 from precip.objects.classes.database_operations.cloud_sqlite3_operations import CloudSQLite3Operations
 from precip.cli.download_precipitation import download_precipitation
-from precip.helper_functions import check_missing_dates, str_to_masked_array
-from precip.config import RELIABLE_VERSION
+from precip.helper_functions import check_missing_dates, str_to_masked_array, generate_coordinate_array, check_dates_downloaded, generate_date_list, adapt_coordinates
+from precip.config import RELIABLE_VERSION, MAP_ACCUMULATORS, CLIMATOLOGY_FOLDER, CLIMATOLOGY_PERIOD, CLIMATOLOGY_WINDOW, SITE_MATRIX
+import numpy as np
+import calendar
+import copy
+import glob
+import hashlib
+import concurrent.futures
+import contextlib
+import functools
+import threading
+import asyncio
+import json
+import os
+import re
 
 # TODO for profiling
 import time
@@ -60,6 +80,7 @@ def setup_database(inps):
     inps (object): An object containing input parameters, including:
         - use_ssh (bool): Indicates whether to use SSH for connection.
         - gpm_dir (str): Directory for local GPM data if SSH is not used.
+        - erddap (bool): Read the missing dates from the ERDDAP dataset instead of the GPM files.
 
     Returns:
     tuple: A tuple containing:
@@ -68,70 +89,572 @@ def setup_database(inps):
         - nc4_source: The data source for NC4 data.
     """
     if inps.use_ssh:
-        jtstream = JetStream(PrecipVMCredentials())
-        jtstream.connect()
-        jtstream.open_sftp()
+        jtstream = SessionManager.get_provider(PrecipVMCredentials())
         file_manager = CloudFileManager(jtstream)
         database = CloudSQLite3Database(file_manager)
         database.connect()
         db_ops = CloudSQLite3Operations(database)
-        nc4_source = NC4DataSource(CloudNC4Data(jtstream))
+        nc4_source = NC4DataSource(CloudNC4Data(jtstream, GranuleCache()))
     else:
         database = SQLite3Database()
         database.connect()
         db_ops = SQLite3Operations(database)
-        nc4_source = NC4DataSource(LocalNC4Data(inps.gpm_dir))
+
+        if getattr(inps, 'erddap', False):
+            nc4_source = ERDDAPDataSource()
+        else:
+            nc4_source = NC4DataSource(LocalNC4Data(inps.gpm_dir))
     return database, db_ops, nc4_source
 
 
-def extract_precipitation_data(db_ops, nc4_source, database, inps):
+def extract_precipitation_data(db_ops, nc4_source, database, inps, executor=None):
+    fill_missing_dates(db_ops, nc4_source, database, inps, executor)
+
+    return select_precipitation(db_ops, inps)
+
+
+def select_precipitation(db_ops, inps):
+    """
+    Returns the Date, Precipitation and Version rows of the box over `inps.date_list`, one row per date.
+    """
+    db = Database(db_ops)
+    results = db.get_data(Queries.extract_precipitation(inps.latitude, inps.longitude, inps.date_list))
+    # RELIABLE_VERSION first, then the highest version; rows of the same version keep the database order
+    results['Reliable'] = results['Version'] == RELIABLE_VERSION
+    results = results.sort_values(by=['Date', 'Reliable', 'Version'], ascending=[True, False, False], kind='stable')
+    results = results.drop_duplicates(subset='Date', keep='first').drop(columns='Reliable')
+
+    return results
+
+
+def fill_missing_dates(db_ops, nc4_source, database, inps, executor=None):
+    """
+    Extracts and stores the dates of `inps.date_list` missing from the database, only dates are read from it.
+
+    `executor` is an extraction process pool to reuse (see extraction_pipeline), one is created if None.
+    """
     db = Database(db_ops)
     db_ops.check_table()
 
+    missing_dates = find_missing_dates(db, database, inps)
+
+    if not missing_dates:
+        return
+
+    print("Start file extraction at:", datetime.fromtimestamp(time.time()))
+
+    # asyncio.run cannot start inside a running loop (e.g. Jupyter), and the sqlite connection is bound to this
+    # thread, so the pipeline is only used outside of one and the sequential extraction is kept otherwise
+    if not inps.use_ssh and isinstance(nc4_source, NC4DataSource) and not event_loop_running():
+        asyncio.run(extraction_pipeline(nc4_source, db_ops, inps, missing_dates, executor=executor))
+
+    else:
+        try:
+            data = nc4_source.get_data(inps.latitude, inps.longitude, missing_dates)
+        except ValueError as e:
+            print(e.args[0])
+            download_precipitation(inps.use_ssh, e.args[1], inps.gpm_dir)
+            data = nc4_source.get_data(inps.latitude, inps.longitude, missing_dates)
+
+        db.load_data(inps.latitude, inps.longitude, data)
+
+
+def find_missing_dates(db, database, inps):
+    """
+    Returns the dates of `inps.date_list` missing from the database, the duplicated dates are removed first.
+    """
     start_time = time.time()
     print("-" * 50)
     print(f"Start db extraction at: {datetime.fromtimestamp(start_time)}\n")
 
-    precipitation = db.get_data(Queries.extract_precipitation(inps.latitude, inps.longitude, inps.date_list))
+    dates = db.get_data(Queries.extract_dates(inps.latitude, inps.longitude, inps.date_list))
 
     print(f"Elapsed time database extraction: {time.time() - start_time}\n")
     print("-" * 50)
 
-    remove_duplicates(precipitation, database, inps)
+    dates = remove_duplicates(dates, database, inps)
 
-    missing_dates = check_missing_dates(inps.date_list, precipitation['Date'])
+    return check_missing_dates(inps.date_list, dates['Date'])
 
-    if not missing_dates:
-        return precipitation
+
+def fill_sites_missing_dates(db_ops, nc4_source, database, sites, executor):
+    """
+    Extracts and stores the dates missing from the database of several boxes in a single pass over the files.
+
+    Each file of a date missing for any box is opened once in the extraction pool, and sliced for every
+    box missing that date. An unreadable file is reported and skipped.
+
+    Args:
+        db_ops (SQLite3Operations): The database operations.
+        nc4_source (NC4DataSource): The local data source.
+        database: The database connection.
+        sites (list): The input parameters of each box (latitude, longitude, date_list, gpm_dir, use_ssh).
+        executor (ProcessPoolExecutor): Pool created by extraction_pool.
+    """
+    db = Database(db_ops)
+    db_ops.check_table()
+
+    missing = [set(find_missing_dates(db, database, site)) for site in sites]
+    dates = sorted(set().union(*missing))
+
+    if not dates:
+        return
+
+    extractor = nc4_source.data_extracted
+    extractor.list_files()
+    extractor.check_duplicates()
 
     try:
-        print("Start file extraction at:", datetime.fromtimestamp(time.time()))
-        data = nc4_source.get_data(inps.latitude, inps.longitude, missing_dates)
+        files = check_dates_downloaded(dates, extractor.files)
+    except ValueError as e:
+        print(e.args[0])
+        download_precipitation(sites[0].use_ssh, e.args[1], sites[0].gpm_dir)
+        extractor.list_files()
+        extractor.check_duplicates()
+        files = check_dates_downloaded(dates, extractor.files)
+
+    print(f"Extracting {len(files)} files for {len(sites)} sites ...")
+
+    futures = {}
+
+    for file in files:
+        index = [i for i, site_dates in enumerate(missing) if file_date(file) in site_dates]
+        boxes = [(sites[i].longitude, sites[i].latitude) for i in index]
+        futures[executor.submit(extract_file_boxes, file, boxes)] = (file, index)
+
+    rows = [[] for _ in sites]
+
+    for future in concurrent.futures.as_completed(futures):
+        file, index = futures[future]
+
+        try:
+            result = future.result()
+
+        except concurrent.futures.process.BrokenProcessPool:
+            raise
+
+        except Exception as e:
+            # netCDF4 raises OSError on unreadable files, a single file must not stop the extraction
+            print(f"Skipping {file}: {e}")
+            continue
+
+        for i, row in zip(index, result or []):
+            rows[i].append((row[0], json.dumps(row[1].tolist()), row[2]))
+
+    for site, batch in zip(sites, rows):
+        if batch:
+            db_ops.insert_many(site.latitude, site.longitude, batch)
+
+    print(f"Inserted {sum(len(batch) for batch in rows)} values in Database\n")
+
+
+def event_loop_running():
+    """ Returns True if called from a thread with a running event loop. """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+
+    return True
+
+
+async def extraction_pipeline(nc4_source, db_ops, inps, missing_dates, workers=None, batch_size=256, executor=None):
+    """
+    Downloads, extracts and stores the missing dates as overlapping stages instead of one after the other.
+
+    Files already on disk and files landing from the download feed a bounded queue read by extraction
+    workers running in a process pool, whose rows feed a bounded queue read by a writer inserting them
+    in batches. A full queue stalls the stage before it (the download threads included), so memory stays
+    flat and the wall time follows the slowest stage.
+
+    A file that cannot be read is reported and skipped. A failure of the writer or of the process pool
+    stops the other stages, the download included, and is raised.
+
+    If `inps.backfill` is set, the rest of the archive keeps downloading in the background at lower priority.
+
+    Args:
+        nc4_source (NC4DataSource): The local data source.
+        db_ops (SQLite3Operations): The database operations, used from the event loop thread only.
+        inps (object): The input parameters (latitude, longitude, gpm_dir, backfill).
+        missing_dates (list): The dates missing from the database.
+        workers (int): Number of extraction processes, defaults to the number of CPUs.
+        batch_size (int): Maximum number of rows per insert.
+        executor (ProcessPoolExecutor): Pool initialized with init_extract_worker, shared by successive
+                                        calls (default: None, a pool is created for this call).
+
+    Returns:
+        int: The number of rows inserted.
+    """
+    loop = asyncio.get_running_loop()
+    workers = workers or os.cpu_count()
+    stopped = threading.Event()
+    files = asyncio.Queue(maxsize=2 * workers)
+    rows = asyncio.Queue(maxsize=batch_size)
+
+    extractor = nc4_source.data_extracted
+    extractor.list_files()
+    extractor.check_duplicates()
+
+    try:
+        available = check_dates_downloaded(missing_dates, extractor.files)
+        missing_files = []
     except ValueError as e:
         print(e.args[0])
         missing_files = e.args[1]
-        download_precipitation(inps.use_ssh, missing_files, inps.gpm_dir)
-        data = nc4_source.get_data(inps.latitude, inps.longitude, missing_dates)
+        on_disk = set(missing_dates) - set(missing_files)
+        available = [f for f in extractor.files if file_date(f) in on_disk]
 
-    db.load_data(inps.latitude, inps.longitude, data)
+    async def read_local():
+        for file in available:
+            await files.put(file)
 
-    results = db.get_data(Queries.extract_precipitation(inps.latitude, inps.longitude, inps.date_list))
-    results = results.sort_values(by=['Date', 'Version'], ascending=[True, False])
-    to_drop = results[(results['Date'].duplicated(keep='first')) & (results['Version'] != RELIABLE_VERSION)].index
+    def on_complete(result):
+        # Runs in a download thread, which blocks while the queue is full
+        if stopped.is_set():
+            raise RuntimeError('Extraction stopped, download interrupted')
 
-    results = results.drop(to_drop)
+        asyncio.run_coroutine_threadsafe(files.put(result['path']), loop).result()
+
+    async def download():
+        if missing_files:
+            await loop.run_in_executor(None, functools.partial(download_precipitation, inps.use_ssh, missing_files, inps.gpm_dir,
+                                                               on_complete=on_complete, backfill=getattr(inps, 'backfill', False)))
+
+    async def produce():
+        await asyncio.gather(read_local(), download())
+
+        for _ in range(workers):
+            await files.put(None)
+
+    async def extract(executor):
+        while (file := await files.get()) is not None:
+            try:
+                row = await loop.run_in_executor(executor, extract_file, file, inps.longitude, inps.latitude)
+
+            except concurrent.futures.process.BrokenProcessPool:
+                raise
+
+            except Exception as e:
+                # netCDF4 raises OSError on unreadable files, a single file must not stop the extraction
+                print(f"Skipping {file}: {e}")
+                continue
+
+            if row is not None:
+                await rows.put(row)
+
+    async def extract_all(executor):
+        await asyncio.gather(*(extract(executor) for _ in range(workers)))
+        await rows.put(None)
+
+    async def write():
+        inserted = 0
+        batch = []
+
+        while (row := await rows.get()) is not None:
+            batch.append((row[0], json.dumps(row[1].tolist()), row[2]))
+
+            # Flush when full, or as soon as the extraction has nothing else ready
+            if len(batch) >= batch_size or rows.empty():
+                db_ops.insert_many(inps.latitude, inps.longitude, batch)
+                inserted += len(batch)
+                batch = []
+
+        if batch:
+            db_ops.insert_many(inps.latitude, inps.longitude, batch)
+            inserted += len(batch)
+
+        return inserted
+
+    with contextlib.nullcontext(executor) if executor is not None else extraction_pool(workers) as executor:
+        stages = [asyncio.create_task(produce()), asyncio.create_task(extract_all(executor)), asyncio.create_task(write())]
+        done, pending = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+
+        if pending:
+            # A stage failed, the others would wait forever on its queue
+            stopped.set()
+
+            for task in pending:
+                task.cancel()
+
+            # Frees the download thread blocked on the full queue, its next file sees `stopped`
+            while not files.empty():
+                files.get_nowait()
+
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        for task in done:
+            if task.exception() is not None:
+                raise task.exception()
+
+        inserted = stages[2].result()
+
+    print(f"Inserted {inserted} values in Database\n")
+
+    return inserted
+
+
+EXTRACT_WORKER = {}
+
+
+def extraction_pool(workers=None):
+    """
+    Returns a process pool for extraction_pipeline, it can be shared by the queries of several locations.
+    """
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_extract_worker, initargs=generate_coordinate_array())
 
-    return results
 
+def init_extract_worker(lon, lat):
+    # The grid is shared by every file, it is sent once per process and not once per task
+    EXTRACT_WORKER.update(lon=lon, lat=lat)
 
-def get_precipitation_data(inps):
+
+def extract_file(file, longitude, latitude):
+    w = EXTRACT_WORKER
+
+    # Only files of missing dates are queued, the date filter of process_file is the file's own date
+    return LocalNC4Data(os.path.dirname(file)).process_file(file, {file_date(file)}, w['lon'], w['lat'], longitude, latitude)
+
+
+def extract_file_boxes(file, boxes):
+    w = EXTRACT_WORKER
+
+    return LocalNC4Data(os.path.dirname(file)).process_file_boxes(file, {file_date(file)}, w['lon'], w['lat'], boxes)
+
+
+def file_date(file):
+    return datetime.strptime(re.search(r'\d{8}', os.path.basename(file)).group(0), "%Y%m%d").date()
+
+
+def reextract_dates(gpm_dir, date_list):
+    """
+    Re-extracts the given dates for every location that already has them in the local database.
+
+    Used after Late run files have been replaced by their Final run counterpart, the yearly map
+    accumulators and the climatologies holding the replaced dates are removed.
+
+    Args:
+        gpm_dir (str): Folder containing the .nc4 files.
+        date_list (list): The dates (datetime.date) to re-extract.
+    """
+    if len(date_list) == 0:
+        return
+
+    database = SQLite3Database()
+    database.connect()
+    db_ops = SQLite3Operations(database)
+    db_ops.check_table()
+    db = Database(db_ops)
+    nc4_source = NC4DataSource(LocalNC4Data(gpm_dir))
+
+    locations = {}
+
+    for lat, lon, date in db_ops.select_data(Queries.select_locations_by_dates([str(d) for d in date_list])):
+        locations.setdefault((lat, lon), []).append(datetime.strptime(date, '%Y-%m-%d').date())
+
+    print(f"Re-extracting {len(date_list)} dates for {len(locations)} locations")
+
+    for (lat, lon), dates in locations.items():
+        latitude = [float(x) for x in lat.split(':')]
+        longitude = [float(x) for x in lon.split(':')]
+
+        db.remove_data(Queries.remove_records_by_dates(latitude, longitude, [str(d) for d in dates]))
+        data = nc4_source.get_data(latitude, longitude, sorted(dates))
+        db.load_data(latitude, longitude, data)
+
+    database.close()
+
+    clear_map_accumulators(gpm_dir, date_list)
+    clear_climatologies(gpm_dir, date_list)
+
+
+def clear_map_accumulators(gpm_dir, date_list):
+    """
+    Removes the yearly map accumulators of every box for the years of `date_list`, they are rebuilt from
+    the database by the next query.
+    """
+    for year in {d.year for d in date_list}:
+        for path in glob.glob(os.path.join(gpm_dir, MAP_ACCUMULATORS, '*', f'{year}.npz')):
+            os.remove(path)
+
+
+def clear_climatologies(gpm_dir, date_list):
+    """
+    Removes the stored climatologies whose reference period holds one of the dates of `date_list`.
+    """
+    for path in glob.glob(os.path.join(gpm_dir, CLIMATOLOGY_FOLDER, '*.npz')):
+        # <lat_min>_<lat_max>_<lon_min>_<lon_max>_<start>_<end>_<window>.npz, see get_climatology
+        start, end = (datetime.strptime(d, '%Y%m%d').date() for d in os.path.basename(path).split('_')[4:6])
+
+        if any(start <= d <= end for d in date_list):
+            os.remove(path)
+
+
+def get_precipitation_data(inps, executor=None):
     database, db_ops, nc4_source = setup_database(inps)
-    precipitation = extract_precipitation_data(db_ops, nc4_source, database, inps)
+    precipitation = extract_precipitation_data(db_ops, nc4_source, database, inps, executor)
     database.close()
 
-    precipitation['Precipitation'] = str_to_masked_array(precipitation['Precipitation'])
+    return PrecipCube.from_records(precipitation['Date'], precipitation['Precipitation'], precipitation['Version'], inps.latitude, inps.longitude)
 
-    return precipitation
+def get_precipitation_map(inps, persist=False):
+    """
+    Streams the daily grids of the period into a MapAccumulator, one grid in memory at a time.
+
+    With `persist`, the accumulators of the complete years are saved in the data folder and reused by
+    later queries, only the partial years at the edges of the period are read again.
+
+    Args:
+        inps (object): The input parameters (latitude, longitude, date_list, gpm_dir, use_ssh).
+        persist (bool): Save and reuse the yearly accumulators.
+
+    Returns:
+        MapAccumulator: Sum, count, max and mean of the period.
+    """
+    database, db_ops, nc4_source = setup_database(inps)
+    fill_missing_dates(db_ops, nc4_source, database, inps)
+
+    db = Database(db_ops)
+    lat, lon = grid_axes(inps.latitude, inps.longitude)
+    accumulator = MapAccumulator((len(lat), len(lon)))
+    folder = os.path.join(inps.gpm_dir, MAP_ACCUMULATORS, f'{inps.latitude[0]}_{inps.latitude[1]}_{inps.longitude[0]}_{inps.longitude[1]}')
+
+    years = {}
+
+    for date in inps.date_list:
+        years.setdefault(date.year, []).append(date)
+
+    for year, dates in years.items():
+        complete = len(dates) == (366 if calendar.isleap(year) else 365)
+        path = os.path.join(folder, f'{year}.npz') if persist and complete else None
+
+        if path and os.path.exists(path):
+            accumulator.merge(MapAccumulator.load(path))
+            continue
+
+        year_accumulator = db.accumulate_map(Queries.extract_precipitation_by_date(inps.latitude, inps.longitude, dates))
+
+        # Years with missing days are not saved, a later query would take them as complete
+        if path and year_accumulator.days == len(dates):
+            year_accumulator.save(path)
+
+        accumulator.merge(year_accumulator)
+
+    database.close()
+
+    print(f"Accumulated {accumulator.days} days")
+
+    return accumulator
+
+def get_climatology(inps, reference=CLIMATOLOGY_PERIOD, window=CLIMATOLOGY_WINDOW):
+    """
+    Returns the baselines of the location over the reference period, computed on first use and stored
+    in the data folder, every later anomaly of the same location and period reads them back.
+
+    The first use extracts the whole reference period, downloading the days missing from the archive, then
+    streams it from the database one year at a time, like get_precipitation_map.
+
+    Args:
+        inps (object): The input parameters (latitude, longitude, gpm_dir, use_ssh).
+        reference (str): Reference period, YYYYMMDD:YYYYMMDD.
+        window (int): Pooling window of the day-of-year baseline, in days.
+
+    Returns:
+        Climatology: Day-of-year and monthly mean and standard deviation of each cell.
+    """
+    start, end = reference.replace(',', ':').split(':')
+    path = os.path.join(inps.gpm_dir, CLIMATOLOGY_FOLDER,
+                        f'{inps.latitude[0]}_{inps.latitude[1]}_{inps.longitude[0]}_{inps.longitude[1]}_{start}_{end}_{window}.npz')
+
+    if os.path.exists(path):
+        return Climatology.load(path)
+
+    print(f"Computing the climatology from {start} to {end}, the missing days of the period are downloaded and extracted first")
+
+    reference_inps = copy.copy(inps)
+    reference_inps.date_list = generate_date_list(start, end)
+
+    database, db_ops, nc4_source = setup_database(reference_inps)
+    fill_missing_dates(db_ops, nc4_source, database, reference_inps)
+
+    db = Database(db_ops)
+    lat, lon = grid_axes(inps.latitude, inps.longitude)
+    accumulator = BaselineAccumulator((len(lat), len(lon)))
+    years = {}
+
+    for date in reference_inps.date_list:
+        years.setdefault(date.year, []).append(date)
+
+    for dates in years.values():
+        for date, grid in db.iter_grids(Queries.extract_precipitation_by_date(inps.latitude, inps.longitude, dates)):
+            accumulator.add(date, grid)
+
+    database.close()
+
+    climatology = Climatology.from_accumulator(accumulator, lat, lon, window)
+    climatology.save(path)
+
+    return climatology
+
+def get_site_matrix(inps, volcanoes, persist=False):
+    """
+    Stacks the area averaged series of every volcano in a (site, time) matrix over inps.date_list.
+
+    Args:
+        inps (object): The input parameters (date_list, gpm_dir, use_ssh).
+        volcanoes (dict): {volcano id: {'name', 'latitude', 'longitude'}}, see get_volcanoes.
+        persist (bool): Save the matrix in the data folder, later runs over the same sites and period reuse it.
+
+    Returns:
+        SiteMatrix: One row per volcano, NaN where the data is missing.
+    """
+    ids = sorted(volcanoes)
+    key = hashlib.sha1(','.join(str(id) for id in ids).encode()).hexdigest()[:12]
+    path = os.path.join(inps.gpm_dir, SITE_MATRIX, f'{inps.date_list[0]:%Y%m%d}_{inps.date_list[-1]:%Y%m%d}_{key}.npz')
+
+    if persist and os.path.exists(path):
+        return SiteMatrix.load(path)
+
+    time = np.asarray(inps.date_list, dtype='datetime64[D]')
+    values = np.full((len(ids), len(time)), np.nan, dtype=np.float32)
+    sites = []
+
+    for id in ids:
+        site_inps = copy.copy(inps)
+        site_inps.latitude, site_inps.longitude = adapt_coordinates(float(volcanoes[id]['latitude']), float(volcanoes[id]['longitude']))
+        sites.append(site_inps)
+
+    database, db_ops, nc4_source = setup_database(inps)
+
+    # One extraction pool and, for the local files, one pass over them for all the sites
+    with extraction_pool() as executor:
+        if not inps.use_ssh and isinstance(nc4_source, NC4DataSource):
+            fill_sites_missing_dates(db_ops, nc4_source, database, sites, executor)
+
+        else:
+            for site_inps in sites:
+                fill_missing_dates(db_ops, nc4_source, database, site_inps, executor)
+
+    for row, (id, site_inps) in enumerate(zip(ids, sites)):
+        print(f"Site {row + 1}/{len(ids)}: {volcanoes[id]['name']} (id: {id})")
+
+        precipitation = select_precipitation(db_ops, site_inps)
+        cube = PrecipCube.from_records(precipitation['Date'], precipitation['Precipitation'], precipitation['Version'], site_inps.latitude, site_inps.longitude)
+
+        # A date outside of date_list would be put in the nearest column
+        columns = np.minimum(np.searchsorted(time, cube.time), len(time) - 1)
+        match = time[columns] == cube.time
+
+        values[row, columns[match]] = cube.spatial_reduce('mean')[match]
+
+    database.close()
+
+    matrix = SiteMatrix(values, time, ids, [volcanoes[id]['name'] for id in ids],
+                        [site.latitude[0] for site in sites], [site.longitude[0] for site in sites])
+
+    if persist:
+        matrix.save(path)
+
+    return matrix
 
 ################## REFACTORED CODE END ########################
 
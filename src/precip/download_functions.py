@@ -1,13 +1,16 @@
+import re
 import requests
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import os
 import concurrent.futures
-import threading
-import subprocess
 import time
-from precip.helper_functions import ask_user
-from precip.config import JSON_DOWNLOAD_URL, FINAL06, FINAL07, PATH_JETSTREAM
+import numpy as np
+from precip.helper_functions import ask_user, generate_coordinate_array
+from precip.objects.classes.file_manager.download_scheduler import DownloadScheduler
+from precip.objects.classes.file_manager.http_downloader import EarthdataSession
+from precip.objects.classes.utils.verification_ledger import VerificationLedger
+from precip.config import JSON_DOWNLOAD_URL, FINAL06, FINAL07, PATH_JETSTREAM, START_DATE, OPENDAP_URL, SUBSET_FOLDER, VERIFICATION_LEDGER
 
 
 def download_volcano_json(json_path, json_download_url=JSON_DOWNLOAD_URL):
@@ -51,7 +54,7 @@ def download_volcano_json(json_path, json_download_url=JSON_DOWNLOAD_URL):
         print('Cannot create json file')
 
 
-def generate_url_download(date, final06=FINAL06, final07=FINAL07):
+def generate_url_download(date, final06=FINAL06, final07=FINAL07, run=None):
     """
     Generates the URL for downloading precipitation data based on the given date.
 
@@ -59,6 +62,7 @@ def generate_url_download(date, final06=FINAL06, final07=FINAL07):
         date (datetime.date): The date for which the precipitation data is needed.
         final06 (str): The date in the format 'YYYY-MM-DD' for the Final06 interval.
         final07 (str): The date in the format 'YYYY-MM-DD' for the Final07 interval.
+        run (str): Force the 'final' or 'late' run, by default it is chosen from `final07`.
 
     Returns:
         str: The URL for downloading the precipitation data.
@@ -72,14 +76,17 @@ def generate_url_download(date, final06=FINAL06, final07=FINAL07):
                  "Late06": datetime.today().date() - relativedelta(days=1)}
     # For research purpose is better to use Final run data, possibly v07
     # No Final run 06 anymore available on GES DISC
+    if run is None:
+        run = 'final' if date <= intervals["Final07"] else 'late'
+
     # Final Run 07
-    if date <= intervals["Final07"]:
+    if run == 'final':
         head = 'https://gpm1.gesdisc.eosdis.nasa.gov/data/GPM_L3/GPM_3IMERGDF.07/'
         body = '/3B-DAY.MS.MRG.3IMERG.'
         tail = '-S000000-E235959.V07B.nc4'
 
     # Late Run 07
-    elif date > intervals["Final07"]:
+    elif run == 'late':
         head = 'https://gpm1.gesdisc.eosdis.nasa.gov/data/GPM_L3/GPM_3IMERGDL.07/'
         body = '/3B-DAY-L.MS.MRG.3IMERG.'
         tail = '-S000000-E235959.V07B.nc4'
@@ -99,12 +106,13 @@ def generate_url_download(date, final06=FINAL06, final07=FINAL07):
     return url
 
 
-def generate_urls_list(date_list):
+def generate_urls_list(date_list, run=None):
     """
     Generate a list of URLs for downloading precipitation data.
 
     Parameters:
     date_list (list): A list of dates for which the precipitation data will be downloaded.
+    run (str): Force the 'final' or 'late' run (see generate_url_download).
 
     Returns:
     list: A list of URLs for downloading precipitation data.
@@ -113,12 +121,162 @@ def generate_urls_list(date_list):
     urls = []
 
     for date in date_list:
-        url = generate_url_download(date)
+        url = generate_url_download(date, run=run)
         urls.append(url)
 
     return urls
 
 
+def generate_subset_url(date, latitude, longitude, opendap_url=OPENDAP_URL, run=None):
+    """
+    Generates the OPeNDAP URL of the precipitation of the given date over a bounding box.
+
+    The server cuts the granule and returns a netCDF4 file holding only the box, with its own lat/lon variables.
+
+    Args:
+        date (datetime.date): The date for which the precipitation data is needed.
+        latitude (list): Minimum and maximum latitude of the box, on the GPM grid (see adapt_coordinates).
+        longitude (list): Minimum and maximum longitude of the box, on the GPM grid (see adapt_coordinates).
+        opendap_url (str): Base URL of the OPeNDAP server (default: OPENDAP_URL).
+        run (str): Force the 'final' or 'late' run (see generate_url_download).
+
+    Returns:
+        str: The URL for downloading the regional subset.
+    """
+    granule = generate_url_download(date, run=run).split('/GPM_L3/', 1)[1]
+    lon, lat = generate_coordinate_array()
+
+    # Indexes of the box in the global 0.1 degree grid, variables are (time, lon, lat)
+    lon_min, lon_max = (int(np.abs(lon - float(value)).argmin()) for value in longitude)
+    lat_min, lat_max = (int(np.abs(lat - float(value)).argmin()) for value in latitude)
+
+    constraint = (f'precipitation[0:0][{lon_min}:{lon_max}][{lat_min}:{lat_max}],'
+                  f'time[0:0],lon[{lon_min}:{lon_max}],lat[{lat_min}:{lat_max}]')
+
+    return opendap_url.rstrip('/') + '/' + granule + '.nc4?' + constraint
+
+
+def subset_folder(folder, latitude, longitude):
+    """
+    Returns the folder holding the regional subsets of the given box.
+
+    Args:
+        folder (str): The data folder.
+        latitude (list): Minimum and maximum latitude of the box.
+        longitude (list): Minimum and maximum longitude of the box.
+
+    Returns:
+        str: The path of the regional folder.
+    """
+    return os.path.join(folder, SUBSET_FOLDER, f'{latitude[0]}_{latitude[1]}_{longitude[0]}_{longitude[1]}')
+
+
+def local_catalog(folder):
+    """
+    Lists the dates available in the local archive for each run type.
+
+    Args:
+        folder (str): The folder containing the .nc4 files.
+
+    Returns:
+        dict: {'final': {date: file}, 'late': {date: file}}
+    """
+    catalog = {'final': {}, 'late': {}}
+
+    if not os.path.isdir(folder):
+        return catalog
+
+    for f in os.listdir(folder):
+        if not f.endswith('.nc4'):
+            continue
+
+        d = re.search(r'\d{8}', f)
+
+        if not d:
+            continue
+
+        run = 'late' if f.startswith('3B-DAY-L.') else 'final'
+        catalog[run][datetime.strptime(d.group(0), "%Y%m%d").date()] = os.path.join(folder, f)
+
+    return catalog
+
+
+def archive_missing_dates(folder, start_date=START_DATE, end_date=None):
+    """
+    Lists the days between `start_date` and `end_date` that have no file in the local archive.
+
+    Args:
+        folder (str): The folder containing the .nc4 files.
+        start_date (str or datetime.date): First day of the archive (default: START_DATE).
+        end_date (str or datetime.date): Last day of the archive (default: yesterday).
+
+    Returns:
+        list: The missing dates, oldest first.
+    """
+    if isinstance(start_date, str):
+        start_date = datetime.strptime(start_date, '%Y%m%d').date()
+
+    if end_date is None:
+        end_date = datetime.today().date() - relativedelta(days=1)
+
+    elif isinstance(end_date, str):
+        end_date = datetime.strptime(end_date, '%Y%m%d').date()
+
+    catalog = local_catalog(folder)
+    present = set(catalog['final']) | set(catalog['late'])
+    days = (end_date - start_date).days + 1
+
+    return [day for day in (start_date + relativedelta(days=i) for i in range(max(days, 0))) if day not in present]
+
+
+def final_run_available(date, session=None):
+    """
+    Checks on GES DISC whether the Final run has been published for the given date.
+
+    Args:
+        date (datetime.date): The date to check.
+        session (requests.Session): Authenticated session to reuse (default: a new EarthdataSession).
+
+    Returns:
+        bool: True if the Final run file exists.
+    """
+    session = session or EarthdataSession()
+    response = session.head(generate_url_download(date, run='final'), allow_redirects=True, timeout=60)
+
+    return response.status_code == 200
+
+
+def latest_final_date(dates, session=None):
+    """
+    Finds the newest of the given dates whose Final run has been published.
+
+    Final runs are released in chronological order, so a binary search needs only log2(n) requests.
+
+    Args:
+        dates (list): Candidate dates, i.e. the days currently held as Late run.
+        session (requests.Session): Authenticated session to reuse.
+
+    Returns:
+        datetime.date or None: The newest date with a Final run, None if there is none.
+    """
+    dates = sorted(dates)
+    session = session or EarthdataSession()
+    low, high = 0, len(dates) - 1
+    latest = None
+
+    while low <= high:
+        mid = (low + high) // 2
+
+        if final_run_available(dates[mid], session):
+            latest = dates[mid]
+            low = mid + 1
+
+        else:
+            high = mid - 1
+
+    return latest
+
+
 def dload_site_list_parallel(folder, date_list, parallel=5):
     """
     Downloads files from a list of URLs in parallel using multiple threads.
@@ -126,46 +284,22 @@ def dload_site_list_parallel(folder, date_list, parallel=5):
     Args:
         folder (str): The folder path where the downloaded files will be saved.
         date_list (list): A list of dates or URLs to download.
+        parallel (int): Maximum number of concurrent downloads.
 
     Returns:
-        None
+        list: One result dictionary per URL (see HTTPDownloader.fetch).
     """
-
-    os.makedirs(folder, exist_ok=True)
-
     urls = generate_urls_list(date_list)
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
-        for url in urls:
-            filename = os.path.basename(url)
-            file_path = os.path.join(folder, filename)
-
-            if not os.path.exists(file_path):
-                print(f"Starting download of {url} on {threading.current_thread().name}")
-                attempts = 0
-
-                while attempts < 3:
-                    try:
-                        subprocess.run(['wget', url, '-P', folder], check=True)
-                        print(f"Finished download of {url} on {threading.current_thread().name}")
-                        break
-
-                    except subprocess.CalledProcessError:
-                        attempts += 1
-                        print(f"Download attempt {attempts} failed for {url}. Retrying...")
-                        time.sleep(1)
-
-                else:
-                    msg = f"Failed to download {url} after {attempts} attempts. Exiting..."
-                    raise ValueError(msg)
-            else:
-                print(f"\rFile {filename} already exists, skipping download. ", end="")
-                time.sleep(0.001)
+    # Files are validated as they land, later checks skip them
+    ledger = VerificationLedger(os.path.join(folder, VERIFICATION_LEDGER)).load()
+    results = DownloadScheduler(folder, max_parallel=parallel, ledger=ledger).download(urls)
 
-    print('')
     print('All files have been downloaded')
     print('-----------------------------------------------')
 
+    return results
+
 
 def download_jetstream(ssh, url, pathJetstream):
     filename = os.path.basename(url)
@@ -11,8 +11,12 @@ import numpy as np
 import pandas as pd
 from matplotlib import cm
 import netCDF4 as nc
-from collections import Counter
+import hashlib
+from collections import Counter, OrderedDict
 from precip.config import PATH_JETSTREAM, RELIABLE_VERSION
+from precip.objects.classes.utils.precip_cube import PrecipCube
+from precip.objects.classes.utils.rolling_engine import rolling_sum
+from precip.objects.classes.utils.quantile_bins import QuantileBins
 
 
 def date_to_decimal_year(date_str):
@@ -32,30 +36,32 @@ def date_to_decimal_year(date_str):
     if date_str is None or pd.isna(date_str):
         return None
 
-    if type(date_str) == str:
-        try:
-            date_obj = datetime.strptime(date_str, '%Y-%m-%d')
+    return float(decimal_years([date_str])[0])
 
-        except:
-            date_obj = datetime.strptime(date_str, '%Y%m%d')
 
-    else:
-        date_obj = date_str
+def decimal_years(dates):
+    """
+    Converts an array of dates to decimal years.
 
-    year = date_obj.year
-    day_of_year = date_obj.timetuple().tm_yday
+    Parameters:
+    dates (array-like): datetime64 values, Timestamps, datetime.date objects or strings ('YYYY-MM-DD' or 'YYYYMMDD').
 
-    # Check if it's a leap year
-    if (year % 4 == 0 and year % 100 != 0) or (year % 400 == 0):
-        days_in_year = 366.0
+    Returns:
+    numpy.ndarray: The decimal years rounded to 4 digits, NaN where the date is missing.
 
-    else:
-        days_in_year = 365.0
+    Example:
+    >>> decimal_years(np.array(['2022-01-01', '2024-07-01'], dtype='datetime64[D]'))
+    array([2022.    , 2024.4973])
+    """
+    days = np.asarray(pd.to_datetime(np.asarray(dates).ravel()), dtype='datetime64[D]')
+    years = days.astype('datetime64[Y]')
+    start = years.astype('datetime64[D]')
+    length = ((years + 1).astype('datetime64[D]') - start).astype(float)
 
-    decimal_year = year + (day_of_year - 1) / days_in_year
-    decimal_year = round(decimal_year, 4)
+    decimal = years.astype(float) + 1970 + (days - start).astype(float) / length
+    decimal[np.isnat(days)] = np.nan
 
-    return decimal_year
+    return np.round(decimal, 4)
 
 
 def days_in_month(date):
@@ -160,17 +166,24 @@ def weekly_monthly_yearly_precipitation(dictionary, time_period=None, cumulate=F
     Resamples the precipitation data in the given dictionary by the specified time period.
 
     Args:
-        dictionary (dict): A dictionary containing precipitation data.
+        dictionary (dict or PrecipCube): A dictionary or cube containing precipitation data.
         time_period (str): The time period to resample the data by (e.g., 'W' for weekly, 'M' for monthly, 'Y' for yearly).
 
     Returns:
-        pandas.DataFrame: The resampled precipitation data.
+        pandas.DataFrame: The resampled precipitation data, for a cube the resampled cube or the (lat, lon) map
+        of the total (cumulate) or daily mean over the period.
 
     Raises:
         KeyError: If the 'Precipitation' field is not found in the dictionary.
     """
     m_y = [28,29,30,31,365]
 
+    if isinstance(dictionary, PrecipCube):
+        if time_period:
+            return dictionary.resample(time_period)
+
+        return dictionary.reduce_time('sum' if cumulate else 'mean')
+
     if isinstance(dictionary, dict):
         df = pd.DataFrame.from_dict(dictionary)
 
@@ -294,12 +307,59 @@ def generate_date_list(start, end=None, average=None):
 
 
 def check_missing_dates(date_list, column):
-    column = pd.to_datetime(column).dt.date
+    missing = missing_dates_mask(date_list, column)
+
+    return [date for date, is_missing in zip(date_list, missing) if is_missing]
+
+
+def missing_dates_mask(date_list, column):
+    """
+    Flags the dates of `date_list` that are not in `column`.
+
+    Args:
+        date_list (array-like): The wanted dates.
+        column (array-like): The available dates.
+
+    Returns:
+        numpy.ndarray: Boolean mask, True where the date is missing.
+    """
+    wanted = np.asarray(pd.to_datetime(np.asarray(date_list).ravel()), dtype='datetime64[D]')
+    available = np.unique(np.asarray(pd.to_datetime(np.asarray(column).ravel()), dtype='datetime64[D]'))
+
+    if len(available) == 0:
+        return np.ones(len(wanted), dtype=bool)
+
+    # Sorted membership instead of a scan of the column for every date
+    position = np.searchsorted(available, wanted).clip(max=len(available) - 1)
+
+    return available[position] != wanted
+
+
+def missing_date_ranges(date_list, column):
+    """
+    Groups the dates of `date_list` missing from `column` in contiguous ranges.
+
+    Two missing dates belong to the same range when they are next to each other in the sorted `date_list`,
+    so the ranges of a daily list are the gaps of the archive.
+
+    Args:
+        date_list (array-like): The wanted dates.
+        column (array-like): The available dates.
+
+    Returns:
+        list: (first, last) datetime.date tuples, oldest first.
+    """
+    wanted = np.unique(np.asarray(pd.to_datetime(np.asarray(date_list).ravel()), dtype='datetime64[D]'))
+    index = np.flatnonzero(missing_dates_mask(wanted, column))
+
+    if len(index) == 0:
+        return []
 
-    # Check if all dates in the date_list are in the DataFrame
-    missing_dates = [date for date in date_list if date not in column.tolist()]
+    breaks = np.flatnonzero(np.diff(index) != 1)
+    starts = wanted[index[np.r_[0, breaks + 1]]]
+    ends = wanted[index[np.r_[breaks, len(index) - 1]]]
 
-    return missing_dates
+    return [(start, end) for start, end in zip(starts.astype(object), ends.astype(object))]
 
 
 def str_to_masked_array(column):
@@ -468,15 +528,12 @@ def volcano_rain_frame(rainfall, roll_count, lon=None, lat=None, centered=False,
         volc_rain = rainfall[(rainfall['Longitude'] == lon) & (rainfall['Latitude'] == lat)].copy()
 
     if 'Decimal' not in rainfall.columns:
-        volc_rain['Decimal'] = volc_rain.Date.apply(date_to_decimal_year)
+        volc_rain['Decimal'] = decimal_years(volc_rain.Date)
         volc_rain = volc_rain.sort_values(by=['Decimal'])
 
     if 'roll' not in volc_rain.columns:
-        if centered == True:
-            volc_rain['roll'] = volc_rain.Precipitation.rolling(roll_count, center=True).sum()
-
-        else:
-            volc_rain['roll'] = volc_rain.Precipitation.rolling(roll_count).sum()
+        # Prefix sums shared by every window of the series, each window computed once per site
+        volc_rain['roll'] = rolling_sum(volc_rain.Precipitation.to_numpy(dtype=float), roll_count, centered == True)
 
     volc_rain = volc_rain.dropna(subset=['roll'])
 
@@ -490,31 +547,71 @@ def volcano_rain_frame(rainfall, roll_count, lon=None, lat=None, centered=False,
     return volc_rain
 
 
-def map_eruption_colors(data, roll, eruption_dates, bins, colors):
-        data = volcano_rain_frame(data, roll)
+def map_eruption_colors(data, roll, eruption_dates, bins, colors, scope='global'):
+        data, quantiles = derived_frame(data, roll)
 
         if eruption_dates != []:
             # Adapt the eruption dates to the averaged precipitation data
             eruption_dates = adapt_events(eruption_dates, data['Date'])
 
-            # Create a dictionary where the keys are the eruption dates and the values are the same
-            eruption_dict = {date: date for date in eruption_dates}
+            # Decimal year of the eruption dates for plotting purposes, NaN elsewhere
+            data['Eruptions'] = data['Decimal'].where(data['Date'].isin(eruption_dates))
 
-            # Map the 'Date' column to the eruption dates
-            data['Eruptions'] = data['Date'].map(eruption_dict)
+        # Bin of each row from the cached ranks of the 'roll' column, over the series, each year or each season
+        index = quantiles.bins(bins, scope)
+        data['bin'] = index
 
-            # Convert to decimal year for plotting purposes
-            data['Eruptions'] = data.Eruptions.apply(date_to_decimal_year)
+        # Map the bins to the `colors` list
+        lookup = np.empty(len(colors), dtype=object)
 
-        # Calculate 'color' based on ranks of the 'roll' column
-        data['color'] = ((data['roll'].rank(method='first') * bins) / len(data)).astype(int).clip(upper=bins-1)
+        for i, color in enumerate(colors):
+            lookup[i] = color
 
-        # Map the 'color' column to the `colors` list
-        data['color'] = data['color'].map(lambda x: colors[x])
+        data['color'] = lookup[index]
 
         return data
 
 
+DERIVED_FRAMES = OrderedDict()
+DERIVED_FRAMES_SIZE = 32
+
+
+def derived_frame(data, roll, centered=False):
+    """
+    Returns the frame of volcano_rain_frame and the quantile bins of its 'roll' column, computed once per series.
+
+    Frames are cached by the content of the series (which identifies the site and the date range), the
+    rolling window and `centered`, so plotting several styles and bins of a site derives them only once.
+
+    Args:
+        data (pd.DataFrame): 'Date' and float 'Precipitation' columns.
+        roll (int): Number of days of the rolling sum.
+        centered (bool): Center the rolling window.
+
+    Returns:
+        tuple: A copy of the cached frame with 'Decimal', 'roll' and 'cumsum' columns, and its QuantileBins.
+    """
+    dates = np.asarray(pd.to_datetime(data['Date']), dtype='datetime64[D]')
+    values = data['Precipitation'].to_numpy(dtype=float)
+    key = (hashlib.sha1(dates.tobytes() + values.tobytes()).hexdigest(), roll, centered)
+
+    entry = DERIVED_FRAMES.get(key)
+
+    if entry is None:
+        frame = volcano_rain_frame(data, roll, centered=centered)
+        entry = (frame, QuantileBins(frame['roll'].to_numpy(dtype=float), pd.to_datetime(frame['Date'])))
+
+        DERIVED_FRAMES[key] = entry
+
+        if len(DERIVED_FRAMES) > DERIVED_FRAMES_SIZE:
+            DERIVED_FRAMES.popitem(last=False)
+
+    else:
+        DERIVED_FRAMES.move_to_end(key)
+
+    return entry[0].copy(), entry[1]
+
+
 def from_nested_to_float(dataframe):
     """ Converts a nested list of floats to a flat list of floats.
 
@@ -538,30 +635,36 @@ def from_nested_to_float(dataframe):
 
 def adapt_events(eruption_dates, date_list):
     # Find the closest dates in the second list for each date in the first list
-    if not isinstance(eruption_dates, list):
-        eruption_dates = list(eruption_dates)
+    eruption_dates = pd.to_datetime(pd.Series(list(eruption_dates), dtype=object)).dt.normalize()
+    date_list = pd.Series(date_list).reset_index(drop=True)
+    index = snap_events(eruption_dates, date_list)
+
+    for eruption_date in eruption_dates[index < 0]:
+        print(f'Removing {str(eruption_date.date())} from the list of eruptions. Out of range')
+
+    return date_list.iloc[index[index >= 0]].tolist()
 
-    valid_eruption_dates = []
 
-    for i in range(len(eruption_dates)):
-        # TODO remember this was a test
-        eruption_date = pd.Timestamp(eruption_dates[i]).normalize()
+def snap_events(events, dates):
+    """
+    Snaps each event to the last date of `dates` not after it.
+
+    Args:
+        events (array-like): The event dates.
+        dates (array-like): Sorted dates of the series (e.g. the start of each averaging period).
 
-        for j in range(len(date_list)):
-            try:
-                if date_list.iloc[j] <= eruption_date < date_list.iloc[j+1]:
-                    valid_eruption_dates.append(date_list.iloc[j])
-                    break
+    Returns:
+        numpy.ndarray: Index in `dates` of each event, -1 when the event is before the first or after the last date.
+    """
+    events = np.asarray(pd.to_datetime(np.asarray(events).ravel()), dtype='datetime64[D]')
+    dates = np.asarray(pd.to_datetime(np.asarray(dates).ravel()), dtype='datetime64[D]')
 
-            except:
-                # Only add the date to valid_eruption_dates if it's not greater than the last date in date_list
-                if eruption_date <= date_list.iloc[j]:
-                    valid_eruption_dates.append(date_list.iloc[j])
+    index = np.searchsorted(dates, events, side='right') - 1
 
-                else:
-                    print(f'Removing {str(eruption_date.date())} from the list of eruptions. Out of range')
+    if len(dates):
+        index[events > dates[-1]] = -1
 
-    return valid_eruption_dates
+    return index
 
 
 def check_duplicate_files(files):
@@ -588,6 +691,8 @@ def check_duplicate_files(files):
         # Final > Late & V7 > V6
         # New files are only v07 as of 2024/10/16
         version_map = {file: int(re.search(r'V(\d{2})', file).group(1)) for file in files_with_date if re.search(r'V(\d{2})', file)}
+        to_remove = []
+
         if any(version == RELIABLE_VERSION for version in version_map.values()):
             to_remove = [file for file, version in version_map.items() if version == 6]
 
@@ -595,6 +700,13 @@ def check_duplicate_files(files):
             files.remove(f)
             os.remove(f)
 
+        # Late and Final runs share the version, the Late run is left out here and removed by sync_precipitation
+        late = [file for file in files_with_date if file in files and os.path.basename(file).startswith('3B-DAY-L.')]
+
+        if len(late) < len([file for file in files_with_date if file in files]):
+            for f in late:
+                files.remove(f)
+
     return files
 
 def check_dates_downloaded(date_list, files):
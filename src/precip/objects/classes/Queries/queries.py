@@ -22,6 +22,18 @@ class Queries:
 
         return f"SELECT Date, Precipitation, Version FROM volcanoes WHERE Latitude = '{lat}' AND Longitude = '{lon}' and Date between '{date_list[0]}' and '{date_list[-1]}'"
 
+    @staticmethod
+    def extract_dates(latitude, longitude, date_list):
+        lat = f"{latitude[0]}:{latitude[1]}"
+        lon = f"{longitude[0]}:{longitude[1]}"
+
+        return f"SELECT Date, Version FROM volcanoes WHERE Latitude = '{lat}' AND Longitude = '{lon}' and Date between '{date_list[0]}' and '{date_list[-1]}'"
+
+    @staticmethod
+    def extract_precipitation_by_date(latitude, longitude, date_list):
+        # Highest version first, readers keep the first row of each date
+        return Queries.extract_precipitation(latitude, longitude, date_list) + " ORDER BY Date, Version DESC"
+
     @staticmethod
     def insert_precipitation(latitude, longitude, date, precipitation, table='volcanoes'):
         lat = f"{latitude[0]}:{latitude[1]}"
@@ -36,6 +48,10 @@ class Queries:
 
         return f"INSERT OR IGNORE INTO {table} (Date, Precipitation, Latitude, Longitude, Version) VALUES ('{date}', '{precipitation}', '{lat}', '{lon}', '{version}')"
 
+    @staticmethod
+    def insert_many_precipitation(table='volcanoes'):
+        return f"INSERT OR IGNORE INTO {table} (Date, Precipitation, Latitude, Longitude, Version) VALUES (?, ?, ?, ?, ?)"
+
     @staticmethod
     def select_row(latitude, longitude, date, table='volcanoes'):
         lat = f"{latitude[0]}:{latitude[1]}"
@@ -49,3 +65,17 @@ class Queries:
         lon = f"{longitude[0]}:{longitude[1]}"
 
         return f"DELETE FROM {table} WHERE Latitude = '{lat}' AND Longitude = '{lon}' AND Date = '{date}'"
+
+    @staticmethod
+    def select_locations_by_dates(date_list, table='volcanoes'):
+        dates = ', '.join(f"'{date}'" for date in date_list)
+
+        return f"SELECT Latitude, Longitude, Date FROM {table} WHERE Date IN ({dates})"
+
+    @staticmethod
+    def remove_records_by_dates(latitude, longitude, date_list, table='volcanoes'):
+        lat = f"{latitude[0]}:{latitude[1]}"
+        lon = f"{longitude[0]}:{longitude[1]}"
+        dates = ', '.join(f"'{date}'" for date in date_list)
+
+        return f"DELETE FROM {table} WHERE Latitude = '{lat}' AND Longitude = '{lon}' AND Date IN ({dates})"
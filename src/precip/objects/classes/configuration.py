@@ -1,4 +1,5 @@
 import os
+import re
 from precip.config import JSON_VOLCANO
 from precip.helper_functions import generate_date_list, adapt_coordinates, color_scheme, quantile_name
 from precip.volcano_functions import extract_volcanoes_info
@@ -90,6 +91,17 @@ class PlotConfiguration:
                 "precipitation (mm)"
             )
 
+        if getattr(self, 'anomaly', None):
+            if self.anomaly == 'standardized':
+                # In standard deviations, no units
+                ylabel = re.sub(r'\s*\(mm(/day)?\)', '', ylabel)
+                prefix = 'Standardized anomaly of\n'
+
+            else:
+                prefix = 'Anomaly of\n'
+
+            ylabel = prefix + ylabel[0].lower() + ylabel[1:]
+
         if self.volcano_name:
             title = f'{self.volcano_name} - Latitude: {self.latitude}, Longitude: {self.longitude}'
 
@@ -1,5 +1,6 @@
 from precip.objects.interfaces.data_managers.abstract_data_from_file import AbstractDataFromFile
 from precip.objects.interfaces.abstract_cloud_manager import AbstractCloudManager
+from precip.objects.classes.utils.granule_cache import GranuleCache
 from precip.config import PATH_JETSTREAM
 import re
 import os
@@ -10,9 +11,10 @@ from datetime import datetime
 
 
 class CloudNC4Data(AbstractDataFromFile):
-    def __init__(self, provider: AbstractCloudManager) -> None:
+    def __init__(self, provider: AbstractCloudManager, cache: GranuleCache = None) -> None:
         self.provider = provider
         self.path = self.provider.path
+        self.cache = cache
 
 
     def check_duplicates(self):
@@ -32,19 +34,29 @@ class CloudNC4Data(AbstractDataFromFile):
         if date not in date_list:
             return None
 
-        with tempfile.NamedTemporaryFile(suffix='.nc4', delete=True) as tmp:
-            # Download the file to your local system
-            self.provider.sftp.get(file, tmp.name)
+        if self.cache is not None:
+            # Served locally when the same day has already been fetched
+            subset = self.read_subset(self.cache.get(file, self.provider.sftp), lon, lat, longitude, latitude)
 
-            # Open the NetCDF file
-            ds = nc.Dataset(tmp.name)
+        else:
+            with tempfile.NamedTemporaryFile(suffix='.nc4', delete=True) as tmp:
+                # Download the file to your local system
+                self.provider.sftp.get(file, tmp.name)
+                subset = self.read_subset(tmp.name, lon, lat, longitude, latitude)
+
+        return (str(date), subset)
+
+
+    def read_subset(self, path, lon, lat, longitude, latitude):
+        # Open the NetCDF file
+        with nc.Dataset(path) as ds:
             data = ds['precipitationCal'] if 'precipitationCal' in ds.variables else ds['precipitation']
             subset = data[:,
                         np.where(lon == longitude[0])[0][0]:np.where(lon == longitude[1])[0][0]+1,
                         np.where(lat == latitude[0])[0][0]:np.where(lat == latitude[1])[0][0]+1]
             subset = subset.astype(float)
 
-        return (str(date), subset)
+        return subset
 
 
     def list_files(self, path: str = PATH_JETSTREAM):
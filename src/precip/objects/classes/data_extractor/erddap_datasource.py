@@ -0,0 +1,171 @@
+from precip.objects.interfaces.data_managers.abstract_datasource import AbstractDataSource
+from precip.objects.classes.utils.precip_cube import PrecipCube
+from precip.config import ERDDAP_URL, ERDDAP_VARIABLE, ERDDAP_CACHE, RELIABLE_VERSION
+from urllib.parse import quote
+import concurrent.futures
+import threading
+import tempfile
+import hashlib
+import io
+import os
+import numpy as np
+import pandas as pd
+import requests
+
+
+class ERDDAPDataSource(AbstractDataSource):
+    """
+    Data source reading the precipitation from an ERDDAP griddap dataset.
+
+    The whole timeseries of a location is requested as headerless CSV, long periods are split in batches
+    fetched in parallel, and complete responses are cached on disk so the same query is not asked twice.
+    Batches are clipped to the time coverage of the dataset, ERDDAP rejects a range reaching past it.
+
+    Args:
+        url (str): URL of the griddap dataset, without extension (default: ERDDAP_URL).
+        variable (str): Name of the precipitation variable (default: ERDDAP_VARIABLE).
+        cache (str): Folder of the response cache, None for $PRECIP_DIR/erddap_cache, False to disable it.
+        parallel (int): Number of concurrent requests (default: 4).
+        batch_days (int): Maximum number of days per request (default: 366).
+        version (int): Version stored with the extracted values (default: RELIABLE_VERSION).
+        timeout (float): Connect/read timeout in seconds (default: 120).
+    """
+    def __init__(self, url: str = ERDDAP_URL, variable: str = ERDDAP_VARIABLE, cache: str = None, parallel: int = 4,
+                 batch_days: int = 366, version: int = RELIABLE_VERSION, timeout: float = 120) -> None:
+        if cache is None:
+            cache = os.path.join(os.getenv('PRECIP_DIR') or tempfile.gettempdir(), ERDDAP_CACHE)
+
+        self.url = url.rstrip('/')
+        self.variable = variable
+        self.cache = cache
+        self.parallel = parallel
+        self.batch_days = batch_days
+        self.version = version
+        self.timeout = timeout
+        self.local = threading.local()
+        self.time_coverage = None
+
+        if self.cache:
+            os.makedirs(self.cache, exist_ok=True)
+
+
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+
+        return self.local.session
+
+
+    def batches(self, date_list: list) -> list:
+        """
+        Splits the dates in (start, end) ranges spanning at most `batch_days` days.
+        """
+        batches = []
+
+        for date in sorted(set(date_list)):
+            if batches and (date - batches[-1][0]).days < self.batch_days:
+                batches[-1][1] = date
+
+            else:
+                batches.append([date, date])
+
+        return [tuple(batch) for batch in batches]
+
+
+    def coverage(self) -> tuple:
+        """
+        Returns the first and last date of the dataset, asked once per instance as the last one moves.
+        """
+        if self.time_coverage is None:
+            bounds = []
+
+            for index in ('0', 'last'):
+                response = self.session().get(f'{self.url}.csv0?' + quote(f'time[{index}]', safe=''), timeout=self.timeout)
+                response.raise_for_status()
+                bounds.append(pd.Timestamp(response.text.strip()).date())
+
+            self.time_coverage = tuple(bounds)
+
+        return self.time_coverage
+
+
+    def create_url(self, start_date, end_date, latitude: list, longitude: list) -> str:
+        constraint = (f'{self.variable}[({start_date}):1:({end_date})]'
+                      f'[({latitude[0]}):1:({latitude[1]})][({longitude[0]}):1:({longitude[1]})]')
+
+        return f'{self.url}.csv0?' + quote(constraint, safe='():,.-')
+
+
+    def fetch(self, url: str, start_date, end_date) -> str:
+        """
+        Returns the CSV response of `url`, from the cache when available.
+        """
+        path = os.path.join(self.cache, hashlib.sha1(url.encode()).hexdigest() + '.csv') if self.cache else None
+
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                return f.read()
+
+        response = self.session().get(url, timeout=self.timeout)
+
+        # ERDDAP answers 404 when the range holds no data (e.g. dates not published yet)
+        if response.status_code == 404:
+            return ''
+
+        response.raise_for_status()
+
+        # Only complete batches are cached, a range past the end of the dataset is asked again next time
+        days = (end_date - start_date).days + 1
+        times = {line.split(',', 1)[0] for line in response.text.splitlines() if line}
+
+        if path and len(times) == days:
+            fd, tmp = tempfile.mkstemp(dir=self.cache, suffix='.tmp')
+
+            with os.fdopen(fd, 'w') as f:
+                f.write(response.text)
+
+            os.replace(tmp, path)
+
+        return response.text
+
+
+    def get_data(self, latitude, longitude, date_list):
+        print('-' * 50)
+        print('Extracting Values from ERDDAP ...\n')
+
+        first, last = self.coverage()
+        batches = [(max(start, first), min(end, last)) for start, end in self.batches(date_list) if end >= first and start <= last]
+        frames = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            futures = [executor.submit(self.fetch, self.create_url(start, end, latitude, longitude), start, end) for start, end in batches]
+
+            for future in concurrent.futures.as_completed(futures):
+                text = future.result()
+
+                if text:
+                    frames.append(pd.read_csv(io.StringIO(text), header=None, names=['Date', 'latitude', 'longitude', 'value']))
+
+        print(f"{len(batches)} requests to {self.url}")
+
+        if not frames:
+            return PrecipCube.empty(latitude, longitude)
+
+        df = pd.concat(frames, ignore_index=True)
+        df['Date'] = pd.to_datetime(df['Date']).dt.date
+        df = df[df['Date'].isin(set(date_list))].drop_duplicates(['Date', 'latitude', 'longitude'])
+
+        # Rows come time, latitude, longitude major, straight into a (time, lat, lon) block
+        df = df.sort_values(['Date', 'latitude', 'longitude'])
+        dates = df['Date'].unique()
+        latitudes = np.sort(df['latitude'].unique())
+        longitudes = np.sort(df['longitude'].unique())
+        values = df['value'].to_numpy(dtype=np.float32).reshape(len(dates), len(latitudes), len(longitudes))
+
+        # Days with invalid values are left out, as they would be missing from the archive
+        valid = ~np.isnan(values).any(axis=(1, 2))
+
+        if not valid.all():
+            print(f"Skipping {np.count_nonzero(~valid)} days with invalid values")
+
+        return PrecipCube(values[valid], dates[valid].astype('datetime64[D]'), latitudes, longitudes, np.full(np.count_nonzero(valid), self.version))
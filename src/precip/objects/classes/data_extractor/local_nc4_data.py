@@ -24,11 +24,21 @@ class LocalNC4Data(AbstractDataFromFile):
 
 
     def process_file(self, file, date_list, lon, lat, longitude, latitude):
+        result = self.process_file_boxes(file, date_list, lon, lat, [(longitude, latitude)])
+
+        return result[0] if result is not None else None
+
+
+    def process_file_boxes(self, file, date_list, lon, lat, boxes):
+        """
+        Opens the file once and returns the (date, subset, version) row of every (longitude, latitude) box,
+        None if the date of the file is not in date_list.
+        """
         #SLOWER
         if False:
             date = ReadNC4Properties(file).get_date('date')
         #FASTER
-        d = re.search('\d{8}', file)
+        d = re.search(r'\d{8}', file)
         date = datetime.strptime(d.group(0), "%Y%m%d").date()
 
         version = int(re.search(r'V(\d{2})', file).group(1))
@@ -36,27 +46,31 @@ class LocalNC4Data(AbstractDataFromFile):
         if date not in date_list:
             return None
 
+        rows = []
+
         with nc.Dataset(file) as ds:
             data = ds['precipitationCal'] if 'precipitationCal' in ds.variables else ds['precipitation']
-        # If you want to work more than one location
-        # results = []
-        # for longitude, latitude in zip(longitude_pairs, latitude_pairs):
-        # where inputs = longitude_pairs = [(10, 20), (30, 40), (50, 60)] and latitude_pairs = [(10, 20), (30, 40), (50, 60)]
-            subset = data[:,
-                        np.where(lon == longitude[0])[0][0]:np.where(lon == longitude[1])[0][0]+1,
-                        np.where(lat == latitude[0])[0][0]:np.where(lat == latitude[1])[0][0]+1]
 
-            masked_subset = np.ma.masked_invalid(subset)
+            # Regional subsets are indexed on their own grid
+            if data.shape[1:] != (len(lon), len(lat)):
+                lon = np.round(ds['lon'][:].astype(float), 2)
+                lat = np.round(ds['lat'][:].astype(float), 2)
+
+            for longitude, latitude in boxes:
+                subset = data[:,
+                            np.where(lon == longitude[0])[0][0]:np.where(lon == longitude[1])[0][0]+1,
+                            np.where(lat == latitude[0])[0][0]:np.where(lat == latitude[1])[0][0]+1]
+
+                masked_subset = np.ma.masked_invalid(subset)
 
-            if np.ma.is_masked(masked_subset):
-                invalid_positions = np.where(masked_subset.mask)
-                os.remove(file)
-                raise ValueError(f"Error converting {file} to float at positions {invalid_positions}, file has been deleted")
+                if np.ma.is_masked(masked_subset):
+                    invalid_positions = np.where(masked_subset.mask)
+                    os.remove(file)
+                    raise ValueError(f"Error converting {file} to float at positions {invalid_positions}, file has been deleted")
 
-            else:
-                subset = subset.astype(float)
+                rows.append((str(date), subset.astype(float), version))
 
-        return (str(date), subset, version)
+        return rows
 
 
     def list_files(self):
@@ -1,7 +1,7 @@
 from precip.objects.interfaces.data_managers.abstract_datasource import AbstractDataSource
 from precip.objects.interfaces.data_managers.abstract_data_from_file import AbstractDataFromFile
+from precip.objects.classes.utils.precip_cube import PrecipCube
 from precip.helper_functions import generate_coordinate_array, check_dates_downloaded
-import pandas as pd
 from tqdm import tqdm
 
 
@@ -19,7 +19,6 @@ class NC4DataSource(AbstractDataSource):
         self.data_extracted.check_duplicates()
         self.data_extracted.files = check_dates_downloaded(date_list, self.data_extracted.files)
 
-        finaldf = pd.DataFrame()
         results = []
 
         # Initialize tqdm progress bar
@@ -29,9 +28,4 @@ class NC4DataSource(AbstractDataSource):
             if result is not None:
                 results.append(result)
 
-        df1 = pd.DataFrame(results, columns=['Date', 'Precipitation', 'Version'])
-        finaldf = pd.concat([finaldf, df1], ignore_index=True, sort=False)
-
-        finaldf = finaldf.sort_values(by='Date', ascending=True).reset_index(drop=True)
-
-        return finaldf
\ No newline at end of file
+        return PrecipCube.from_rows(results, latitude, longitude)
\ No newline at end of file
@@ -1,7 +1,9 @@
 from precip.objects.interfaces.data_managers.abstract_dataloader import AbstractDataLoader
 from precip.objects.interfaces.database.abstract_database_operations import AbstractDatabaseOperations
-from tqdm import tqdm
+from precip.objects.classes.utils.precip_cube import PrecipCube
+from precip.objects.classes.utils.map_accumulator import MapAccumulator
 import pandas as pd
+import numpy as np
 import json
 
 
@@ -22,16 +24,50 @@ class Database(AbstractDataLoader):
         return df
 
 
-    def load_data(self, latitude: str, longitude: str, dataframe: pd.DataFrame):
-        # Convert the 'Precipitation' column to a string
-        dataframe['Precipitation'] = dataframe['Precipitation'].apply(lambda x: json.dumps(x.tolist()))
+    def get_cube(self, query: str, latitude: list, longitude: list) -> PrecipCube:
+        df = self.get_data(query)
 
+        return PrecipCube.from_records(df['Date'], df['Precipitation'], df['Version'], latitude, longitude)
+
+
+    def accumulate_map(self, query: str, accumulator: MapAccumulator = None) -> MapAccumulator:
+        """
+        Folds the daily grids of `query` into the accumulator one row at a time, see iter_grids.
+        """
+        accumulator = accumulator or MapAccumulator()
+
+        for _, grid in self.iter_grids(query):
+            accumulator.add(grid)
+
+        return accumulator
+
+
+    def iter_grids(self, query: str):
+        """
+        Yields the (date, (lat, lon) grid) of `query` one row at a time.
+
+        The query must be ordered by date and version (see Queries.extract_precipitation_by_date),
+        only the first row of each date is used.
+        """
+        last = None
+
+        for date, precipitation, _ in self.operator.iter_data(query):
+            if date == last:
+                continue
+
+            # Stored as (1, lon, lat)
+            grid = np.array(json.loads(precipitation), dtype=float)
+            last = date
+
+            yield date, grid.reshape(grid.shape[-2:]).T
+
+
+    def load_data(self, latitude: str, longitude: str, data: PrecipCube):
         print('-' * 50)
         print('Inserting Values in Database ...\n')
 
-        # Wrap the iterrows() loop with tqdm
-        for index, row in tqdm(dataframe.iterrows(), total=len(dataframe), desc="Inserting data", unit="row"):
-            self.operator.insert_data(latitude, longitude, row['Date'], row['Precipitation'], row['Version'])
+        # One transaction for the whole cube instead of a commit per row
+        self.operator.insert_many(latitude, longitude, data.to_rows())
 
         print('Values Inserted in Database\n')
 
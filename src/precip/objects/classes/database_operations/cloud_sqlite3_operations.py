@@ -13,6 +13,19 @@ class CloudSQLite3Operations(AbstractDatabaseOperations):
         return self.database.cursor.fetchall()
 
 
+    def iter_data(self, query: str, size: int = 256):
+        """
+        Yields the rows of `query`, fetching `size` rows at a time.
+        """
+        cursor = self.database.connection.cursor()
+        cursor.execute(query)
+
+        while rows := cursor.fetchmany(size):
+            yield from rows
+
+        cursor.close()
+
+
     def check_table(self, table: str = 'volcanoes'):
         self.database.cursor.execute('SELECT name FROM sqlite_master WHERE type="table" AND name=?', (table,))
 
@@ -28,6 +41,17 @@ class CloudSQLite3Operations(AbstractDatabaseOperations):
         self.database.connection.commit()
 
 
+    def insert_many(self, latitude: str, longitude: str, rows: list):
+        """
+        Inserts (date, precipitation, version) rows of one location in a single transaction.
+        """
+        lat = f"{latitude[0]}:{latitude[1]}"
+        lon = f"{longitude[0]}:{longitude[1]}"
+
+        self.database.cursor.executemany(Queries.insert_many_precipitation(), [(str(date), precipitation, lat, lon, int(version)) for date, precipitation, version in rows])
+        self.database.connection.commit()
+
+
     def record_exists(self, latitude: str, longitude: str, date: str):
         self.database.cursor.execute(Queries.select_row(latitude, longitude, date))
         return self.database.cursor.fetchone() is not None
\ No newline at end of file
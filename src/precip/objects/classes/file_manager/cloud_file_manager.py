@@ -1,41 +1,195 @@
 from precip.objects.interfaces.abstract_cloud_manager import AbstractCloudManager
 from precip.objects.interfaces.file_manager.abstract_cloud_file_manager import AbstractCloudFileManager
+from precip.objects.classes.utils.granule_cache import GranuleCache
+from precip.objects.classes.utils.verification_ledger import VerificationLedger
+from precip.objects.classes.utils.file_utils import validate_nc4
 from precip.download_functions import generate_urls_list
 import concurrent.futures
 import tempfile
 import time
 import os
 import re
-import netCDF4 as nc
+import shlex
 from datetime import datetime
+from precip.config import VERIFICATION_LEDGER
+
+# Runs on the provider: opens every file given on stdin in a process pool and prints `OK|BAD path`
+# Arguments are the number of processes, 0 for every CPU of the server, and the mode ('header' or 'deep')
+REMOTE_VERIFY_SCRIPT = '''
+import sys
+import multiprocessing
+import netCDF4
+
+def verify(path):
+    try:
+        with netCDF4.Dataset(path) as ds:
+            var = ds['precipitationCal'] if 'precipitationCal' in ds.variables else ds['precipitation']
+            var[:] if sys.argv[2] == 'deep' else var[0, 0, 0]
+        return 'OK', path
+    except Exception:
+        return 'BAD', path
+
+files = [line.strip() for line in sys.stdin if line.strip()]
+with multiprocessing.get_context('fork').Pool(int(sys.argv[1]) or None) as pool:
+    for status, path in pool.imap_unordered(verify, files, chunksize=4):
+        print(status, path, flush=True)
+'''
 
 class CloudFileManager(AbstractCloudFileManager):
-    def __init__(self, provider: AbstractCloudManager) -> None:
+    def __init__(self, provider: AbstractCloudManager, cache: GranuleCache = None) -> None:
         self.provider = provider
+        self.cache = cache
 
 
-    def download(self, date_list: list, parallel: int = 5):
+    def download(self, date_list: list, parallel: int = 5, batch: bool = True):
         # Connect
         self.provider.connect()
 
         # Generate the URLs
         urls = generate_urls_list(date_list)
 
-        # Use a ThreadPoolExecutor to download the files in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
-            futures = [executor.submit(self.cloud_download, url) for url in urls]
+        if batch:
+            manifest = self.batch_download(urls, parallel)
+
+        else:
+            # Use a ThreadPoolExecutor to download the files in parallel
+            with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
+                futures = [executor.submit(self.cloud_download, url) for url in urls]
+
+            manifest = None
 
         # Close the SSH client
         self.provider.close()
 
+        return manifest
+
+
+    def list_remote_files(self):
+        """
+        Lists the .nc4 files on the server with a single remote command.
+
+        Returns:
+            set: The file names (without path) found in the provider folder.
+        """
+        stdin, stdout, stderr = self.provider.ssh.exec_command(f'ls -1 {shlex.quote(self.provider.path)}')
+
+        # Read before waiting, a listing larger than the channel window would block the command otherwise
+        listing = stdout.read().decode()
+        stderr.read()
+        stdout.channel.recv_exit_status()
+
+        return {f for f in listing.splitlines() if f.endswith('.nc4')}
+
+
+    def batch_download(self, urls: list, parallel: int = 5):
+        """
+        Downloads the missing files on the server with one listing and one remote job.
+
+        The remote job reads the URLs from stdin and runs `wget` through `xargs -P`, each file is written
+        to a `.part` file and renamed once complete. Progress is streamed back over the channel.
+
+        Args:
+            urls (list): The URLs of the files to download.
+            parallel (int): Number of concurrent downloads on the server (default: 5).
+
+        Returns:
+            dict: Manifest with the 'skipped', 'downloaded' and 'failed' URLs.
+        """
+        manifest = {'skipped': [], 'downloaded': [], 'failed': []}
+        existing = self.list_remote_files()
+        missing = []
+
+        for url in urls:
+            if os.path.basename(url) in existing:
+                manifest['skipped'].append(url)
+
+            else:
+                missing.append(url)
+
+        print(f"{len(manifest['skipped'])} files already on the server, {len(missing)} to download")
+
+        if not missing:
+            return manifest
+
+        job = (
+            'f=$(basename "$1"); '
+            'if wget -q --tries=3 -O "$f.part" "$1" && mv "$f.part" "$f"; '
+            'then echo "OK $1"; else rm -f "$f.part"; echo "FAIL $1"; fi'
+        )
+        command = f'cd {shlex.quote(self.provider.path)} && xargs -n 1 -P {int(parallel)} sh -c {shlex.quote(job)} _'
+
+        stdin, stdout, stderr = self.provider.ssh.exec_command(command)
+        stdin.write('\n'.join(missing) + '\n')
+        stdin.flush()
+        stdin.channel.shutdown_write()
+
+        for line in iter(stdout.readline, ''):
+            status, _, url = line.strip().partition(' ')
+
+            if status == 'OK':
+                manifest['downloaded'].append(url)
+
+            elif status == 'FAIL':
+                manifest['failed'].append(url)
+
+            else:
+                continue
+
+            done = len(manifest['downloaded']) + len(manifest['failed'])
+            print(f"\r[{done}/{len(missing)}] {status} {os.path.basename(url)}", end="")
 
-    def check_files(self):
+        stdout.channel.recv_exit_status()
+        print('')
+
+        # Anything the job did not report on is treated as failed
+        reported = set(manifest['downloaded']) | set(manifest['failed'])
+        manifest['failed'].extend(url for url in missing if url not in reported)
+
+        print(f"Downloaded: {len(manifest['downloaded'])}, failed: {len(manifest['failed'])}")
+
+        if manifest['failed']:
+            print(f"Failed downloads: {manifest['failed']}")
+
+        return manifest
+
+
+    def check_files(self, remote: bool = False, parallel: int = None, mode: str = 'header'):
         # Connect
         self.provider.connect()
 
+        if remote:
+            corrupted_files = self.verify_remote(parallel, mode)
+
+        else:
+            corrupted_files = self.verify_local(mode)
+
+        if len(corrupted_files) > 0:
+            print(f"Corrupted files found: {corrupted_files}")
+            print(f"Total corrupted files: {len(corrupted_files)}")
+            print('Retrying download of corrupted files...')
+            date_list=[]
+
+            for f in corrupted_files:
+                d = re.search('\d{8}', f)
+                date_list.append(datetime.strptime(d.group(0), "%Y%m%d").date())
+
+            self.download(date_list)
+
+        else:
+            print('')
+            print('No corrupted files found')
+
+        print('All files have been checked')
+        print('-----------------------------------------------')
+
+        # Close the SSH client
+        self.provider.close()
+
+
+    def verify_local(self, mode: str = 'header'):
         stdin, stdout, stderr = self.provider.ssh.exec_command(f'ls {self.provider.path}/*.nc4')
         files = stdout.read().decode().splitlines()
-        client = self.provider.ssh.open_sftp()
+        client = self.provider.open_sftp()
         corrupted_files = []
         print(f'Checking for corrupted files in {self.provider.path} ...')
         for file in files:
@@ -43,42 +197,101 @@ class CloudFileManager(AbstractCloudFileManager):
                 # Try to open the file with netCDF4
                 print(f"\rChecking file: {file}", end="")
 
+                # Not through the granule cache, a sweep of the archive would evict the working set
                 with tempfile.NamedTemporaryFile(suffix='.nc4', delete=True) as tmp:
 
                     # Download the file to your local system
                     client.get(file, tmp.name)
 
                     # Open the NetCDF file
-                    ds = nc.Dataset(tmp.name)
-                    ds.close()
+                    validate_nc4(tmp.name, deep=(mode == 'deep'))
 
             except:
                 print(f"File is corrupted: {file}")
                 client.remove(file)
+
+                if self.cache is not None:
+                    self.cache.discard(file)
+
                 print(f"Corrupted file has been deleted: {file}")
                 corrupted_files.append(file)
 
-        if len(corrupted_files) > 0:
-            print(f"Corrupted files found: {corrupted_files}")
-            print(f"Total corrupted files: {len(corrupted_files)}")
-            print('Retrying download of corrupted files...')
-            date_list=[]
+        return corrupted_files
 
-            for f in corrupted_files:
-                d = re.search('\d{8}', f)
-                date_list.append(datetime.strptime(d.group(0), "%Y%m%d").date())
 
-            self.download(date_list)
+    def verify_remote(self, parallel: int = None, mode: str = 'header'):
+        """
+        Verifies the archive on the server itself, only the names of the corrupted files travel back.
 
-        else:
-            print('')
-            print('No corrupted files found')
+        Files already verified and unchanged since are skipped using the ledger stored next to the data.
 
-        print('All files have been checked')
-        print('-----------------------------------------------')
+        Args:
+            parallel (int): Number of worker processes on the server, defaults to the number of CPUs of the server.
+            mode (str): 'header' reads the precipitation header, 'deep' decompresses the whole variable.
 
-        # Close the SSH client
-        self.provider.close()
+        Returns:
+            list: The corrupted files, already removed from the server.
+        """
+        client = self.provider.open_sftp()
+        ledger = VerificationLedger(os.path.join(self.provider.path, VERIFICATION_LEDGER), client.file).load()
+
+        # One listing with size and modification time
+        stdin, stdout, stderr = self.provider.ssh.exec_command(f"find {shlex.quote(self.provider.path)} -maxdepth 1 -name '*.nc4' -printf '%s %T@ %p\\n'")
+        stats = {}
+
+        for line in stdout.read().decode().splitlines():
+            size, mtime, file = line.split(' ', 2)
+            stats[file] = (int(size), float(mtime))
+
+        pending = [file for file, (size, mtime) in stats.items() if not ledger.is_verified(file, size, mtime, mode)]
+
+        print(f'Checking for corrupted files in {self.provider.path} on the server ({mode} mode)...')
+        print(f'{len(stats) - len(pending)} files already verified, {len(pending)} to check')
+
+        if not pending:
+            return []
+
+        stdin, stdout, stderr = self.provider.ssh.exec_command(f'python3 -c {shlex.quote(REMOTE_VERIFY_SCRIPT)} {int(parallel or 0)} {shlex.quote(mode)}')
+        stdin.write('\n'.join(pending) + '\n')
+        stdin.flush()
+        stdin.channel.shutdown_write()
+
+        corrupted_files = []
+        checked = 0
+
+        for line in iter(stdout.readline, ''):
+            status, _, file = line.strip().partition(' ')
+
+            if status not in ('OK', 'BAD'):
+                continue
+
+            checked += 1
+            print(f"\r[{checked}/{len(pending)}] {os.path.basename(file)}", end="")
+
+            ledger.record(file, *stats[file], valid=(status == 'OK'), mode=mode)
+
+            if status == 'BAD':
+                corrupted_files.append(file)
+
+        if stdout.channel.recv_exit_status() != 0:
+            ledger.save()
+            msg = f"Remote verification failed: {stderr.read().decode()}"
+            raise ValueError(msg)
+
+        print('')
+
+        for file in corrupted_files:
+            client.remove(file)
+            ledger.forget(file)
+
+            if self.cache is not None:
+                self.cache.discard(file)
+
+            print(f"Corrupted file has been deleted: {file}")
+
+        ledger.save()
+
+        return corrupted_files
 
 
     def cloud_download(self, url):
@@ -0,0 +1,342 @@
+import os
+import json
+import time
+import random
+import tempfile
+import threading
+import heapq
+import itertools
+import concurrent.futures
+from urllib.parse import urlparse
+from precip.objects.classes.file_manager.http_downloader import HTTPDownloader, url_filename
+from precip.objects.classes.utils.verification_ledger import VerificationLedger
+from precip.objects.classes.utils.file_lock import FileLock
+
+QUEUE_FILE = '.download_queue.json'
+
+# Responses meaning the server is throttling or temporarily unavailable
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+
+def throttled(result: dict) -> bool:
+    """
+    True if a download failed because the server is throttling or unreachable, as opposed to a missing file (4xx)
+    or a broken one, which say nothing about the load of the host.
+    """
+    return result['status'] == 'failed' and not result['invalid'] and (result['code'] is None or result['code'] in RETRYABLE_CODES)
+
+
+# Priority classes, lower runs first
+INTERACTIVE = 0
+BACKFILL = 1
+
+
+class DownloadScheduler:
+    """
+    Adaptive download scheduler for GES DISC.
+
+    Concurrency starts low and grows by one while the throughput keeps improving and no error shows up,
+    it is halved as soon as the server throttles (additive increase, multiplicative decrease). Each host
+    gets an exponential backoff with jitter after a connection error or a 429/5xx response, files missing
+    from the server (4xx) are recorded without slowing down the host. Failed URLs go back in the queue instead of
+    aborting the run, and the queue is persisted in the download folder so an interrupted backfill resumes
+    where it stopped. Processes sharing the folder merge their entries in the queue file under a lock.
+
+    The queue is ordered by priority class: the dates needed by the current query (INTERACTIVE) go first
+    and are handed to `on_complete` as soon as each file lands, the backfill of the rest of the archive
+    (BACKFILL) runs afterwards, in the background if requested.
+
+    Args:
+        folder (str): The destination folder, also holding the persisted queue.
+        max_parallel (int): Upper bound for the number of concurrent downloads (default: 5).
+        min_parallel (int): Starting number of concurrent downloads (default: 2).
+        max_attempts (int): Attempts per URL before it is given up for this run (default: 8).
+        base_delay (float): First backoff delay in seconds (default: 2).
+        max_delay (float): Maximum backoff delay in seconds (default: 300).
+        ledger (VerificationLedger): Ledger where the validated files are recorded (default: None).
+    """
+    def __init__(self, folder: str, max_parallel: int = 5, min_parallel: int = 2, max_attempts: int = 8,
+                 base_delay: float = 2, max_delay: float = 300, ledger: VerificationLedger = None) -> None:
+        self.folder = folder
+        self.max_parallel = max(1, max_parallel)
+        self.concurrency = max(1, min(min_parallel, self.max_parallel))
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.queue_path = os.path.join(folder, QUEUE_FILE)
+        self.queue_lock = FileLock(self.queue_path + '.lock')
+        self.ledger = ledger
+        self.downloader = HTTPDownloader(attempts=1, ledger=ledger)
+        self.lock = threading.Lock()
+
+        self.pending = []
+        self.sequence = itertools.count()
+        self.attempts = {}
+        self.failed = []
+        self.done = set()
+        self.host_errors = {}
+        self.host_ready = {}
+        self.last_save = 0.0
+
+
+    def read_queue(self) -> dict:
+        try:
+            with open(self.queue_path, 'r') as f:
+                return json.load(f)
+
+        except (OSError, ValueError):
+            return {}
+
+
+    def load_queue(self) -> None:
+        with self.queue_lock:
+            state = self.read_queue()
+
+        # Leftovers of previous runs are backfill, URLs given up get a fresh set of attempts
+        for url in state.get('pending', []) + state.get('failed', []):
+            self.push(url, BACKFILL)
+
+        self.attempts = {url: n for url, n in state.get('attempts', {}).items() if url not in state.get('failed', [])}
+
+        if self.pending:
+            print(f'Resuming {len(self.pending)} queued downloads from {self.queue_path}')
+
+
+    def save_queue(self, force: bool = True) -> None:
+        # Rewriting a multi-year queue after every file would cost more than the download itself
+        if not force and time.time() - self.last_save < 5:
+            return
+
+        self.last_save = time.time()
+
+        with self.lock:
+            pending = [url for _, _, url in sorted(self.pending)]
+            attempts = dict(self.attempts)
+            failed = list(self.failed)
+            done = set(self.done)
+
+        with self.queue_lock:
+            state = self.read_queue()
+
+            # Entries of other processes sharing the folder are kept, unless this one has completed them
+            own = set(pending) | set(failed) | done
+            pending += [url for url in state.get('pending', []) if url not in own]
+            failed += [url for url in state.get('failed', []) if url not in own and url not in pending]
+            other = {url: n for url, n in state.get('attempts', {}).items() if url not in done}
+            state = {'pending': list(dict.fromkeys(pending)), 'attempts': {**other, **attempts}, 'failed': failed}
+
+            if not state['pending'] and not state['failed']:
+                if os.path.exists(self.queue_path):
+                    os.remove(self.queue_path)
+
+            else:
+                fd, tmp = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(state, f)
+
+                os.replace(tmp, self.queue_path)
+
+        if self.ledger is not None:
+            self.ledger.save()
+
+
+    def backoff(self, host: str) -> None:
+        with self.lock:
+            errors = self.host_errors.get(host, 0) + 1
+            self.host_errors[host] = errors
+            delay = min(self.max_delay, self.base_delay * 2 ** (errors - 1))
+
+            # Full jitter so that the workers do not retry in lockstep
+            self.host_ready[host] = time.time() + random.uniform(0, delay)
+
+
+    def wait_host(self, host: str) -> None:
+        delay = self.host_ready.get(host, 0) - time.time()
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+    def fetch(self, url: str) -> dict:
+        host = urlparse(url).hostname
+        self.wait_host(host)
+
+        result = self.downloader.fetch(url, self.folder)
+
+        if throttled(result):
+            self.backoff(host)
+
+        elif result['status'] != 'failed':
+            with self.lock:
+                self.host_errors[host] = 0
+
+        return result
+
+
+    def adapt(self, window: list, elapsed: float, previous: float) -> float:
+        """
+        Updates the concurrency from the results of the last window of downloads.
+
+        Returns:
+            float: The throughput of the window in bytes/s.
+        """
+        throughput = sum(r['bytes'] for r in window) / max(elapsed, 1e-6)
+        if any(throttled(r) for r in window):
+            self.concurrency = max(1, self.concurrency // 2)
+            print(f'\nServer errors, concurrency reduced to {self.concurrency}')
+
+        elif throughput > previous * 1.05 and self.concurrency < self.max_parallel:
+            self.concurrency += 1
+            print(f'\nThroughput {throughput / 1024 ** 2:.2f} MB/s, concurrency increased to {self.concurrency}')
+
+        return throughput
+
+
+    def push(self, url: str, priority: int = INTERACTIVE) -> None:
+        with self.lock:
+            heapq.heappush(self.pending, (priority, next(self.sequence), url))
+
+
+    def pop(self) -> tuple:
+        with self.lock:
+            priority, _, url = heapq.heappop(self.pending)
+
+        return priority, url
+
+
+    def download(self, urls: list, on_complete=None, backfill: list = None, background: bool = False) -> list:
+        """
+        Downloads the URLs first, then the backfill URLs and anything left in the persisted queue.
+
+        Args:
+            urls (list): The URLs needed now.
+            on_complete (callable): Called with the result of each of `urls` as soon as its file is available.
+            backfill (list): Lower priority URLs, e.g. the rest of the archive (default: None).
+            background (bool): Return as soon as `urls` are done and keep backfilling in a daemon thread.
+                               Whatever is left when the process exits stays in the persisted queue.
+                               In the foreground only `urls` are downloaded, the backfill is persisted
+                               for the next background run.
+
+        Returns:
+            list: One result dictionary per URL of `urls` (see HTTPDownloader.fetch).
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        self.load_queue()
+
+        queued = {url for _, _, url in self.pending}
+        requested = list(dict.fromkeys(urls))
+        self.interactive = set(requested)
+        self.interactive_done = threading.Event()
+        self.failed = []
+
+        # Requested URLs already queued by a previous run are promoted
+        self.pending = [item for item in self.pending if item[2] not in self.interactive]
+        heapq.heapify(self.pending)
+
+        for url in requested:
+            self.push(url, INTERACTIVE)
+
+        for url in backfill or []:
+            if url not in queued and url not in self.interactive:
+                self.push(url, BACKFILL)
+
+        self.save_queue()
+
+        self.results = []
+        self.on_complete = on_complete
+
+        if not background:
+            self.run(INTERACTIVE)
+            return self.results
+
+        self.backfill_thread = threading.Thread(target=self.run, name='precip-backfill', daemon=True)
+        self.backfill_thread.start()
+        self.interactive_done.wait()
+
+        return list(self.results)
+
+
+    def run(self, until: int = BACKFILL) -> None:
+        """
+        Downloads the queue down to the priority class `until`, lower priority entries stay in the queue.
+        """
+        window = []
+        window_start = time.time()
+        throughput = 0.0
+        running = {}
+
+        if not self.interactive:
+            self.interactive_done.set()
+
+        # A failing on_complete stops the run, the waiting caller must be released all the same
+        try:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_parallel) as executor:
+                while running or (self.pending and self.pending[0][0] <= until):
+                    while self.pending and self.pending[0][0] <= until and len(running) < self.concurrency:
+                        priority, url = self.pop()
+                        running[executor.submit(self.fetch, url)] = (priority, url)
+
+                    done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+
+                    for future in done:
+                        priority, url = running.pop(future)
+                        result = future.result()
+                        window.append(result)
+                        filename = url_filename(url)
+                        finished = True
+
+                        if result['status'] == 'failed':
+                            with self.lock:
+                                attempt = self.attempts[url] = self.attempts.get(url, 0) + 1
+
+                            missing = result['code'] is not None and 400 <= result['code'] < 500 and result['code'] not in RETRYABLE_CODES
+
+                            if attempt < self.max_attempts and not missing:
+                                # Back in the queue, the host backoff spaces out the retries
+                                self.push(url, priority)
+                                finished = False
+
+                            elif missing:
+                                # Not on the server, retrying in the next runs would not help
+                                with self.lock:
+                                    self.attempts.pop(url, None)
+                                    self.done.add(url)
+
+                            else:
+                                self.failed.append(url)
+
+                            print(f"\nDownload attempt {attempt} failed for {url}: {result['error']}")
+
+                        else:
+                            with self.lock:
+                                self.attempts.pop(url, None)
+                                self.done.add(url)
+
+                            if result['status'] == 'downloaded':
+                                print(f"\rFinished download of {filename} [{len(self.pending)} queued, concurrency {self.concurrency}]", end="")
+
+                        if finished and url in self.interactive:
+                            self.results.append(result)
+
+                            if self.on_complete is not None and result['status'] != 'failed':
+                                # The file is complete on disk, hand it over straight away
+                                self.on_complete(result)
+
+                            if len(self.results) == len(self.interactive):
+                                self.interactive_done.set()
+
+                        self.save_queue(force=False)
+
+                    if len(window) >= self.concurrency:
+                        throughput = self.adapt(window, time.time() - window_start, throughput)
+                        window = []
+                        window_start = time.time()
+
+        finally:
+            self.save_queue()
+            self.interactive_done.set()
+
+        print('')
+
+        if self.failed:
+            print(f'{len(self.failed)} files could not be downloaded, they are kept in {self.queue_path} for the next run')
@@ -0,0 +1,279 @@
+import os
+import time
+import threading
+import concurrent.futures
+import requests
+from requests.adapters import HTTPAdapter
+from precip.objects.classes.utils.file_utils import validate_nc4
+from precip.objects.classes.utils.verification_ledger import VerificationLedger
+from precip.objects.classes.utils.file_lock import FileLock
+
+EARTHDATA_HOST = 'urs.earthdata.nasa.gov'
+LOCK_FOLDER = '.locks'
+
+
+def url_filename(url: str) -> str:
+    """
+    Returns the name of the file downloaded from `url`.
+
+    The query of OPeNDAP subset URLs is dropped, as well as the response suffix appended to the granule name
+    (`<granule>.nc4.nc4` is saved as `<granule>.nc4`), so regional files keep the name of the global granule.
+    """
+    name = os.path.basename(requests.utils.urlparse(url).path)
+
+    if name.endswith('.nc4.nc4'):
+        name = name[:-len('.nc4')]
+
+    return name
+
+
+class EarthdataSession(requests.Session):
+    """
+    Session that keeps the Earthdata credentials across the GES DISC <-> URS redirects.
+
+    The credentials are read from ~/.netrc and the URS cookies are kept in the session,
+    so authentication happens once per worker and not once per file.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self.auth = requests.utils.get_netrc_auth(f'https://{EARTHDATA_HOST}')
+
+
+    def rebuild_auth(self, prepared_request, response):
+        headers = prepared_request.headers
+
+        if 'Authorization' in headers:
+            original = requests.utils.urlparse(response.request.url).hostname
+            redirect = requests.utils.urlparse(prepared_request.url).hostname
+
+            # Only strip the credentials when leaving for a host that is not Earthdata
+            if original != redirect and EARTHDATA_HOST not in (original, redirect):
+                del headers['Authorization']
+
+
+class HTTPDownloader:
+    """
+    Concurrent in-process HTTP downloader.
+
+    Every worker thread keeps its own keep-alive session. Files are written to a `.part` file which is
+    renamed once complete, and partial files left by an interrupted run are resumed with Range requests.
+    A per-file lock makes concurrent jobs sharing the folder wait for the process already fetching a file
+    instead of downloading it a second time. Each file is validated before the rename (size, HDF5 signature,
+    precipitation header) and recorded in the verification ledger, if one is given.
+
+    Args:
+        parallel (int): Number of concurrent downloads (default: 5).
+        attempts (int): Attempts per file before giving up (default: 3).
+        timeout (float): Connect/read timeout in seconds (default: 60).
+        ledger (VerificationLedger): Ledger where the validated files are recorded (default: None).
+    """
+    CHUNK = 1024 * 1024
+
+
+    def __init__(self, parallel: int = 5, attempts: int = 3, timeout: float = 60, ledger: VerificationLedger = None) -> None:
+        self.parallel = parallel
+        self.attempts = attempts
+        self.timeout = timeout
+        self.ledger = ledger
+        self.local = threading.local()
+
+
+    def session(self) -> requests.Session:
+        if not hasattr(self.local, 'session'):
+            session = EarthdataSession()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self.local.session = session
+
+        return self.local.session
+
+
+    def fetch(self, url: str, folder: str) -> dict:
+        """
+        Downloads a single file in `folder`, resuming a previous partial download if present.
+
+        Args:
+            url (str): The URL of the file.
+            folder (str): The destination folder.
+
+        Returns:
+            dict: Result with 'url', 'path', 'status' ('downloaded', 'skipped' or 'failed'), 'bytes', 'seconds',
+                  'error', the HTTP status 'code' of the last failure and 'invalid' if the file failed validation.
+        """
+        path = os.path.join(os.path.abspath(folder), url_filename(url))
+        result = {'url': url, 'path': path, 'status': 'skipped', 'bytes': 0, 'seconds': 0.0, 'error': None, 'code': None, 'invalid': False}
+
+        if os.path.exists(path):
+            return result
+
+        lock = FileLock(os.path.join(folder, LOCK_FOLDER, os.path.basename(path) + '.lock'))
+
+        if not lock.acquire(blocking=False):
+            print(f"\rWaiting for {os.path.basename(path)}, being downloaded by another process", end="")
+            lock.acquire()
+
+        try:
+            # The process holding the lock before us may have completed the file
+            if os.path.exists(path):
+                return result
+
+            return self.locked_fetch(url, path, result)
+
+        finally:
+            lock.release()
+
+
+    def locked_fetch(self, url: str, path: str, result: dict) -> dict:
+        part = path + '.part'
+        start = time.time()
+
+        for attempt in range(1, self.attempts + 1):
+            try:
+                transferred, expected = self.stream(url, part)
+                result['bytes'] += transferred
+
+                if path.endswith('.nc4'):
+                    self.validate(part, expected)
+
+                os.replace(part, path)
+                result['status'] = 'downloaded'
+                result['invalid'] = False
+
+                if self.ledger is not None:
+                    stat = os.stat(path)
+                    self.ledger.record(path, stat.st_size, stat.st_mtime, True)
+
+                break
+
+            except (requests.exceptions.RequestException, OSError) as e:
+                result['error'] = str(e)
+                response = getattr(e, 'response', None)
+                result['code'] = response.status_code if response is not None else None
+
+                if attempt < self.attempts:
+                    print(f"Download attempt {attempt} failed for {url}. Retrying... Error: {e}")
+                    time.sleep(1)
+
+            except ValueError as e:
+                # Broken file, start the next attempt from scratch
+                result['error'] = str(e)
+                result['code'] = None
+                result['invalid'] = True
+
+                if os.path.exists(part):
+                    os.remove(part)
+
+                if attempt < self.attempts:
+                    print(f"Downloaded file is not valid: {e}. Retrying...")
+
+        else:
+            result['status'] = 'failed'
+
+        result['seconds'] = time.time() - start
+
+        return result
+
+
+    def validate(self, part: str, expected: int = None) -> None:
+        """
+        Validates a downloaded file before it is moved in place.
+
+        Raises:
+            ValueError: If the file is incomplete or unreadable.
+        """
+        validate_nc4(part, expected)
+
+
+    def stream(self, url: str, part: str) -> tuple:
+        """
+        Streams `url` into `part`, appending to it when the server honours the Range request.
+
+        Returns:
+            tuple: Number of bytes transferred and the full size announced by the server (None if unknown).
+        """
+        offset = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        transferred = 0
+
+        with self.session().get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416:
+                # Nothing left to fetch, the partial file is complete
+                return 0, None
+
+            response.raise_for_status()
+
+            # 200 means the server ignored the Range header, start over
+            mode = 'ab' if response.status_code == 206 else 'wb'
+            expected = self.expected_size(response)
+
+            with open(part, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.CHUNK):
+                    f.write(chunk)
+                    transferred += len(chunk)
+
+        return transferred, expected
+
+
+    @staticmethod
+    def expected_size(response: requests.Response):
+        """
+        Full size of the file from Content-Range (partial response) or Content-Length.
+        """
+        if response.headers.get('Content-Encoding'):
+            # Content-Length refers to the encoded body
+            return None
+
+        if response.status_code == 206:
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            return int(total) if total.isdigit() else None
+
+        length = response.headers.get('Content-Length')
+
+        return int(length) if length and length.isdigit() else None
+
+
+    def download(self, urls: list, folder: str) -> list:
+        """
+        Downloads the URLs concurrently in `folder`.
+
+        Args:
+            urls (list): The URLs to download.
+            folder (str): The destination folder.
+
+        Returns:
+            list: One result dictionary per URL, see `fetch`.
+        """
+        os.makedirs(folder, exist_ok=True)
+        results = []
+        start = time.time()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.parallel) as executor:
+            futures = [executor.submit(self.fetch, url, folder) for url in urls]
+
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                results.append(result)
+                filename = os.path.basename(result['path'])
+
+                if result['status'] == 'downloaded':
+                    rate = result['bytes'] / max(result['seconds'], 1e-6) / 1024 ** 2
+                    print(f"Finished download of {filename} ({result['bytes'] / 1024 ** 2:.1f} MB, {rate:.2f} MB/s)")
+
+                elif result['status'] == 'skipped':
+                    print(f"\rFile {filename} already exists, skipping download. ", end="")
+
+                else:
+                    print(f"Failed to download {result['url']} after {self.attempts} attempts")
+
+        if self.ledger is not None:
+            self.ledger.save()
+
+        elapsed = time.time() - start
+        downloaded = [r for r in results if r['status'] == 'downloaded']
+        total = sum(r['bytes'] for r in downloaded)
+
+        print('')
+        print(f"Downloaded {len(downloaded)} files, {total / 1024 ** 2:.1f} MB in {elapsed:.1f} s ({total / max(elapsed, 1e-6) / 1024 ** 2:.2f} MB/s)")
+
+        return results
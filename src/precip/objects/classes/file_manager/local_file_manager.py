@@ -1,73 +1,130 @@
 from precip.objects.interfaces.file_manager.abstract_file_manager import AbstractFileManager
-from precip.download_functions import generate_urls_list
+from precip.objects.classes.file_manager.download_scheduler import DownloadScheduler
+from precip.objects.classes.utils.verification_ledger import VerificationLedger
+from precip.objects.classes.utils.file_utils import validate_nc4
+from precip.download_functions import generate_urls_list, generate_subset_url, subset_folder
 import concurrent.futures
-import time
 import os
 import re
-import netCDF4 as nc
 from datetime import datetime
-import threading
-import subprocess
+from precip.config import VERIFICATION_LEDGER, OPENDAP_URL
 
 
 class LocalFileManager(AbstractFileManager):
     def __init__(self, folder: str):
         self.folder = folder
+        self.ledger_path = os.path.join(self.folder, VERIFICATION_LEDGER)
 
 
-    def download(self, date_list: list, parallel: int = 5):
+    def download(self, date_list: list, parallel: int = 5, on_complete=None, backfill: list = None):
+        """
+        Downloads the files of the given dates first, then the optional backfill dates in the background.
+
+        Args:
+            date_list (list): The dates needed now.
+            parallel (int): Maximum number of parallel downloads.
+            on_complete (callable): Called with each downloaded (or already present) file of `date_list` as soon as it is available.
+            backfill (list): Lower priority dates, downloaded in the background once `date_list` is done.
+
+        Returns:
+            list: One result dictionary per date of `date_list` (see HTTPDownloader.fetch).
+        """
         os.makedirs(self.folder, exist_ok=True)
         urls = generate_urls_list(date_list)
+        backfill_urls = generate_urls_list(backfill) if backfill else None
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=parallel) as executor:
-            for url in urls:
-                filename = os.path.basename(url)
-                file_path = os.path.join(self.folder, filename)
-
-                if not os.path.exists(file_path):
-                    print(f"Starting download of {url} on {threading.current_thread().name}")
-                    attempts = 0
-
-                    while attempts < 3:
-                        try:
-                            subprocess.run(['wget', url, '-P', self.folder], check=True)
-                            print(f"Finished download of {url} on {threading.current_thread().name}")
-                            break
-
-                        except subprocess.CalledProcessError:
-                            attempts += 1
-                            print(f"Download attempt {attempts} failed for {url}. Retrying...")
-                            time.sleep(1)
-
-                    else:
-                        msg = f"Failed to download {url} after {attempts} attempts. Exiting..."
-                        raise ValueError(msg)
-                else:
-                    print(f"\rFile {filename} already exists, skipping download. ", end="")
-                    time.sleep(0.001)
+        # Files are validated as they land, later checks skip them
+        ledger = VerificationLedger(self.ledger_path).load()
+        self.scheduler = DownloadScheduler(self.folder, max_parallel=parallel, ledger=ledger)
+        results = self.scheduler.download(urls, on_complete, backfill_urls, background=bool(backfill))
 
-        print('')
         print('All files have been downloaded')
         print('-----------------------------------------------')
 
+        return results
+
+
+    def download_regions(self, date_list: list, regions: list, parallel: int = 5, opendap_url: str = OPENDAP_URL):
+        """
+        Downloads server-side subsets of the given bounding boxes instead of the global granules.
+
+        Each box is stored in its own folder (see subset_folder), which can be read with LocalNC4Data.
+
+        Args:
+            date_list (list): The dates to download.
+            regions (list): (latitude, longitude) pairs of [min, max] lists, on the GPM grid.
+            parallel (int): Maximum number of parallel downloads.
+            opendap_url (str): Base URL of the OPeNDAP server.
+
+        Returns:
+            dict: The result dictionaries of each regional folder.
+        """
+        results = {}
+
+        for latitude, longitude in regions:
+            folder = subset_folder(self.folder, latitude, longitude)
+            os.makedirs(folder, exist_ok=True)
+
+            print(f"Downloading region latitude {latitude}, longitude {longitude} in {folder}")
+
+            urls = [generate_subset_url(date, latitude, longitude, opendap_url) for date in date_list]
+            ledger = VerificationLedger(os.path.join(folder, VERIFICATION_LEDGER)).load()
+            results[folder] = DownloadScheduler(folder, max_parallel=parallel, ledger=ledger).download(urls)
+
+        print('All regions have been downloaded')
+        print('-----------------------------------------------')
+
+        return results
+
+
+    def check_files(self, mode: str = 'header', workers: int = None, parallel: int = 5):
+        """
+        Checks the integrity of the archive in a process pool and re-downloads the corrupted days in one batch.
 
-    def check_files(self):
+        Results are saved in the verification ledger as they come, so an interrupted check resumes and
+        unchanged files are skipped by the next one.
+
+        Args:
+            mode (str): 'header' opens each file and reads the precipitation header, 'deep' decompresses the whole variable.
+            workers (int): Number of processes, defaults to the number of CPUs.
+            parallel (int): Maximum number of parallel downloads for the corrupted days.
+        """
         # Get a list of all .nc4 files in the directory
-        files = [self.folder + '/' + f for f in os.listdir(self.folder) if f.endswith('.nc4')]
+        # Same keys as the downloader's ledger records, whatever the form of the folder path
+        folder = os.path.abspath(self.folder)
+        files = [os.path.join(folder, f) for f in os.listdir(folder) if f.endswith('.nc4')]
         corrupted_files = []
-        print(f'Checking for corrupted files in {self.folder}...')
-        for file in files:
-            try:
-                # Try to open the file with netCDF4
-                print(f"\rChecking file: {file}", end="")
-                ds = nc.Dataset(file)
-                ds.close()
-
-            except:
-                print(f"File is corrupted: {file}")
-                os.remove(file)
-                print(f"Corrupted file has been deleted: {file}")
-                corrupted_files.append(file)
+        ledger = VerificationLedger(self.ledger_path).load()
+
+        # Only new or changed files need to be opened
+        stats = {file: os.stat(file) for file in files}
+        pending = [file for file in files if not ledger.is_verified(file, stats[file].st_size, stats[file].st_mtime, mode)]
+
+        print(f'Checking for corrupted files in {self.folder} ({mode} mode)...')
+        print(f'{len(files) - len(pending)} files already verified, {len(pending)} to check')
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(check_file, pending, [mode == 'deep'] * len(pending), chunksize=16)
+
+            for i, (file, error) in enumerate(results, start=1):
+                print(f"\r[{i}/{len(pending)}] Checking file: {os.path.basename(file)}", end="")
+
+                if error is None:
+                    ledger.record(file, stats[file].st_size, stats[file].st_mtime, True, mode)
+
+                else:
+                    print(f"\nFile is corrupted: {error}")
+                    corrupted_files.append(file)
+
+                if i % 500 == 0:
+                    ledger.save()
+
+        for file in corrupted_files:
+            os.remove(file)
+            ledger.forget(file)
+            print(f"Corrupted file has been deleted: {file}")
+
+        ledger.save()
 
         if len(corrupted_files) > 0:
             print(f"Corrupted files found: {corrupted_files}")
@@ -79,8 +136,24 @@ class LocalFileManager(AbstractFileManager):
                 d = re.search('\d{8}', f)
                 date_list.append(datetime.strptime(d.group(0), "%Y%m%d").date())
 
-            self.download(self.folder, date_list, self.parallel)
+            # A single download job for all the corrupted days
+            self.download(date_list, parallel)
 
         else:
             print()
-            print('No corrupted files found')
\ No newline at end of file
+            print('No corrupted files found')
+
+
+def check_file(file: str, deep: bool = False):
+    """
+    Process pool worker: validates a single file.
+
+    Returns:
+        tuple: The file and the error message, None if the file is valid.
+    """
+    try:
+        validate_nc4(file, deep=deep)
+        return file, None
+
+    except ValueError as e:
+        return file, str(e)
@@ -9,10 +9,12 @@ import pandas as pd
 import numpy as np
 
 from precip.objects.classes.configuration import PlotConfiguration
+from precip.objects.classes.utils.precip_cube import PrecipCube
+from precip.objects.classes.utils.map_accumulator import MapAccumulator
 from precip.objects.interfaces.plotter.plotter import Plotter
 from precip.objects.interfaces.plotter.event_plotter import EventsPlotter
 
-from precip.helper_functions import  weekly_monthly_yearly_precipitation, from_nested_to_float, map_eruption_colors, days_in_month
+from precip.helper_functions import  weekly_monthly_yearly_precipitation, map_eruption_colors, days_in_month
 from precip.config import ELNINOS
 
 
@@ -26,17 +28,17 @@ class MapPlotter(Plotter):
     def plot(self, data):
         data = self.modify_dataframe(data)
 
-        if type(data) == pd.DataFrame:
-            data = data.get('Precipitation')[0][0]
-
-        elif type(data) == dict:
-            data = data[self.config.date_list[0].strftime('%Y-%m-%d')]
-
-        data = np.flip(data.transpose(), axis=0)
+        # (lat, lon) map, north up
+        data = np.flip(data, axis=0)
 
         if not self.config.vlim:
             vmin = 0
-            vmax = data.max()
+            vmax = np.nanmax(data)
+
+            # Anomalies centered on zero
+            if getattr(self.config, 'anomaly', None):
+                vmax = np.nanmax(np.abs(data))
+                vmin = -vmax
 
         else:
             vmin = self.config.vlim[0]
@@ -97,24 +99,16 @@ class MapPlotter(Plotter):
         return self.ax
 
 
-    def interpolate_map(self, dataframe):
+    def interpolate_map(self, values):
         """
         Interpolates a precipitation map using scipy.interpolate.interp2d.
 
         Parameters:
-        dataframe (pandas.DataFrame): The input dataframe containing the precipitation data.
-        resolution (int): The resolution factor for the interpolated map. Default is 5.
+        values (numpy.ndarray): The (lat, lon) precipitation map.
 
         Returns:
         numpy.ndarray: The interpolated precipitation map.
         """
-
-        try:
-            values = dataframe.get('Precipitation')[0][0]
-
-        except:
-            values = dataframe[0]
-
         x = np.arange(values.shape[1])
         y = np.arange(values.shape[0])
         # Create the interpolator function
@@ -131,12 +125,21 @@ class MapPlotter(Plotter):
 
 
     def modify_dataframe(self, data):
-        df = weekly_monthly_yearly_precipitation(data,  self.config.average,  self.config.cumulate)
+        # Total or daily mean over the period
+        if isinstance(data, MapAccumulator):
+            values = data.result('sum' if self.config.cumulate else 'mean')
+
+        # Already reduced, e.g. an anomaly map
+        elif isinstance(data, np.ndarray):
+            values = data
+
+        else:
+            values = weekly_monthly_yearly_precipitation(data, None, self.config.cumulate)
 
         if  self.config.interpolate:
-            df = self.interpolate_map(data)
+            values = self.interpolate_map(values)
 
-        return df
+        return values
 
 
 class BarPlotter(EventsPlotter):
@@ -207,17 +210,18 @@ class BarPlotter(EventsPlotter):
             return self.ax
 
 
-    def modify_dataframe(self, data):
+    def modify_dataframe(self, data: PrecipCube):
             if self.config.bins > 1:
                 self.legend_handles = [mpatches.Patch(color=self.config.colors[i], label=self.config.quantile + str(i+1)) for i in range(self.config.bins)]
 
             else:
                 self.legend_handles = []
 
-            if  self.config.average in ['W', 'M', 'Y'] or  self.config.cumulate:
-                data = weekly_monthly_yearly_precipitation(data,  self.config.average,  self.config.cumulate)
+            if  self.config.average in ['W', 'M', 'Y']:
+                data = data.resample(self.config.average)
 
-            data = map_eruption_colors(data, self.config.roll, self.config.eruption_dates, self.config.bins, self.config.colors)
+            # Area average of each step (see PrecipCube.to_frame), a float per row from here on
+            data = map_eruption_colors(data.to_frame(), self.config.roll, self.config.eruption_dates, self.config.bins, self.config.colors, getattr(self.config, 'bin_scope', 'global'))
 
             if self.config.style == 'strength':
                 # Sort the data by 'roll' column
@@ -225,8 +229,6 @@ class BarPlotter(EventsPlotter):
                 # Reset the index of the DataFrame
                 data = data.reset_index(drop=True)
 
-            data = from_nested_to_float(data)
-
             return data
 
 
@@ -289,20 +291,7 @@ class AnnualPlotter(EventsPlotter):
         self.ax0 = self.fig.add_subplot(sub_gs[0])
         self.ax1 = self.fig.add_subplot(sub_gs[1])
 
-        # TODO by_season
-        # Plots rain by quantile, and if by_season is True, then also by year.
-        if False:
-            for i in range(color_count):
-                if by_season == True:
-                    for j in range(start, end + 1):
-                        rain_by_year = volc_rain[volc_rain['Decimal'] // 1 == j].copy()
-                        rain_j = rain_by_year.sort_values(by=['roll'])
-                        dates_j = np.array([rain_j['Decimal']])
-                        bin_size = len(dates_j) // color_count
-                        x = dates_j % 1
-                        y = dates_j // 1
-                        self.ax0.scatter(x[i*bin_size:(i+1)*bin_size], y[i*bin_size:(i+1)*bin_size], color=colors[i], marker='s', s=(219000 // len(rainfall['Date'].unique())))
-
+        # Colors are the quantile bins of the whole period, or of each year with --bin-scope year
         x = data['Decimal'] % 1
         y = data['Decimal'] // 1
         self.ax0.scatter(x, y, color=data['color'], marker='s', s=(219000 // len(data['Date'].unique())))
@@ -343,16 +332,14 @@ class AnnualPlotter(EventsPlotter):
             plt.show()
 
 
-    def modify_dataframe(self, data):
+    def modify_dataframe(self, data: PrecipCube):
         if self.config.bins > 1:
             self.legend_handles = [mpatches.Patch(color=self.config.colors[i], label=self.config.quantile + str(i+1)) for i in range(self.config.bins)]
 
         else:
             self.legend_handles = []
 
-        data = map_eruption_colors(data, self.config.roll, self.config.eruption_dates, self.config.bins, self.config.colors)
-
-        data = from_nested_to_float(data)
+        data = map_eruption_colors(data.to_frame(), self.config.roll, self.config.eruption_dates, self.config.bins, self.config.colors, getattr(self.config, 'bin_scope', 'global'))
 
         return data
 
@@ -397,4 +384,47 @@ class AnnualPlotter(EventsPlotter):
         y = [(i // 1) + .5 for i in data['Eruptions']]  # Take the integer part of the date i.e. 2020
 
         eruption = self.ax0.scatter(x, y, color='black', marker='v', label='Volcanic Events')
-        self.legend_handles.append(eruption)
\ No newline at end of file
+        self.legend_handles.append(eruption)
+
+class EpochPlotter(Plotter):
+    def __init__(self, fig, grid, config):
+        self.fig = fig
+        self.ax = self.fig.add_subplot(grid)
+        self.config = config
+
+
+    def plot(self, data):
+        data = self.modify_dataframe(data)
+
+        self.ax.fill_between(data['Lag'], data['Lower'], data['Upper'], color='gray', alpha=0.3, linewidth=0)
+        self.ax.plot(data['Lag'], data['Mean'], color='black', linewidth=1)
+        self.ax.axvline(x=0, color='black', linestyle='dashed', dashes=(9,6), linewidth=1)
+
+        if self.config.anomaly != 'none':
+            self.ax.axhline(y=0, color='gray', linewidth=0.5)
+
+        self.legend_handles = [Line2D([0], [0], color='black', linewidth=1, label='Composite mean'),
+                               mpatches.Patch(color='gray', alpha=0.3, label=f'{self.config.confidence:.0%} bootstrap interval'),
+                               Line2D([0], [0], color='black', linestyle='dashed', dashes= (3,2), label='Eruption onset', linewidth= 1)]
+
+        self.ax.set_xlabel('Days from the eruption')
+        self.ax.set_ylabel(self.config.labels['ylabel'])
+        self.ax.set_title(self.config.labels['title'])
+        self.ax.set_xlim(data['Lag'].min(), data['Lag'].max())
+        self.ax.legend(handles=self.legend_handles, loc='upper left', fontsize='xx-small')
+
+        if self.config.save:
+            self.fig.savefig(self.config.save_path)
+
+        if self.config.show_flag:
+            plt.show()
+        else:
+            return self.ax
+
+
+    def modify_dataframe(self, data):
+        if self.config.roll > 1:
+            data = data.copy()
+            data[['Mean', 'Lower', 'Upper']] = data[['Mean', 'Lower', 'Upper']].rolling(self.config.roll, center=True, min_periods=1).mean()
+
+        return data
@@ -10,6 +10,10 @@ class JetStream(AbstractCloudManager):
         self.hostname = credential.hostname
         self.username = credential.user
         self.ssh = None
+        self.sftp = None
+
+        # When owned by the SessionManager the connection outlives the single pipeline stages
+        self.shared = False
 
         # TODO Tailored to my(disilvestro) environment
         self.path_id_rsa = os.path.join(os.getenv('HOME'), credential.rsa_key)
@@ -17,34 +21,61 @@ class JetStream(AbstractCloudManager):
 
 
     def connect(self) -> None:
+        # Reuse the authenticated transport, every exec_command/sftp opens a new channel on it
+        if self.check_connected():
+            return
+
+        self.sftp = None
+
         for i in range(3):
             try:
                 # Connect to the server
                 ssh = paramiko.SSHClient()
                 ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
                 ssh.connect(hostname=self.hostname, username=self.username, key_filename=self.ssh_key)
+
+                # Keep the transport alive between pipeline stages
+                ssh.get_transport().set_keepalive(30)
                 self.ssh = ssh
                 print('-'*50)
                 print('Connected to the server\n')
                 break
 
-            except paramiko.SSHException as e:
+            # socket.error is an OSError: refused, unreachable, timed out
+            except (paramiko.SSHException, OSError) as e:
                 print(f"Attempt {i+1} failed to connect to the server: {e}")
-                # Limit reached
-                if i > 2:
-                    self.ssh = None
+                error = e
+
+        else:
+            raise ConnectionError(f"Could not connect to {self.username}@{self.hostname} after 3 attempts") from error
 
 
     def open_sftp(self):
+        if self.sftp is not None and self.check_connected():
+            return self.sftp
+
         self.sftp = self.ssh.open_sftp()
         print('-'*50)
         print('SFTP connection opened\n')
 
+        return self.sftp
+
 
     def check_connected(self) -> bool:
-        return self.ssh and self.ssh.get_transport() and self.ssh.get_transport().is_active()
+        return bool(self.ssh and self.ssh.get_transport() and self.ssh.get_transport().is_active())
+
+
+    def close(self, force: bool = False) -> None:
+        # Shared sessions are closed once, at the end of the process
+        if self.shared and not force:
+            return
+
+        if self.sftp is not None:
+            self.sftp.close()
+            self.sftp = None
 
+        if self.ssh is not None:
+            self.ssh.close()
+            self.ssh = None
 
-    def close(self) -> None:
-        self.ssh.close()
-        print('Connection closed')
\ No newline at end of file
+        print('Connection closed')
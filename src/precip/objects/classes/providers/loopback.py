@@ -0,0 +1,320 @@
+from precip.objects.interfaces.abstract_cloud_manager import AbstractCloudManager
+from precip.objects.interfaces.credentials.abstract_credentials import AbstractCredentials
+import subprocess
+import threading
+import time
+import os
+
+
+class Throttle:
+    """
+    Injects a fixed latency per operation and limits the transfer rate to `bandwidth` bytes/s.
+    """
+    def __init__(self, latency: float = 0.0, bandwidth: float = None) -> None:
+        self.latency = latency
+        self.bandwidth = bandwidth
+
+
+    def wait(self, nbytes: int = 0) -> None:
+        delay = self.latency
+
+        if self.bandwidth and nbytes:
+            delay += nbytes / self.bandwidth
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BufferedPipe:
+    """
+    Drains a process pipe from a thread into memory, like the receive buffer of a paramiko channel,
+    so the process never blocks on a full pipe while nobody reads it.
+    """
+    CHUNK = 64 * 1024
+
+
+    def __init__(self, stream) -> None:
+        self.buffer = bytearray()
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.drain, args=(stream,), daemon=True)
+        self.thread.start()
+
+
+    def drain(self, stream) -> None:
+        while chunk := stream.read1(self.CHUNK):
+            with self.condition:
+                self.buffer += chunk
+                self.condition.notify_all()
+
+        stream.close()
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+    def read(self, size: int = -1) -> bytes:
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or 0 <= size <= len(self.buffer))
+            size = len(self.buffer) if size < 0 else size
+
+            return self.take(size)
+
+
+    def readline(self) -> bytes:
+        with self.condition:
+            self.condition.wait_for(lambda: self.closed or b'\n' in self.buffer)
+            end = self.buffer.find(b'\n') + 1
+
+            return self.take(end or len(self.buffer))
+
+
+    def take(self, size: int) -> bytes:
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+class LoopbackChannel:
+    def __init__(self, process: subprocess.Popen) -> None:
+        self.process = process
+
+
+    def recv_exit_status(self) -> int:
+        # The output is drained by BufferedPipe, waiting cannot block on a full pipe
+        return self.process.wait()
+
+
+    def shutdown_write(self) -> None:
+        self.process.stdin.close()
+
+
+class LoopbackChannelFile:
+    """
+    Mimics paramiko's ChannelFile: `read` returns bytes and `readline` returns text.
+    """
+    def __init__(self, stream, channel: LoopbackChannel, throttle: Throttle) -> None:
+        self.stream = stream
+        self.channel = channel
+        self.throttle = throttle
+
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        self.throttle.wait(len(data))
+        return data
+
+
+    def readline(self) -> str:
+        line = self.stream.readline()
+        self.throttle.wait(len(line))
+        return line.decode()
+
+
+    def write(self, data) -> None:
+        if isinstance(data, str):
+            data = data.encode()
+
+        self.throttle.wait(len(data))
+        self.stream.write(data)
+
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+    def __iter__(self):
+        return iter(self.readline, '')
+
+
+class LoopbackSSH:
+    """
+    Runs the commands with the local shell, inside the provider folder.
+    """
+    def __init__(self, folder: str, throttle: Throttle) -> None:
+        self.folder = folder
+        self.throttle = throttle
+
+
+    def exec_command(self, command: str):
+        self.throttle.wait()
+
+        process = subprocess.Popen(command, shell=True, cwd=self.folder, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        channel = LoopbackChannel(process)
+
+        stdin = LoopbackChannelFile(process.stdin, channel, self.throttle)
+        stdout = LoopbackChannelFile(BufferedPipe(process.stdout), channel, self.throttle)
+        stderr = LoopbackChannelFile(BufferedPipe(process.stderr), channel, self.throttle)
+
+        return stdin, stdout, stderr
+
+
+    def open_sftp(self):
+        return LoopbackSFTP(self.throttle)
+
+
+    def close(self) -> None:
+        pass
+
+
+class LoopbackFile:
+    def __init__(self, path: str, mode: str, throttle: Throttle) -> None:
+        self.file = open(path, mode if 'b' in mode else mode + 'b')
+        self.throttle = throttle
+
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.file.read(size)
+        self.throttle.wait(len(data))
+        return data
+
+
+    def write(self, data) -> None:
+        if isinstance(data, str):
+            data = data.encode()
+
+        self.throttle.wait(len(data))
+        self.file.write(data)
+
+
+    def close(self) -> None:
+        self.file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class LoopbackSFTP:
+    """
+    Subset of paramiko's SFTPClient backed by the local filesystem.
+    """
+    CHUNK = 1024 * 1024
+
+
+    def __init__(self, throttle: Throttle) -> None:
+        self.throttle = throttle
+
+
+    def get(self, remotepath: str, localpath: str) -> None:
+        self.throttle.wait()
+        self.copy(remotepath, localpath)
+
+
+    def put(self, localpath: str, remotepath: str) -> None:
+        self.throttle.wait()
+        self.copy(localpath, remotepath)
+
+
+    def copy(self, source: str, destination: str) -> None:
+        with open(source, 'rb') as fsrc, open(destination, 'wb') as fdst:
+            while True:
+                chunk = fsrc.read(self.CHUNK)
+
+                if not chunk:
+                    break
+
+                self.throttle.wait(len(chunk))
+                fdst.write(chunk)
+
+
+    def file(self, filename: str, mode: str = 'r') -> LoopbackFile:
+        self.throttle.wait()
+        return LoopbackFile(filename, mode, self.throttle)
+
+
+    def stat(self, path: str) -> os.stat_result:
+        self.throttle.wait()
+        return os.stat(path)
+
+
+    def listdir(self, path: str = '.') -> list:
+        self.throttle.wait()
+        return os.listdir(path)
+
+
+    def remove(self, path: str) -> None:
+        self.throttle.wait()
+        os.remove(path)
+
+
+    def close(self) -> None:
+        pass
+
+
+class LoopbackCredentials(AbstractCredentials):
+    """
+    Credentials of the loopback server, so the provider can be obtained from the SessionManager:
+
+        SessionManager.get_provider(LoopbackCredentials(folder), LoopbackProvider)
+
+    Args:
+        folder (str): Local folder playing the role of the remote data folder.
+        latency (float): Seconds added to every remote operation (default: 0).
+        bandwidth (float): Transfer rate limit in bytes/s, None for unlimited (default: None).
+    """
+    def __init__(self, folder: str, latency: float = 0.0, bandwidth: float = None) -> None:
+        self.path = folder
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.get_credentials()
+
+
+    def get_credentials(self):
+        self.hostname = 'localhost'
+        self.user = os.getenv('USER')
+
+
+class LoopbackProvider(AbstractCloudManager):
+    """
+    Cloud provider backed by a local folder, used to benchmark and regression test the cloud path
+    (CloudNC4Data, CloudFileManager, CloudSQLite3Database) without the JetStream host.
+
+    Args:
+        credential (LoopbackCredentials): Folder, latency and bandwidth of the loopback server.
+    """
+    def __init__(self, credential: LoopbackCredentials) -> None:
+        self.path = credential.path
+        self.hostname = credential.hostname
+        self.username = credential.user
+        self.throttle = Throttle(credential.latency, credential.bandwidth)
+        self.ssh = None
+        self.sftp = None
+        self.shared = False
+
+        os.makedirs(self.path, exist_ok=True)
+
+
+    def connect(self) -> None:
+        if self.check_connected():
+            return
+
+        self.throttle.wait()
+        self.ssh = LoopbackSSH(self.path, self.throttle)
+        print('-'*50)
+        print('Connected to the loopback server\n')
+
+
+    def open_sftp(self):
+        if self.sftp is None:
+            self.sftp = self.ssh.open_sftp()
+
+        return self.sftp
+
+
+    def check_connected(self) -> bool:
+        return self.ssh is not None
+
+
+    def close(self, force: bool = False) -> None:
+        if self.shared and not force:
+            return
+
+        self.sftp = None
+        self.ssh = None
+        print('Connection closed')
@@ -0,0 +1,71 @@
+from precip.objects.interfaces.abstract_cloud_manager import AbstractCloudManager
+from precip.objects.interfaces.credentials.abstract_credentials import AbstractCredentials
+from precip.objects.classes.providers.jetstream import JetStream
+import threading
+import atexit
+
+
+class SessionManager:
+    """
+    Process wide registry of authenticated cloud providers.
+
+    Database, extraction, download and integrity checks ask the manager for a provider instead of
+    building their own, so a single SSH handshake is made per host and user. The transport multiplexes
+    the channels opened by `exec_command` and `open_sftp`, and it is closed when the process exits.
+    """
+    _providers = {}
+    _lock = threading.Lock()
+
+
+    @classmethod
+    def get_provider(cls, credential: AbstractCredentials, provider_class=JetStream) -> AbstractCloudManager:
+        """
+        Returns the connected provider for the given credentials, creating it on first use.
+
+        Args:
+            credential (AbstractCredentials): Credentials of the remote host.
+            provider_class (type): Provider implementation to instantiate (default: JetStream).
+
+        Returns:
+            AbstractCloudManager: A connected provider with an open SFTP channel.
+
+        Raises:
+            ConnectionError: If the provider cannot connect, it is not kept in the registry.
+        """
+        key = (provider_class.__name__, credential.hostname, credential.user, credential.path)
+
+        with cls._lock:
+            provider = cls._providers.get(key)
+
+            if provider is None:
+                provider = provider_class(credential)
+                provider.shared = True
+
+            try:
+                provider.connect()
+                provider.open_sftp()
+
+            except Exception:
+                # The next call starts over with a fresh provider
+                cls._providers.pop(key, None)
+                raise
+
+            cls._providers[key] = provider
+
+        return provider
+
+
+    @classmethod
+    def close_all(cls) -> None:
+        """
+        Closes every registered session.
+        """
+        with cls._lock:
+            for provider in cls._providers.values():
+                if provider.check_connected():
+                    provider.close(force=True)
+
+            cls._providers.clear()
+
+
+atexit.register(SessionManager.close_all)
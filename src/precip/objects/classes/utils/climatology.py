@@ -0,0 +1,244 @@
+import os
+import tempfile
+import numpy as np
+from precip.objects.classes.utils.precip_cube import PrecipCube
+
+# First slot of each month in a leap year, day-of-year slots run from 0 (Jan 1) to 365 (Dec 31)
+MONTH_START = np.cumsum([0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+BASELINES = {'doy': 366, 'month': 12}
+
+
+def baseline_slots(time, baseline: str = 'doy') -> np.ndarray:
+    """
+    Returns the day-of-year (0-365, February 29 has its own slot) or month (0-11) slot of each date.
+    """
+    time = np.asarray(time, dtype='datetime64[D]')
+    month = (time.astype('datetime64[M]') - time.astype('datetime64[Y]').astype('datetime64[M]')).astype(int)
+
+    if baseline == 'month':
+        return month
+
+    if baseline == 'doy':
+        return MONTH_START[month] + (time - time.astype('datetime64[M]').astype('datetime64[D]')).astype(int)
+
+    raise ValueError(f'Unknown baseline {baseline}, use one of {list(BASELINES)}')
+
+
+class Climatology:
+    """
+    Day-of-year and monthly precipitation baselines of a site or of each pixel of a region.
+
+    The baselines are computed from a reference period in one pass over the cube (per slot sums of
+    the values, of their squares and counts). Day-of-year slots are pooled over a circular window of
+    `window` days, as 20-30 years of a single calendar day are too few for a stable mean.
+
+    Args:
+        mean (dict): {'doy': (366, lat, lon), 'month': (12, lat, lon)} mean daily precipitation.
+        std (dict): Standard deviations, same layout as `mean`.
+        latitude (array-like): Latitudes of the grid.
+        longitude (array-like): Longitudes of the grid.
+        reference (tuple): First and last date of the reference period.
+        window (int): Pooling window of the day-of-year baseline, in days.
+    """
+    def __init__(self, mean: dict, std: dict, latitude, longitude, reference: tuple, window: int) -> None:
+        self.mean = mean
+        self.std = std
+        self.latitude = np.asarray(latitude, dtype=float)
+        self.longitude = np.asarray(longitude, dtype=float)
+        self.reference = tuple(str(date) for date in reference)
+        self.window = window
+
+
+    @classmethod
+    def from_cube(cls, cube: PrecipCube, window: int = 31):
+        mean, std = baseline_statistics(cube.values, cube.time, window)
+        reference = (cube.time[0], cube.time[-1]) if len(cube) else ('', '')
+
+        return cls(mean, std, cube.latitude, cube.longitude, reference, window)
+
+
+    @classmethod
+    def from_accumulator(cls, accumulator, latitude, longitude, window: int = 31):
+        """
+        Builds the baselines from a BaselineAccumulator, the streaming counterpart of `from_cube`.
+        """
+        mean, std = slot_statistics(accumulator.sums, accumulator.shape, window)
+        reference = (accumulator.first, accumulator.last) if accumulator.days else ('', '')
+
+        return cls(mean, std, latitude, longitude, reference, window)
+
+
+    def anomaly(self, cube: PrecipCube, baseline: str = 'doy', standardized: bool = False) -> PrecipCube:
+        """
+        Returns the cube minus the baseline of each date, divided by its standard deviation if `standardized`.
+        """
+        slots = baseline_slots(cube.time, baseline)
+        values = cube.values - self.mean[baseline][slots]
+
+        if standardized:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = values / np.where(self.std[baseline][slots] > 0, self.std[baseline][slots], np.nan)
+
+        return PrecipCube(values, cube.time, cube.latitude, cube.longitude, cube.version)
+
+
+    def anomaly_map(self, accumulator, time, cumulate: bool = False, baseline: str = 'doy', standardized: bool = False) -> np.ndarray:
+        """
+        Returns the (lat, lon) anomaly of an accumulated period (see MapAccumulator).
+
+        The anomaly is the observed minus the expected total (`cumulate`) or daily mean over `time`.
+        The expected total only counts the days accumulated in each cell, missing days are not a deficit.
+        Standardized anomalies are in units of the daily standard deviation of the period.
+        """
+        slots = baseline_slots(time, baseline)
+        expected = self.mean[baseline][slots].mean(axis=0)
+        count = accumulator.result('count')
+
+        if cumulate:
+            anomaly = accumulator.result('sum') - expected * count
+
+        else:
+            anomaly = accumulator.result('mean') - expected
+
+        if standardized:
+            spread = np.sqrt(np.mean(self.std[baseline][slots] ** 2, axis=0))
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                anomaly = anomaly / np.where(spread > 0, spread, np.nan) / (count if cumulate else 1)
+
+        return anomaly
+
+
+    def save(self, path: str) -> None:
+        folder = os.path.dirname(path) or '.'
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix='.npz')
+
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **{f'mean_{b}': self.mean[b] for b in BASELINES}, **{f'std_{b}': self.std[b] for b in BASELINES},
+                     latitude=self.latitude, longitude=self.longitude, reference=np.array(self.reference), window=self.window)
+
+        os.replace(tmp, path)
+
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            return cls({b: data[f'mean_{b}'] for b in BASELINES}, {b: data[f'std_{b}'] for b in BASELINES},
+                       data['latitude'], data['longitude'], tuple(data['reference']), int(data['window']))
+
+
+class BaselineAccumulator:
+    """
+    Running per day-of-year sums, sums of squares and counts of daily (lat, lon) grids.
+
+    Grids are folded one at a time like in MapAccumulator, so a reference period of decades is never
+    held in memory. See Climatology.from_accumulator.
+
+    Args:
+        shape (tuple): (lat, lon) shape of the grids, if known the baselines of an empty period are all NaN
+                       instead of an error (default: None).
+    """
+    def __init__(self, shape: tuple = None) -> None:
+        self.sums = None
+        self.shape = None
+        self.first = None
+        self.last = None
+        self.days = 0
+
+        if shape is not None:
+            self.allocate(shape)
+
+
+    def allocate(self, shape: tuple) -> None:
+        self.shape = tuple(shape)
+        self.sums = [np.zeros((BASELINES['doy'], int(np.prod(shape)))) for _ in range(3)]
+
+
+    def add(self, date, grid) -> None:
+        grid = np.asarray(grid, dtype=float)
+        valid = ~np.isnan(grid)
+        values = np.where(valid, grid, 0).ravel()
+
+        if self.sums is None:
+            self.allocate(grid.shape)
+
+        slot = baseline_slots([date])[0]
+
+        for total, weights in zip(self.sums, (values, values ** 2, valid.ravel())):
+            total[slot] += weights
+
+        date = np.datetime64(date, 'D')
+        self.first = date if self.first is None else min(self.first, date)
+        self.last = date if self.last is None else max(self.last, date)
+        self.days += 1
+
+
+def slot_sums(values, time) -> list:
+    """
+    Per day-of-year slot sums of the values, of their squares and counts, the first axis of `values` is time.
+
+    Returns:
+        list: Three (366, cells) arrays.
+    """
+    values = np.asarray(values, dtype=float).reshape(len(time), -1)
+    valid = ~np.isnan(values)
+    values = np.where(valid, values, 0)
+    cells = values.shape[1]
+
+    # One bincount per statistic over (slot, cell) pairs
+    index = (baseline_slots(time, 'doy')[:, np.newaxis] * cells + np.arange(cells)).ravel()
+
+    return [np.bincount(index, weights=weights.ravel(), minlength=BASELINES['doy'] * cells).reshape(BASELINES['doy'], cells)
+            for weights in (values, values ** 2, valid.astype(float))]
+
+
+def slot_statistics(sums: list, shape: tuple, window: int = 31) -> tuple:
+    """
+    Mean and standard deviation of each day-of-year and month slot from the day-of-year sums (see slot_sums).
+    Month slots add up their days, the day-of-year slots are pooled over `window` days.
+
+    Returns:
+        tuple: ({'doy': (366, ...), 'month': (12, ...)} means, standard deviations in the same layout).
+    """
+    mean, std = {}, {}
+
+    for baseline, size in BASELINES.items():
+        if baseline == 'month':
+            stats = [np.add.reduceat(stat, MONTH_START, axis=0) for stat in sums]
+
+        elif window > 1:
+            stats = [circular_window_sum(stat, window) for stat in sums]
+
+        else:
+            stats = sums
+
+        total, squares, count = stats
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean[baseline] = (total / count).reshape((size,) + shape)
+            variance = (squares - total ** 2 / count) / (count - 1)
+            std[baseline] = np.sqrt(np.clip(variance, 0, None)).reshape((size,) + shape)
+
+    return mean, std
+
+
+def baseline_statistics(values, time, window: int = 31) -> tuple:
+    """
+    Mean and standard deviation of each day-of-year and month slot, the first axis of `values` is time.
+
+    Returns:
+        tuple: ({'doy': (366, ...), 'month': (12, ...)} means, standard deviations in the same layout).
+    """
+    return slot_statistics(slot_sums(values, time), tuple(np.shape(values)[1:]), window)
+
+
+def circular_window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sums each slot with its `window` neighbours along the first axis, wrapping around the year.
+    """
+    half = window // 2
+    padded = np.concatenate([values[-half:], values, values[:window - 1 - half]]) if half else np.concatenate([values, values[:window - 1]])
+    total = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(padded, axis=0)])
+
+    return total[window:window + len(values)] - total[:len(values)]
@@ -0,0 +1,115 @@
+import warnings
+import numpy as np
+import pandas as pd
+from precip.objects.classes.utils.rolling_engine import RollingEngine
+from precip.objects.classes.utils.site_matrix import SiteMatrix
+
+EVENT_COLUMNS = ['Id', 'Volcano', 'Window', 'Threshold', 'Start', 'End', 'Days', 'Peak', 'Peak date', 'Eruption', 'Lag', 'Precedes']
+
+
+def site_thresholds(values: np.ndarray, percentile: float) -> np.ndarray:
+    """
+    Returns the `percentile` of each row, ignoring NaN, sites without data get NaN.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        return np.nanpercentile(values, percentile, axis=1)
+
+
+def exceedance_runs(mask: np.ndarray) -> tuple:
+    """
+    Labels the runs of consecutive True values of each row of a (site, time) mask.
+
+    Returns:
+        tuple: Row, first and last (inclusive) column of each run, sorted by row then column.
+    """
+    padded = np.zeros((mask.shape[0], mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+
+    # Every row starts and ends on False, so the n-th rise of the matrix pairs with its n-th fall
+    edges = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+
+    return rows, starts, ends - 1
+
+
+def detect_events(matrix: SiteMatrix, catalog: dict, windows: list = (1,), percentile: float = 95, lead: int = 90) -> pd.DataFrame:
+    """
+    Finds the days, or rolling windows, of each site above its own precipitation percentile and matches
+    them with the next eruption of the site.
+
+    Windows are labelled on their last day, a run of consecutive days above the threshold is one event.
+    The eruption of an event is the first one starting on or after the first day of the run, the event
+    precedes it when it starts on the last day of the run or at most `lead` days later. An eruption
+    starting inside the run has a negative lag and is not preceded.
+
+    Args:
+        matrix (SiteMatrix): Daily precipitation of the sites.
+        catalog (dict): {volcano id: [eruption start dates]}, see eruption_catalog.
+        windows (list): Rolling windows in days, 1 for single days.
+        percentile (float): Percentile of each site and window used as threshold.
+        lead (int): Maximum number of days between the end of an event and the eruption.
+
+    Returns:
+        pd.DataFrame: One row per event, with the columns of EVENT_COLUMNS.
+    """
+    length = len(matrix.time)
+    eruption_rows, eruption_columns = matrix.eruptions(catalog)
+    eruption_keys = eruption_rows.astype(np.int64) * length + eruption_columns
+
+    engine = RollingEngine(matrix.values.T) if any(window > 1 for window in windows) else None
+    frames = []
+
+    for window in windows:
+        values = engine.window(window).T if window > 1 else matrix.values.astype(float)
+        thresholds = site_thresholds(values, percentile)
+
+        with np.errstate(invalid='ignore'):
+            mask = values > thresholds[:, np.newaxis]
+
+        rows, starts, ends = exceedance_runs(mask)
+
+        if len(rows) == 0:
+            continue
+
+        # Peak of each run: the cells outside the runs are -inf, so reducing from one start to the next only sees the run
+        flat = np.where(mask, values, -np.inf).ravel()
+        first = rows.astype(np.int64) * length + starts
+        peaks = np.maximum.reduceat(flat, first)
+
+        cells = np.flatnonzero(mask.ravel())
+        run = np.searchsorted(first, cells, side='right') - 1
+        at_peak = flat[cells] == peaks[run]
+        _, index = np.unique(run[at_peak], return_index=True)
+        peak_columns = cells[at_peak][index] % length
+
+        # Next eruption of the same site, on or after the start of the run
+        following = np.searchsorted(eruption_keys, first)
+        found = following < len(eruption_keys)
+        found[found] = eruption_rows[following[found]] == rows[found]
+
+        eruption = np.full(len(rows), np.datetime64('NaT'), dtype='datetime64[D]')
+        eruption[found] = matrix.time[eruption_columns[following[found]]]
+        lag = np.where(found, (eruption - matrix.time[ends]).astype(float), np.nan)
+
+        frames.append(pd.DataFrame({
+            'Id': matrix.ids[rows],
+            'Volcano': matrix.names[rows],
+            'Window': window,
+            'Threshold': thresholds[rows],
+            'Start': matrix.time[starts],
+            'End': matrix.time[ends],
+            'Days': ends - starts + 1,
+            'Peak': peaks,
+            'Peak date': matrix.time[peak_columns],
+            'Eruption': eruption,
+            'Lag': lag,
+            'Precedes': found & (lag >= 0) & (lag <= lead),
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=EVENT_COLUMNS)
+
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,108 @@
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    # Windows, falls back to exclusive creation of the lock file
+    fcntl = None
+
+
+class FileLock:
+    """
+    Inter-process lock backed by a lock file.
+
+    On POSIX systems the lock is an `flock` on the file, released by the kernel if the process dies.
+    Elsewhere the lock file is created exclusively; a lock file older than `stale` seconds is considered
+    left behind by a dead process and is removed. In both cases the lock file is removed on release, so
+    per-file locks do not pile up in the lock folder.
+
+    Args:
+        path (str): Path of the lock file.
+        stale (float): Age in seconds after which an exclusive lock file is considered stale (default: 3600).
+    """
+    def __init__(self, path: str, stale: float = 3600) -> None:
+        self.path = path
+        self.stale = stale
+        self.fd = None
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+
+    def acquire(self, blocking: bool = True) -> bool:
+        """
+        Acquires the lock.
+
+        Args:
+            blocking (bool): Wait for the lock instead of returning immediately.
+
+        Returns:
+            bool: True if the lock has been acquired.
+        """
+        while fcntl is not None:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+            except BlockingIOError:
+                os.close(fd)
+                return False
+
+            # The previous holder may have removed the file while we waited, lock the new one instead
+            try:
+                if os.stat(self.path).st_ino == os.fstat(fd).st_ino:
+                    self.fd = fd
+                    return True
+
+            except FileNotFoundError:
+                pass
+
+            os.close(fd)
+
+        while True:
+            try:
+                self.fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+                return True
+
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale:
+                        os.remove(self.path)
+                        continue
+
+                except OSError:
+                    continue
+
+                if not blocking:
+                    return False
+
+                time.sleep(0.5)
+
+
+    def release(self) -> None:
+        if self.fd is None:
+            return
+
+        # Removed while still held, a process waiting on it then retries with a new file
+        try:
+            os.remove(self.path)
+
+        except FileNotFoundError:
+            pass
+
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+        os.close(self.fd)
+
+        self.fd = None
+
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+
+    def __exit__(self, *args):
+        self.release()
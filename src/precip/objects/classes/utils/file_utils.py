@@ -1,7 +1,43 @@
+import os
 import netCDF4
 from datetime import datetime
 from precip.objects.interfaces.file_utils import AbstractFileUtils
 
+HDF5_SIGNATURE = b'\x89HDF\r\n\x1a\n'
+
+
+def validate_nc4(path: str, expected_size: int = None, deep: bool = False) -> None:
+    """
+    Checks that a GPM .nc4 file is complete and readable.
+
+    Args:
+        path (str): Path of the file.
+        expected_size (int): Size announced by the server, skipped if None.
+        deep (bool): Decompress the whole precipitation variable instead of reading its header only.
+
+    Raises:
+        ValueError: If the file is truncated, is not HDF5 or cannot be read.
+    """
+    size = os.path.getsize(path)
+
+    if expected_size is not None and size != expected_size:
+        raise ValueError(f'{path} has {size} bytes, expected {expected_size}')
+
+    with open(path, 'rb') as f:
+        if f.read(len(HDF5_SIGNATURE)) != HDF5_SIGNATURE:
+            raise ValueError(f'{path} is not an HDF5 file')
+
+    try:
+        with netCDF4.Dataset(path) as ds:
+            data = ds['precipitationCal'] if 'precipitationCal' in ds.variables else ds['precipitation']
+            data.ncattrs()
+
+            if deep:
+                data[:]
+
+    except (OSError, IndexError, RuntimeError) as e:
+        raise ValueError(f'{path} cannot be read: {e}')
+
 
 class ReadNC4Properties(AbstractFileUtils):
     def __init__(self, path: str,):
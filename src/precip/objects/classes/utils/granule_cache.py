@@ -0,0 +1,281 @@
+import os
+import json
+import atexit
+import tempfile
+import threading
+import weakref
+import time
+from precip.objects.classes.utils.file_lock import FileLock
+from precip.config import CACHE_FOLDER, CACHE_MAX_SIZE
+
+# Open caches, flushed once at exit by a single hook without keeping them alive
+CACHES = weakref.WeakSet()
+
+
+def flush_caches() -> None:
+    for cache in list(CACHES):
+        cache.flush()
+
+
+atexit.register(flush_caches)
+
+
+class GranuleCache:
+    """
+    Size bounded local cache for .nc4 files fetched from a remote provider.
+
+    Entries are validated against the remote size and modification time, inserted atomically and
+    evicted in least recently used order once the cache grows over `max_size` bytes.
+
+    The index is shared by the processes using the same folder: it is rewritten under a file lock, merged
+    with the entries added or removed by the others. Changes are written in batches, every `SAVE_EVERY`
+    insertions or removals, every `SAVE_INTERVAL` seconds, once the cache is full and on `close` or exit;
+    files left out of the index by a process that died in between are picked up by the next write.
+
+    A hit touches the cached file under the index lock, so the evictions of other processes see it as
+    the most recently used entry before the caller opens it. A full cache is evicted down to
+    `LOW_WATERMARK` of `max_size`, which spreads the index writes over several insertions.
+    """
+    INDEX = 'index.json'
+    SAVE_INTERVAL = 60
+    SAVE_EVERY = 32
+    LOW_WATERMARK = 0.9
+
+
+    def __init__(self, folder: str = None, max_size: int = CACHE_MAX_SIZE) -> None:
+        if folder is None:
+            folder = os.path.join(os.getenv('PRECIP_DIR') or tempfile.gettempdir(), CACHE_FOLDER)
+
+        self.folder = folder
+        self.max_size = max_size
+        self.index_path = os.path.join(self.folder, self.INDEX)
+        self.lock = threading.Lock()
+        self.index_lock = FileLock(self.index_path + '.lock')
+        self.removed = set()
+        self.dirty = False
+        self.changes = 0
+        self.last_save = time.time()
+
+        os.makedirs(self.folder, exist_ok=True)
+
+        with self.index_lock:
+            self.index = self.load_index()
+
+        CACHES.add(self)
+
+
+    def load_index(self) -> dict:
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+
+        except (OSError, ValueError):
+            return {}
+
+        # Drop entries whose file has been removed by hand
+        return {name: entry for name, entry in index.items() if os.path.exists(os.path.join(self.folder, name))}
+
+
+    def save_index(self, keep: str = None) -> None:
+        """
+        Merges the index with the one on disk, evicts over the size limit and writes it back.
+
+        Args:
+            keep (str): Name of an entry that must not be evicted, i.e. the one just inserted.
+        """
+        with self.index_lock:
+            for name, entry in self.load_index().items():
+                if name in self.removed:
+                    continue
+
+                current = self.index.get(name)
+
+                # Added by another process, or the same file seen more recently there
+                if current is None or current['mtime'] is None:
+                    self.index[name] = entry
+
+                elif (current['size'], current['mtime']) == (entry['size'], entry['mtime']):
+                    current['atime'] = max(current['atime'], entry['atime'])
+
+            self.index = {name: entry for name, entry in self.index.items() if os.path.exists(os.path.join(self.folder, name))}
+            self.adopt_orphans()
+            self.evict(keep)
+            self.write_index()
+
+        self.removed = set()
+        self.dirty = False
+        self.changes = 0
+        self.last_save = time.time()
+
+
+    def adopt_orphans(self) -> None:
+        """
+        Indexes the cached files missing from the index, inserted by a process that died before writing it.
+        Their remote modification time is unknown, the first hit fetches them again.
+        """
+        for name in os.listdir(self.folder):
+            if name.endswith('.nc4') and name not in self.index and name not in self.removed:
+                try:
+                    stat = os.stat(os.path.join(self.folder, name))
+
+                except FileNotFoundError:
+                    continue
+
+                self.index[name] = {'remote': None, 'size': stat.st_size, 'mtime': None, 'atime': stat.st_mtime}
+
+
+    def changed(self, keep: str = None) -> None:
+        """
+        Counts an insertion or removal and writes the index once a batch is complete or the cache is full.
+        """
+        self.changes += 1
+
+        if self.changes >= self.SAVE_EVERY or self.size() > self.max_size or time.time() - self.last_save > self.SAVE_INTERVAL:
+            self.save_index(keep)
+
+
+    def write_index(self) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.index, f)
+
+        os.replace(tmp, self.index_path)
+
+
+    def get(self, remote_path: str, sftp) -> str:
+        """
+        Returns the local path of the remote file, fetching it only when missing or changed.
+
+        Args:
+            remote_path (str): Path of the file on the remote host.
+            sftp: An open SFTP client.
+
+        Returns:
+            str: Path of the cached copy.
+        """
+        name = os.path.basename(remote_path)
+        local_path = os.path.join(self.folder, name)
+        stat = sftp.stat(remote_path)
+
+        with self.lock:
+            entry = self.index.get(name)
+
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime and self.touch(local_path):
+                entry['atime'] = time.time()
+                self.dirty = True
+
+                if time.time() - self.last_save > self.SAVE_INTERVAL:
+                    self.save_index()
+
+                return local_path
+
+        # Download next to the final path and rename, readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=self.folder, suffix='.part')
+        os.close(fd)
+
+        try:
+            sftp.get(remote_path, tmp)
+            os.replace(tmp, local_path)
+
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        with self.lock:
+            self.index[name] = {'remote': remote_path, 'size': stat.st_size, 'mtime': stat.st_mtime, 'atime': time.time()}
+            self.removed.discard(name)
+            self.changed(keep=name)
+
+        return local_path
+
+
+    def touch(self, local_path: str) -> bool:
+        """
+        Marks a cached file as just used, under the index lock so that it cannot be evicted in between.
+
+        Returns:
+            bool: False if the file has already been evicted by another process.
+        """
+        with self.index_lock:
+            try:
+                os.utime(local_path)
+
+            except FileNotFoundError:
+                return False
+
+        return True
+
+
+    def discard(self, remote_path: str) -> None:
+        """
+        Removes the cached copy of a remote file, if any.
+        """
+        name = os.path.basename(remote_path)
+
+        with self.lock:
+            self.index.pop(name, None)
+            self.removed.add(name)
+            local_path = os.path.join(self.folder, name)
+
+            if os.path.exists(local_path):
+                os.remove(local_path)
+
+            self.changed()
+
+
+    def flush(self) -> None:
+        """
+        Writes the insertions, removals and access times not saved yet.
+        """
+        with self.lock:
+            if self.dirty or self.changes or self.removed:
+                self.save_index()
+
+
+    def close(self) -> None:
+        self.flush()
+        CACHES.discard(self)
+
+
+    def size(self) -> int:
+        return sum(entry['size'] for entry in self.index.values())
+
+
+    def last_used(self, name: str) -> float:
+        # Hits of other processes touch the file before their access time reaches the index
+        try:
+            return max(self.index[name]['atime'], os.path.getmtime(os.path.join(self.folder, name)))
+
+        except FileNotFoundError:
+            return self.index[name]['atime']
+
+
+    def evict(self, keep: str = None) -> None:
+        """
+        Removes the least recently used entries until the cache fits in `LOW_WATERMARK` of `max_size`,
+        once it is over `max_size`. Must be called under the index lock.
+
+        Args:
+            keep (str): Name of an entry that must not be evicted, i.e. the one just inserted.
+        """
+        total = self.size()
+
+        if total <= self.max_size:
+            return
+
+        for name in sorted(self.index, key=self.last_used):
+            if total <= self.max_size * self.LOW_WATERMARK:
+                break
+
+            if name == keep:
+                continue
+
+            local_path = os.path.join(self.folder, name)
+
+            if os.path.exists(local_path):
+                os.remove(local_path)
+
+            total -= self.index.pop(name)['size']
+            self.removed.add(name)
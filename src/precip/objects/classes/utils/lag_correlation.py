@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+from scipy import fft
+from precip.objects.classes.utils.rolling_engine import RollingEngine
+from precip.objects.classes.utils.site_matrix import SiteMatrix
+
+# Budget of the surrogate batches, in elements of the gathered (surrogate, eruption, lag) block
+BATCH_ELEMENTS = 2 ** 24
+
+
+def centered(values: np.ndarray) -> tuple:
+    """
+    Removes the mean of each row, ignoring NaN, missing days become 0 (the mean).
+
+    Returns:
+        tuple: Centered rows and their norm.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(valid, values, 0).sum(axis=-1, keepdims=True) / valid.sum(axis=-1, keepdims=True)
+
+    values = np.where(valid, values - mean, 0)
+
+    return values, np.sqrt((values ** 2).sum(axis=-1))
+
+
+def fft_cross(x_fft: np.ndarray, y: np.ndarray, nfft: int, max_lag: int) -> np.ndarray:
+    """
+    Cross products of each row of x (given by its FFT) with the rows of y, for lags -max_lag to max_lag.
+    A positive lag k sums x[t] * y[t + k], i.e. x leads y by k days.
+    """
+    cross = fft.irfft(np.conj(x_fft) * fft.rfft(y, nfft, workers=-1), nfft, workers=-1)
+
+    return np.concatenate([cross[..., nfft - max_lag:], cross[..., :max_lag + 1]], axis=-1)
+
+
+def lag_correlation(matrix: SiteMatrix, catalog: dict, max_lag: int = 365, window: int = 1, surrogates: int = 500, seed: int = None) -> tuple:
+    """
+    Cross-correlation between the precipitation of each site and its eruption onsets over +-max_lag days.
+
+    All the sites are correlated at once by FFT, with the series zero padded so the correlation is not
+    circular. The significance comes from surrogate onset series, each a random circular shift of the
+    onsets of the site (same number of eruptions and same spacing), evaluated in batches.
+
+    Args:
+        matrix (SiteMatrix): Daily precipitation of the sites.
+        catalog (dict): {volcano id: [eruption start dates]}, see eruption_catalog.
+        max_lag (int): Largest lag in days, positive lags are rainfall before the eruptions.
+        window (int): Rolling sum of the precipitation in days, as in volcano_rain_frame.
+        surrogates (int): Number of surrogate onset series.
+        seed (int): Seed of the surrogates.
+
+    Returns:
+        tuple: Summary DataFrame (one row per site with eruptions: peak lag, correlation and p-values),
+               lags, (site, lag) correlation and (site, lag) p-value of the sites of the summary.
+    """
+    rows, columns = matrix.eruptions(catalog)
+    sites, rows, counts = np.unique(rows, return_inverse=True, return_counts=True)
+    length = len(matrix.time)
+    lags = np.arange(-max_lag, max_lag + 1)
+
+    onsets = np.zeros((len(sites), length))
+    onsets[rows, columns] = 1
+
+    rain = RollingEngine(matrix.values[sites].T).window(window).T if window > 1 else matrix.values[sites]
+
+    # Padded so that lags up to max_lag do not wrap around
+    nfft = 1 << int(np.ceil(np.log2(length + max_lag)))
+    x, x_norm = centered(rain)
+    x_fft = fft.rfft(x, nfft, workers=-1)
+
+    y, y_norm = centered(onsets)
+    norm = (x_norm * y_norm)[:, np.newaxis]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        correlation = fft_cross(x_fft, y, nfft, max_lag) / norm
+
+    # A shifted onset series keeps the mean and norm of the onsets, so its cross products are the rain
+    # gathered at the shifted onsets minus each lag, less the onset mean times the cross products of
+    # the rain with the whole period, which are computed once
+    box = fft_cross(x_fft, np.ones(length), nfft, max_lag) * (counts / length)[:, np.newaxis]
+
+    observed = np.abs(correlation)
+    observed_peak = np.nanmax(observed, axis=1, initial=-np.inf)
+
+    exceed = np.zeros(correlation.shape)
+    exceed_peak = np.zeros(len(sites))
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    rng = np.random.default_rng(seed)
+    batch = max(1, BATCH_ELEMENTS // max(1, len(columns) * len(lags)))
+
+    # Without eruptions at the sites there is nothing to shift, reduceat fails on the empty eruption axis
+    for start in range(0, surrogates if len(sites) else 0, batch):
+        size = min(batch, surrogates - start)
+        shifts = rng.integers(1, length, (size, len(sites)))
+
+        index = ((columns + shifts[:, rows]) % length)[..., np.newaxis] - lags
+        inside = (index >= 0) & (index < length)
+        gathered = np.where(inside, x[rows[:, np.newaxis], np.clip(index, 0, length - 1)], 0)
+
+        # Eruptions are sorted by site, one reduction per site
+        with np.errstate(invalid='ignore', divide='ignore'):
+            surrogate = np.abs((np.add.reduceat(gathered, starts, axis=1) - box) / norm)
+
+            exceed += (surrogate >= observed).sum(axis=0)
+            exceed_peak += (np.nanmax(surrogate, axis=2, initial=-np.inf) >= observed_peak).sum(axis=0)
+
+    p_value = np.where(np.isnan(correlation), np.nan, (exceed + 1) / (surrogates + 1))
+    peak = np.argmax(np.where(np.isnan(observed), -1, observed), axis=1)
+
+    summary = pd.DataFrame({
+        'Id': matrix.ids[sites],
+        'Volcano': matrix.names[sites],
+        'Eruptions': counts,
+        'Peak lag': lags[peak],
+        'Peak correlation': correlation[np.arange(len(sites)), peak],
+        'p-value': p_value[np.arange(len(sites)), peak],
+        # Chance of a surrogate peak as strong at any lag, corrects for the number of lags tested
+        'Global p-value': np.where(np.isfinite(observed_peak), (exceed_peak + 1) / (surrogates + 1), np.nan),
+    })
+
+    return summary, lags, correlation, p_value
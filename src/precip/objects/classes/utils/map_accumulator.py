@@ -0,0 +1,102 @@
+import os
+import tempfile
+import numpy as np
+
+
+class MapAccumulator:
+    """
+    Running sum, count and max of daily (lat, lon) grids.
+
+    Grids are folded one at a time, so the memory footprint is a few grids whatever the length of the
+    period. NaN cells are skipped. Accumulators of disjoint periods can be merged, and saved to disk
+    to be combined by later queries.
+
+    Args:
+        shape (tuple): (lat, lon) shape of the grids, if known the result of an empty period is all NaN
+                       instead of an error (default: None).
+    """
+    def __init__(self, shape: tuple = None) -> None:
+        self.sum = None
+        self.count = None
+        self.max = None
+        self.days = 0
+
+        if shape is not None:
+            self.sum = np.zeros(shape)
+            self.count = np.zeros(shape, dtype=int)
+            self.max = np.full(shape, np.nan)
+
+
+    def add(self, grid) -> None:
+        grid = np.asarray(grid, dtype=float)
+        valid = ~np.isnan(grid)
+
+        if self.sum is None:
+            self.sum = np.zeros(grid.shape)
+            self.count = np.zeros(grid.shape, dtype=int)
+            self.max = np.full(grid.shape, np.nan)
+
+        self.sum += np.where(valid, grid, 0)
+        self.count += valid
+        self.max = np.fmax(self.max, grid)
+        self.days += 1
+
+
+    def merge(self, other) -> None:
+        if other.sum is None:
+            return
+
+        if self.sum is None:
+            self.sum, self.count, self.max = other.sum.copy(), other.count.copy(), other.max.copy()
+
+        else:
+            self.sum += other.sum
+            self.count += other.count
+            self.max = np.fmax(self.max, other.max)
+
+        self.days += other.days
+
+
+    @property
+    def mean(self) -> np.ndarray:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.sum / self.count
+
+
+    def result(self, how: str = 'sum') -> np.ndarray:
+        """
+        Returns the 'sum', 'count', 'max' or 'mean' (lat, lon) map, cells never seen are NaN.
+        """
+        if how not in ('sum', 'count', 'max', 'mean'):
+            raise ValueError(f'Unknown reduction {how}, use sum, count, max or mean')
+
+        if self.sum is None:
+            raise ValueError('No precipitation accumulated, the period has no data')
+
+        values = self.mean if how == 'mean' else getattr(self, how).astype(float)
+
+        return np.where(self.count > 0, values, np.nan)
+
+
+    def save(self, path: str) -> None:
+        folder = os.path.dirname(path) or '.'
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix='.npz')
+
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, sum=self.sum, count=self.count, max=self.max, days=self.days)
+
+        os.replace(tmp, path)
+
+
+    @classmethod
+    def load(cls, path: str):
+        accumulator = cls()
+
+        with np.load(path) as data:
+            accumulator.sum = data['sum']
+            accumulator.count = data['count']
+            accumulator.max = data['max']
+            accumulator.days = int(data['days'])
+
+        return accumulator
@@ -0,0 +1,228 @@
+import json
+import warnings
+import numpy as np
+import pandas as pd
+from precip.objects.classes.utils.rolling_engine import RollingEngine
+
+
+class PrecipCube:
+    """
+    Dense precipitation cube: one contiguous float32 array of shape (time, lat, lon).
+
+    Missing values are NaN. Time is a datetime64[D] vector and the coordinates are the centers of the
+    GPM cells, so a cube can be resampled, rolled or reduced without unwrapping per day objects.
+
+    Args:
+        values (array-like): Precipitation (time, lat, lon).
+        time (array-like): Dates of the first axis.
+        latitude (array-like): Latitudes of the second axis.
+        longitude (array-like): Longitudes of the third axis.
+        version (array-like): Version of the data of each date (default: None).
+    """
+    def __init__(self, values, time, latitude, longitude, version=None) -> None:
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.time = np.asarray(time, dtype='datetime64[D]')
+        self.latitude = np.round(np.asarray(latitude, dtype=float), 2)
+        self.longitude = np.round(np.asarray(longitude, dtype=float), 2)
+        self.version = np.asarray(version, dtype=int) if version is not None else np.zeros(len(self.time), dtype=int)
+
+        if self.values.shape != (len(self.time), len(self.latitude), len(self.longitude)):
+            raise ValueError(f'Values of shape {self.values.shape} do not match the coordinates '
+                             f'({len(self.time)}, {len(self.latitude)}, {len(self.longitude)})')
+
+        self.engine = None
+
+
+    def __len__(self) -> int:
+        return len(self.time)
+
+
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+
+    @classmethod
+    def empty(cls, latitude: list, longitude: list):
+        lat, lon = grid_axes(latitude, longitude)
+
+        return cls(np.empty((0, len(lat), len(lon))), [], lat, lon)
+
+
+    @classmethod
+    def from_rows(cls, rows: list, latitude: list, longitude: list):
+        """
+        Builds a cube from (date, array, version) rows, as extracted from the .nc4 files.
+
+        Arrays are in the file layout (1, lon, lat) and are copied in a single preallocated block.
+        """
+        if len(rows) == 0:
+            return cls.empty(latitude, longitude)
+
+        rows = sorted(rows, key=lambda row: str(row[0]))
+        nlon, nlat = np.shape(rows[0][1])[-2:]
+        values = np.empty((len(rows), nlat, nlon), dtype=np.float32)
+
+        for i, (_, array, _) in enumerate(rows):
+            values[i] = np.ma.filled(np.ma.asarray(array, dtype=np.float32), np.nan).reshape(nlon, nlat).T
+
+        lat, lon = grid_axes(latitude, longitude, nlat, nlon)
+
+        return cls(values, [str(row[0]) for row in rows], lat, lon, [row[2] for row in rows])
+
+
+    @classmethod
+    def from_records(cls, dates, precipitation, versions, latitude: list, longitude: list):
+        """
+        Builds a cube from the database columns, the JSON strings are decoded in a single call.
+        """
+        if len(dates) == 0:
+            return cls.empty(latitude, longitude)
+
+        order = np.argsort(np.asarray(dates, dtype='datetime64[D]'), kind='stable')
+        strings = np.asarray(precipitation, dtype=object)[order]
+
+        # (time, 1, lon, lat) as stored, to (time, lat, lon)
+        stored = np.array(json.loads('[' + ','.join(strings) + ']'), dtype=np.float32)
+        values = stored.reshape(len(strings), stored.shape[-2], stored.shape[-1]).transpose(0, 2, 1)
+        lat, lon = grid_axes(latitude, longitude, values.shape[1], values.shape[2])
+
+        return cls(values, np.asarray(dates, dtype='datetime64[D]')[order], lat, lon, np.asarray(versions)[order])
+
+
+    def to_rows(self) -> list:
+        """
+        Returns (date, JSON precipitation, version) rows in the database layout (1, lon, lat).
+
+        Values are written at float32 precision, 0.1 and not the 0.10000000149011612 of the widened float.
+        """
+        # The shortest float32 repr read back as a float prints the same digits
+        values = self.values.transpose(0, 2, 1).astype(str).astype(float)
+
+        return [(str(date), json.dumps(grid[np.newaxis].tolist()), int(version))
+                for date, grid, version in zip(self.time, values, self.version)]
+
+
+    def to_frame(self, how: str = 'mean') -> pd.DataFrame:
+        """
+        Returns the spatially reduced series as a DataFrame with 'Date' and 'Precipitation' columns.
+
+        This is the series of the bar, annual and strength plots and of save_csv. For a box larger than
+        one cell it is the area average, the per-day masked arrays used before took the first cell.
+        """
+        return pd.DataFrame({'Date': pd.to_datetime(self.time), 'Precipitation': self.spatial_reduce(how)})
+
+
+    def resample(self, period: str, how: str = 'mean'):
+        """
+        Aggregates the days by period, labelled like pandas: 'W' on the Sunday ending the week,
+        'M' and 'Y' on the last day of the month and year.
+
+        Args:
+            period (str): 'D', 'W', 'M' or 'Y', only the first character is used.
+            how (str): 'mean' or 'sum', NaN values are ignored.
+
+        Returns:
+            PrecipCube: One step per period with data.
+        """
+        period = period[0].upper()
+
+        if period == 'D' or len(self) == 0:
+            return self
+
+        if period == 'W':
+            # 1970-01-01 is a Thursday, weekday 0 is Monday
+            weekday = (self.time.astype(int) + 3) % 7
+            labels = self.time + (6 - weekday).astype('timedelta64[D]')
+
+        elif period in ('M', 'Y'):
+            unit = 'datetime64[M]' if period == 'M' else 'datetime64[Y]'
+            labels = (self.time.astype(unit) + 1).astype('datetime64[D]') - np.timedelta64(1, 'D')
+
+        else:
+            raise ValueError(f'Unknown period {period}, use D, W, M or Y')
+
+        labels, starts = np.unique(labels, return_index=True)
+        valid = ~np.isnan(self.values)
+
+        total = np.add.reduceat(np.where(valid, self.values, 0), starts, axis=0)
+        count = np.add.reduceat(valid, starts, axis=0)
+
+        if how == 'sum':
+            values = np.where(count > 0, total, np.nan)
+
+        elif how == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = total / count
+
+        else:
+            raise ValueError(f'Unknown reduction {how}, use mean or sum')
+
+        version = np.minimum.reduceat(self.version, starts) if len(self.version) else self.version
+
+        return PrecipCube(values, labels, self.latitude, self.longitude, version)
+
+
+    def rolling(self, window: int, centered: bool = False):
+        """
+        Sum over a moving window of `window` days, from prefix sums.
+
+        Windows holding a NaN, or not complete at the edges, are NaN like pandas rolling().sum().
+        The prefix sums are computed on the first call and shared by every window of the cube.
+        """
+        if self.engine is None:
+            self.engine = RollingEngine(self.values)
+
+        return PrecipCube(self.engine.window(window, centered), self.time, self.latitude, self.longitude, self.version)
+
+
+    def cumulate(self):
+        """
+        Running total along time, NaN days add nothing.
+        """
+        values = np.nancumsum(self.values, axis=0, dtype=float)
+
+        return PrecipCube(values, self.time, self.latitude, self.longitude, self.version)
+
+
+    def reduce_time(self, how: str = 'mean') -> np.ndarray:
+        """
+        Reduces the time axis, returns a (lat, lon) map.
+        """
+        return reduce(self.values, how, axis=0)
+
+
+    def spatial_reduce(self, how: str = 'mean') -> np.ndarray:
+        """
+        Reduces the lat/lon axes, returns a (time,) series.
+        """
+        return reduce(self.values.reshape(len(self), -1), how, axis=1)
+
+
+def reduce(values: np.ndarray, how: str, axis: int) -> np.ndarray:
+    if values.shape[axis] == 0:
+        return np.full(np.delete(values.shape, axis), np.nan)
+
+    reductions = {'mean': np.nanmean, 'sum': np.nansum, 'max': np.nanmax, 'min': np.nanmin}
+
+    if how not in reductions:
+        raise ValueError(f'Unknown reduction {how}, use one of {list(reductions)}')
+
+    # All NaN slices are NaN, without the 'Mean of empty slice' warning
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        return reductions[how](values, axis=axis).astype(float)
+
+
+def grid_axes(latitude: list, longitude: list, nlat: int = None, nlon: int = None) -> tuple:
+    """
+    Returns the cell centers from the first latitude/longitude of the box, every 0.1 degrees.
+    """
+    if nlat is None:
+        nlat = int(round((latitude[1] - latitude[0]) / 0.1)) + 1
+
+    if nlon is None:
+        nlon = int(round((longitude[1] - longitude[0]) / 0.1)) + 1
+
+    return np.round(latitude[0] + 0.1 * np.arange(nlat), 2), np.round(longitude[0] + 0.1 * np.arange(nlon), 2)
@@ -0,0 +1,70 @@
+import numpy as np
+
+SCOPES = ('global', 'year', 'season')
+
+
+class QuantileBins:
+    """
+    Quantile bins of a series, from ranks computed once per scope.
+
+    The ranks are taken over the whole series ('global'), within each calendar year ('year') or within
+    each meteorological season over all the years ('season': DJF, MAM, JJA, SON). Each scope costs one
+    argsort, then the bins of any bin count are an integer division of the ranks.
+
+    Args:
+        values (array-like): The series, ties are ranked in order of appearance like rank(method='first').
+        dates (array-like): Date of each value.
+    """
+    def __init__(self, values, dates) -> None:
+        self.values = np.asarray(values, dtype=float)
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.ranks = {}
+
+
+    def groups(self, scope: str) -> np.ndarray:
+        if scope == 'global':
+            return np.zeros(len(self.values), dtype=int)
+
+        if scope == 'year':
+            return self.dates.astype('datetime64[Y]').astype(int)
+
+        if scope == 'season':
+            month = self.dates.astype('datetime64[M]').astype(int) % 12
+
+            # December goes with the January and February that follow it
+            return ((month + 1) % 12) // 3
+
+        raise ValueError(f'Unknown scope {scope}, use one of {list(SCOPES)}')
+
+
+    def rank(self, scope: str = 'global') -> tuple:
+        """
+        Returns the 1-based rank of each value within its group and the size of the group.
+        """
+        if scope not in self.ranks:
+            groups = self.groups(scope)
+
+            # Sorted by group then value, stable so ties keep their order
+            order = np.lexsort((self.values, groups))
+            _, first, inverse, counts = np.unique(groups[order], return_index=True, return_inverse=True, return_counts=True)
+
+            rank = np.empty(len(order), dtype=np.int64)
+            size = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order)) - first[inverse] + 1
+            size[order] = counts[inverse]
+
+            self.ranks[scope] = (rank, size)
+
+        return self.ranks[scope]
+
+
+    def bins(self, count: int, scope: str = 'global') -> np.ndarray:
+        """
+        Returns the bin of each value, 0 for the lowest `1/count` of its group up to `count - 1`.
+        """
+        if not 1 <= count <= 255:
+            raise ValueError(f'Number of bins must be between 1 and 255, got {count}')
+
+        rank, size = self.rank(scope)
+
+        return ((rank * count) // size).clip(max=count - 1).astype(np.uint8)
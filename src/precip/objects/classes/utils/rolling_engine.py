@@ -0,0 +1,92 @@
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class RollingEngine:
+    """
+    Rolling sums of one series from a single prefix-sum array.
+
+    The prefix sums are computed once, then each window costs one subtraction over the series and is
+    cached. Windows holding a NaN, or not complete at the edges, are NaN like pandas rolling().sum().
+
+    Engines are shared through `get`, keyed by the content of the series, so every plot of the same
+    site reuses the windows already computed.
+
+    Args:
+        values (array-like): The series, the first axis is time (any trailing shape, e.g. (time, lat, lon)).
+    """
+    MAX_SERIES = 64
+
+    registry = OrderedDict()
+    lock = threading.Lock()
+
+
+    def __init__(self, values) -> None:
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values)
+        shape = (1,) + values.shape[1:]
+
+        self.shape = values.shape
+        self.total = np.concatenate([np.zeros(shape), np.cumsum(np.where(valid, values, 0), axis=0)])
+        self.missing = np.concatenate([np.zeros(shape, dtype=int), np.cumsum(~valid, axis=0)])
+        self.windows = {}
+
+
+    @classmethod
+    def get(cls, values):
+        """
+        Returns the engine of the series, creating it on first use.
+        """
+        values = np.ascontiguousarray(values, dtype=float)
+        key = (values.shape, hashlib.sha1(values.tobytes()).hexdigest())
+
+        with cls.lock:
+            engine = cls.registry.get(key)
+
+            if engine is None:
+                engine = cls(values)
+                cls.registry[key] = engine
+
+                if len(cls.registry) > cls.MAX_SERIES:
+                    cls.registry.popitem(last=False)
+
+            else:
+                cls.registry.move_to_end(key)
+
+        return engine
+
+
+    def window(self, window: int, centered: bool = False) -> np.ndarray:
+        """
+        Returns the sum over `window` steps ending on each step, or centered on it like pandas center=True.
+        """
+        key = (window, centered)
+
+        if key not in self.windows:
+            values = np.full(self.shape, np.nan)
+            sums = self.total[window:] - self.total[:-window]
+            gaps = self.missing[window:] - self.missing[:-window]
+
+            start = window - 1 - ((window - 1) // 2 if centered else 0)
+            values[start:start + len(sums)] = np.where(gaps == 0, sums, np.nan)
+            values.setflags(write=False)
+
+            self.windows[key] = values
+
+        return self.windows[key]
+
+
+    def sweep(self, windows: list, centered: bool = False) -> dict:
+        """
+        Returns {window: rolling sums} for each of `windows`.
+        """
+        return {window: self.window(window, centered) for window in windows}
+
+
+def rolling_sum(values, window: int, centered: bool = False) -> np.ndarray:
+    """
+    Rolling sum of `values` over `window` steps, cached per series and window.
+    """
+    return RollingEngine.get(values).window(window, centered)
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import numpy as np
+from precip.objects.classes.utils.climatology import baseline_statistics, baseline_slots
+
+
+class SiteMatrix:
+    """
+    Daily precipitation of many sites on a common time axis: one float32 array of shape (site, time).
+
+    Each row is the area average of a site, days without data are NaN. Catalog scale analyses work on
+    the whole matrix at once instead of looping over the sites.
+
+    Args:
+        values (array-like): Precipitation (site, time).
+        time (array-like): Dates of the second axis.
+        ids (array-like): Volcano number of each site.
+        names (array-like): Volcano name of each site.
+        latitude (array-like): Latitude of each site.
+        longitude (array-like): Longitude of each site.
+    """
+    def __init__(self, values, time, ids, names, latitude, longitude) -> None:
+        self.values = np.ascontiguousarray(values, dtype=np.float32)
+        self.time = np.asarray(time, dtype='datetime64[D]')
+        self.ids = np.asarray(ids, dtype=int)
+        self.names = np.asarray(names, dtype=str)
+        self.latitude = np.asarray(latitude, dtype=float)
+        self.longitude = np.asarray(longitude, dtype=float)
+
+        if self.values.shape != (len(self.ids), len(self.time)):
+            raise ValueError(f'Values of shape {self.values.shape} do not match {len(self.ids)} sites and {len(self.time)} dates')
+
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+    def eruptions(self, catalog: dict) -> tuple:
+        """
+        Returns the eruptions of the sites falling within the time axis as two flat arrays, sorted by site
+        then date: the row of the site and the column of the eruption day.
+
+        Args:
+            catalog (dict): {volcano id: [eruption start dates]}, see eruption_catalog.
+        """
+        rows = [np.full(len(catalog.get(id, [])), row) for row, id in enumerate(self.ids)]
+        days = [np.asarray(catalog.get(id, []), dtype='datetime64[D]') for id in self.ids]
+
+        rows = np.concatenate(rows).astype(int) if rows else np.empty(0, dtype=int)
+        days = np.concatenate(days) if days else np.empty(0, dtype='datetime64[D]')
+
+        columns = np.searchsorted(self.time, days)
+        inside = (columns < len(self.time)) & (self.time[np.minimum(columns, len(self.time) - 1)] == days)
+
+        order = np.lexsort((columns[inside], rows[inside]))
+
+        return rows[inside][order], columns[inside][order]
+
+
+    def anomaly(self, standardized: bool = False, baseline: str = 'doy', window: int = 31):
+        """
+        Returns the departure of each site from its own climatology over the whole matrix, divided by
+        the standard deviation of the slot if `standardized`, so sites of different climates can be pooled.
+        """
+        mean, std = baseline_statistics(self.values.T, self.time, window)
+        slots = baseline_slots(self.time, baseline)
+        values = self.values - mean[baseline][slots].T
+
+        if standardized:
+            spread = std[baseline][slots].T
+
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = values / np.where(spread > 0, spread, np.nan)
+
+        return SiteMatrix(values, self.time, self.ids, self.names, self.latitude, self.longitude)
+
+
+    def save(self, path: str) -> None:
+        folder = os.path.dirname(path) or '.'
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=folder, suffix='.npz')
+
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, values=self.values, time=self.time, ids=self.ids, names=self.names, latitude=self.latitude, longitude=self.longitude)
+
+        os.replace(tmp, path)
+
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path) as data:
+            return cls(data['values'], data['time'], data['ids'], data['names'], data['latitude'], data['longitude'])
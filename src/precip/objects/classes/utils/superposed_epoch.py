@@ -0,0 +1,101 @@
+import warnings
+import numpy as np
+import pandas as pd
+from precip.objects.classes.utils.site_matrix import SiteMatrix
+
+
+def epoch_windows(values: np.ndarray, rows: np.ndarray, columns: np.ndarray, before: int, after: int) -> np.ndarray:
+    """
+    Gathers the days from `before` days before to `after` days after each event in a single fancy index.
+
+    Args:
+        values (np.ndarray): (site, time) matrix.
+        rows (np.ndarray): Site of each event.
+        columns (np.ndarray): Day of each event.
+        before (int): Days before the event.
+        after (int): Days after the event.
+
+    Returns:
+        np.ndarray: (event, before + after + 1) windows, NaN outside the time axis.
+    """
+    offsets = np.arange(-before, after + 1)
+    index = np.asarray(columns)[:, np.newaxis] + offsets
+    inside = (index >= 0) & (index < values.shape[1])
+
+    windows = values[np.asarray(rows)[:, np.newaxis], np.clip(index, 0, values.shape[1] - 1)].astype(float)
+    windows[~inside] = np.nan
+
+    return windows
+
+
+def bootstrap_means(windows: np.ndarray, samples: int = 1000, confidence: float = 0.95, seed: int = None) -> tuple:
+    """
+    Mean of the windows and its bootstrap confidence interval, along the first axis.
+
+    Each resample is drawn as multinomial counts of the windows, so all the resamples are reduced
+    together by one matrix product instead of gathering `samples` copies of the windows.
+
+    Returns:
+        tuple: Mean, lower and upper bound, and number of valid windows, one value per column.
+    """
+    windows = np.asarray(windows, dtype=float)
+    windows = windows.reshape(len(windows), int(np.prod(windows.shape[1:])))
+    valid = ~np.isnan(windows)
+    filled = np.where(valid, windows, 0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=0) / valid.sum(axis=0)
+
+        if len(windows) == 0:
+            return mean, mean.copy(), mean.copy(), valid.sum(axis=0)
+
+        weights = np.random.default_rng(seed).multinomial(len(windows), np.full(len(windows), 1 / len(windows)), size=samples).astype(float)
+        resampled = (weights @ filled) / (weights @ valid)
+
+    alpha = (1 - confidence) / 2
+
+    # Columns without data stay NaN, without the 'All-NaN slice' warning
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        lower, upper = np.nanquantile(resampled, [alpha, 1 - alpha], axis=0)
+
+    return mean, lower, upper, valid.sum(axis=0)
+
+
+def superposed_epoch(matrix: SiteMatrix, catalog: dict, before: int = 90, after: int = 30, samples: int = 1000,
+                     confidence: float = 0.95, seed: int = None) -> tuple:
+    """
+    Composite of the precipitation around every eruption of the catalog.
+
+    Args:
+        matrix (SiteMatrix): Daily precipitation (or anomaly) of the sites.
+        catalog (dict): {volcano id: [eruption start dates]}, see eruption_catalog.
+        before (int): Days before the eruptions.
+        after (int): Days after the eruptions.
+        samples (int): Number of bootstrap resamples.
+        confidence (float): Confidence level of the bands.
+        seed (int): Seed of the resampling.
+
+    Returns:
+        tuple: DataFrame of the composite ('Lag', 'Mean', 'Lower', 'Upper', 'Count'), and a dict with the
+               mean of the `before` days preceding the eruptions and its confidence interval.
+    """
+    rows, columns = matrix.eruptions(catalog)
+    windows = epoch_windows(matrix.values, rows, columns, before, after)
+
+    mean, lower, upper, count = bootstrap_means(windows, samples, confidence, seed)
+    composite = pd.DataFrame({'Lag': np.arange(-before, after + 1), 'Mean': mean, 'Lower': lower, 'Upper': upper, 'Count': count})
+
+    # Average of the days preceding each eruption, resampled by eruption
+    head = windows[:, :before]
+    valid = ~np.isnan(head)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        preceding = np.where(valid, head, 0).sum(axis=1) / valid.sum(axis=1)
+
+    pre_mean, pre_lower, pre_upper, pre_count = bootstrap_means(preceding[:, np.newaxis], samples, confidence, seed)
+
+    summary = {'eruptions': len(rows), 'volcanoes': len(np.unique(rows)), 'days': before, 'mean': float(pre_mean[0]),
+               'lower': float(pre_lower[0]), 'upper': float(pre_upper[0]), 'count': int(pre_count[0])}
+
+    return composite, summary
@@ -0,0 +1,85 @@
+import os
+import json
+import tempfile
+import threading
+from datetime import datetime
+
+
+class VerificationLedger:
+    """
+    Persisted record of the integrity checks run on the .nc4 archive.
+
+    Entries are keyed by path and hold the size and modification time of the file when it was checked,
+    so a file is checked again only when it is new or has changed. A 'deep' check (full decompression)
+    also satisfies a later 'header' check.
+
+    Args:
+        path (str): Location of the ledger file.
+        opener (callable): Function used to open the ledger, `open` or an SFTP client's `file` (default: open).
+    """
+    MODES = {'header': 0, 'deep': 1}
+
+
+    def __init__(self, path: str, opener=open) -> None:
+        self.path = path
+        self.opener = opener
+        self.lock = threading.Lock()
+        self.entries = {}
+
+
+    def load(self):
+        try:
+            with self.opener(self.path, 'r') as f:
+                content = f.read()
+
+            self.entries = json.loads(content) if content else {}
+
+        except (IOError, OSError, ValueError):
+            self.entries = {}
+
+        return self
+
+
+    def save(self) -> None:
+        with self.lock:
+            content = json.dumps(self.entries)
+
+        if self.opener is open:
+            folder = os.path.dirname(self.path) or '.'
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=folder, suffix='.tmp')
+
+            with os.fdopen(fd, 'w') as f:
+                f.write(content)
+
+            os.replace(tmp, self.path)
+
+        else:
+            with self.opener(self.path, 'w') as f:
+                f.write(content)
+
+
+    def is_verified(self, file: str, size: int, mtime: float, mode: str = 'header') -> bool:
+        """
+        Returns True if the file has already passed a check at least as thorough as `mode` and is unchanged.
+        """
+        entry = self.entries.get(file)
+
+        if not entry or not entry['valid']:
+            return False
+
+        return entry['size'] == size and entry['mtime'] == int(mtime) and self.MODES[entry['mode']] >= self.MODES[mode]
+
+
+    def record(self, file: str, size: int, mtime: float, valid: bool, mode: str = 'header') -> None:
+        with self.lock:
+            self.entries[file] = {'size': size,
+                                  'mtime': int(mtime),
+                                  'valid': valid,
+                                  'mode': mode,
+                                  'checked': datetime.now().isoformat(timespec='seconds')}
+
+
+    def forget(self, file: str) -> None:
+        with self.lock:
+            self.entries.pop(file, None)
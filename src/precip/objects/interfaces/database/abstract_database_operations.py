@@ -17,6 +17,11 @@ class AbstractDatabaseOperations(ABC):
         pass
 
 
+    @abstractmethod
+    def insert_many(self):
+        pass
+
+
     @abstractmethod
     def record_exists(self):
         pass
\ No newline at end of file
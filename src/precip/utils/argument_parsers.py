@@ -1,5 +1,5 @@
 import os
-from precip.config import START_DATE, END_DATE
+from precip.config import START_DATE, END_DATE, CLIMATOLOGY_PERIOD
 
 
 def add_date_arguments(parser):
@@ -80,6 +80,10 @@ def add_plot_parameters_arguments(parser):
                         metavar=('BINS'),
                         default=1,
                         help='Number of bins for the histogram (default: %(default)s)')
+    plot_parameters.add_argument('--bin-scope',
+                        choices=['global', 'year', 'season'],
+                        default='global',
+                        help='Rank the bins over the whole period, within each year or within each season (DJF, MAM, JJA, SON), default is %(default)s')
     plot_parameters.add_argument('--roll',
                         type=int,
                         metavar=('ROLL'),
@@ -89,6 +93,22 @@ def add_plot_parameters_arguments(parser):
                         action='store_true',
                         dest = 'elnino',
                         help='Plot Nino/Nina events')
+    plot_parameters.add_argument('--anomaly',
+                        nargs='?',
+                        choices=['absolute', 'standardized'],
+                        default=None,
+                        const='absolute',
+                        help='Plot the departure from the climatology (bar, annual and map styles), default is absolute')
+    plot_parameters.add_argument('--baseline',
+                        choices=['doy', 'month'],
+                        default='doy',
+                        help='Day-of-year or monthly climatology of the anomalies, default is %(default)s')
+    plot_parameters.add_argument('--reference-period',
+                        default=CLIMATOLOGY_PERIOD,
+                        metavar='YYYYMMDD:YYYYMMDD',
+                        help='Reference period of the climatology, default is %(default)s.\n'
+                             'The first --anomaly run of a location downloads and extracts every missing day\n'
+                             'of the period (20 years by default), later runs read the stored climatology')
     plot_parameters.add_argument('--no-show',
                         dest='show_flag',
                         action='store_false',
@@ -126,13 +146,16 @@ def add_map_parameters_arguments(parser):
     map_parameters.add_argument('--cumulate',
                         action='store_true',
                         help='Cumulate data')
+    map_parameters.add_argument('--persist-map',
+                        action='store_true',
+                        help='Save the map of each complete year, later maps over these years reuse them')
     map_parameters.add_argument('--average',
                         choices={'D','W','M','Y', None},
                         nargs='?',
                         default=None,
                         const='D',
                         metavar='TIME_PERIOD',
-                        help='Average data, default is daily')
+                        help='Average data, default is daily (not available with --style map)')
     map_parameters.add_argument('--colorbar',
                         default='viridis',
                         metavar='COLORBAR',
@@ -147,6 +170,37 @@ def add_map_parameters_arguments(parser):
     return parser
 
 
+def add_catalog_arguments(parser):
+    """
+    Argument parser for the analyses over the volcano catalog.
+
+    Args:
+        parser (argparse.ArgumentParser): The argument parser object.
+
+    Returns:
+        argparse.ArgumentParser: The argument parser object with added catalog arguments.
+    """
+    catalog = parser.add_argument_group('Volcano catalog')
+    catalog.add_argument('--ids',
+                        nargs='+',
+                        type=int,
+                        metavar='ID',
+                        help='Volcano ids to analyse, default is every volcano of the volcano file')
+    catalog.add_argument('--vei',
+                        type=int,
+                        default=1,
+                        help='Minimum volcanic explosivity index of the eruptions, default is %(default)s')
+    catalog.add_argument('--use-ssh',
+                        action='store_true',
+                        dest='use_ssh',
+                        help='Use ssh')
+    catalog.add_argument('--persist-matrix',
+                        action='store_true',
+                        help='Save the site matrix in the data folder, later runs over the same sites and period reuse it')
+
+    return parser
+
+
 def add_save_arguments(parser):
     """
     Argument parser for the save options.
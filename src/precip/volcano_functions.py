@@ -181,6 +181,36 @@ def extract_volcanoes_info(jsonfile, volcanoId, vei=1, strength=False):
     return start_dates, coordinates, name
 
 
+def eruption_catalog(jsonfile, vei=1):
+    """
+    Reads the start dates of the eruptions of every volcano in a single pass over the JSON data.
+
+    Args:
+        jsonfile (str): The path to the JSON file containing volcano data.
+        vei (int): Minimum volcanic explosivity index.
+
+    Returns:
+        dict: {volcano id: sorted eruption start dates within START_DATE and END_DATE}.
+    """
+    data = get_volcano_json(jsonfile, JSON_DOWNLOAD_URL)
+
+    first_day = datetime.strptime(START_DATE, '%Y%m%d').date()
+    last_day = datetime.strptime(END_DATE, '%Y%m%d').date()
+
+    catalog = {}
+
+    for j in data['features']:
+        if (j['properties']['ExplosivityIndexMax'] or 0) < vei:
+            continue
+
+        start = datetime.strptime((j['properties']['StartDate']), '%Y%m%d').date()
+
+        if first_day <= start <= last_day:
+            catalog.setdefault(j['properties']['VolcanoNumber'], set()).add(start)
+
+    return {id: sorted(dates) for id, dates in catalog.items()}
+
+
 def get_volcanoes():
     """
     Retrieves volcano data from an Excel file and returns a dictionary of volcano information.
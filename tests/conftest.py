@@ -0,0 +1,123 @@
+import os
+import sys
+import tempfile
+import threading
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+os.environ.setdefault('PRECIP_HOME', ROOT)
+
+# The database location is read when precip is imported, it must never be the user's data folder
+os.environ['PRECIP_DIR'] = tempfile.mkdtemp(prefix='precip-tests-')
+
+
+import numpy as np
+import netCDF4 as nc
+import pytest
+
+
+def granule_name(date, run='final'):
+    """ Name of the GES DISC granule of `date`. """
+    prefix = '3B-DAY' if run == 'final' else '3B-DAY-L'
+
+    return f'{prefix}.MS.MRG.3IMERG.{date:%Y%m%d}-S000000-E235959.V07B.nc4'
+
+
+@pytest.fixture
+def database():
+    """
+    Empty database in $PRECIP_DIR, with its table.
+    """
+    from precip.objects.classes.database.sqlite3_database import SQLite3Database
+    from precip.objects.classes.database_operations.sqlite3_operations import SQLite3Operations
+
+    path = os.path.join(os.environ['PRECIP_DIR'], 'volcanoes.db')
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    database = SQLite3Database()
+    database.connect()
+    db_ops = SQLite3Operations(database)
+    db_ops.check_table()
+
+    yield db_ops
+
+    database.close()
+
+
+@pytest.fixture
+def write_granule():
+    """
+    Writes a small daily granule with the GPM layout, precipitation (time, lon, lat).
+    """
+    def write(path, lon, lat, values=None):
+        lon = np.asarray(lon, dtype='float32')
+        lat = np.asarray(lat, dtype='float32')
+
+        if values is None:
+            values = np.arange(len(lon) * len(lat), dtype='float32').reshape(1, len(lon), len(lat))
+
+        with nc.Dataset(path, 'w') as ds:
+            ds.createDimension('time', 1)
+            ds.createDimension('lon', len(lon))
+            ds.createDimension('lat', len(lat))
+            ds.createVariable('time', 'i4', ('time',))[:] = [0]
+            ds.createVariable('lon', 'f4', ('lon',))[:] = lon
+            ds.createVariable('lat', 'f4', ('lat',))[:] = lat
+            ds.createVariable('precipitation', 'f4', ('time', 'lon', 'lat'))[:] = values
+
+        return values
+
+    return write
+
+
+class Routes(dict):
+    """
+    Responses of the test server: {path with query: (status, body)}, unknown paths get a 404.
+    HEAD requests get the status and headers only. Every request path, percent-decoded, is appended to `requests`.
+    """
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+        self.url = None
+
+
+@pytest.fixture
+def http_server():
+    routes = Routes()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.respond(send_body=True)
+
+        def do_HEAD(self):
+            self.respond(send_body=False)
+
+        def respond(self, send_body):
+            path = unquote(self.path)
+            routes.requests.append(path)
+            status, body = routes.get(path, (404, b'Not Found'))
+
+            self.send_response(status)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+
+            if send_body:
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    routes.url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    yield routes
+
+    server.shutdown()
+    server.server_close()
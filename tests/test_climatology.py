@@ -0,0 +1,119 @@
+import os
+import json
+import types
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from conftest import granule_name
+from precip.data_extraction_functions import get_climatology, reextract_dates
+from precip.objects.classes.utils.climatology import Climatology, baseline_slots, baseline_statistics, circular_window_sum
+from precip.objects.classes.utils.precip_cube import PrecipCube
+from precip.objects.classes.utils.map_accumulator import MapAccumulator
+
+LATITUDE = [0.05, 0.15]
+LONGITUDE = [0.05, 0.25]
+
+
+def random_cube(days=3 * 366, seed=0):
+    rng = np.random.default_rng(seed)
+    time = np.datetime64('2019-01-01') + np.arange(days)
+    values = rng.gamma(0.5, 4, (days, 2, 3)).astype('float32')
+    values[rng.random(values.shape) < 0.05] = np.nan
+
+    return PrecipCube(values, time, [0.05, 0.15], [0.05, 0.15, 0.25])
+
+
+def test_slots_put_february_29_apart():
+    time = np.array(['2019-02-28', '2019-03-01', '2020-02-29', '2020-03-01', '2020-12-31'], dtype='datetime64[D]')
+
+    np.testing.assert_array_equal(baseline_slots(time, 'doy'), [58, 60, 59, 60, 365])
+    np.testing.assert_array_equal(baseline_slots(time, 'month'), [1, 2, 1, 2, 11])
+
+
+def test_statistics_match_a_groupby():
+    cube = random_cube()
+    mean, std = baseline_statistics(cube.values, cube.time, window=1)
+
+    for baseline in ('doy', 'month'):
+        frame = pd.DataFrame(cube.values.reshape(len(cube), -1))
+        grouped = frame.groupby(baseline_slots(cube.time, baseline))
+
+        np.testing.assert_allclose(mean[baseline].reshape(len(mean[baseline]), -1), grouped.mean().to_numpy(), rtol=1e-5)
+        np.testing.assert_allclose(std[baseline].reshape(len(std[baseline]), -1), grouped.std().to_numpy(), rtol=1e-4, atol=1e-6)
+
+
+def test_circular_window_wraps_around_the_year():
+    values = np.arange(366, dtype=float)[:, np.newaxis]
+    total = circular_window_sum(values, 31)
+
+    assert total[100, 0] == values[85:116].sum()
+    assert total[0, 0] == values[:16].sum() + values[351:].sum()
+
+
+def test_standardized_anomaly():
+    cube = random_cube()
+    climatology = Climatology.from_cube(cube, window=1)
+    anomaly = climatology.anomaly(cube, 'month', standardized=True)
+    slots = baseline_slots(cube.time, 'month')
+
+    expected = (cube.values - climatology.mean['month'][slots]) / climatology.std['month'][slots]
+    np.testing.assert_allclose(anomaly.values, expected, rtol=1e-4)
+
+
+def test_missing_day_is_not_a_deficit():
+    time = np.datetime64('2019-01-01') + np.arange(365)
+    climatology = Climatology.from_cube(PrecipCube(np.full((365, 2, 3), 2.0), time, [0.05, 0.15], [0.05, 0.15, 0.25]), window=1)
+    accumulator = MapAccumulator()
+
+    # 2020-01-04 is missing from the database
+    for day in range(10):
+        if day != 3:
+            accumulator.add(np.full((2, 3), 2.0))
+
+    period = np.datetime64('2020-01-01') + np.arange(10)
+
+    np.testing.assert_allclose(climatology.anomaly_map(accumulator, period, cumulate=True), 0)
+    np.testing.assert_allclose(climatology.anomaly_map(accumulator, period), 0)
+
+
+def test_reextraction_invalidates_the_stored_climatology(database, tmp_path, write_granule):
+    days = [date(2019, 1, 1) + timedelta(days=i) for i in range(10)]
+    database.insert_many(LATITUDE, LONGITUDE, [(day, json.dumps(np.ones((1, 3, 2)).tolist()), 6) for day in days])
+    inps = types.SimpleNamespace(latitude=LATITUDE, longitude=LONGITUDE, gpm_dir=str(tmp_path), use_ssh=False)
+
+    climatology = get_climatology(inps, '20190101:20190110', window=1)
+    path = tmp_path / 'climatology' / '0.05_0.15_0.05_0.25_20190101_20190110_1.npz'
+
+    assert os.path.exists(path)
+    assert climatology.mean['doy'][0, 0, 0] == 1
+
+    # A date outside of the reference period leaves it alone
+    reextract_dates(str(tmp_path), [date(2019, 2, 1)])
+    assert os.path.exists(path)
+
+    write_granule(str(tmp_path / granule_name(days[0])), [0.05, 0.15, 0.25], LATITUDE, np.full((1, 3, 2), 11, dtype='float32'))
+    reextract_dates(str(tmp_path), [days[0]])
+
+    assert not os.path.exists(path)
+    assert get_climatology(inps, '20190101:20190110', window=1).mean['doy'][0, 0, 0] == 11
+
+
+def test_climatology_is_streamed_from_the_database(database, tmp_path, monkeypatch):
+    cube = random_cube(days=2 * 365)
+    cube = PrecipCube(cube.values, cube.time, LATITUDE, [0.05, 0.15, 0.25], np.full(len(cube), 7))
+    database.insert_many(LATITUDE, LONGITUDE, cube.to_rows())
+    inps = types.SimpleNamespace(latitude=LATITUDE, longitude=LONGITUDE, gpm_dir=str(tmp_path), use_ssh=False)
+
+    # The reference period is never decoded as a whole
+    def from_records(*args, **kwargs):
+        raise AssertionError('reference period loaded at once')
+
+    monkeypatch.setattr(PrecipCube, 'from_records', from_records)
+    climatology = get_climatology(inps, '20190101:20191231', window=5)
+    expected = Climatology.from_cube(PrecipCube(cube.values[:365], cube.time[:365], cube.latitude, cube.longitude), window=5)
+
+    assert climatology.reference == ('2019-01-01', '2019-12-31')
+
+    for baseline in ('doy', 'month'):
+        np.testing.assert_allclose(climatology.mean[baseline], expected.mean[baseline], rtol=1e-6)
+        np.testing.assert_allclose(climatology.std[baseline], expected.std[baseline], rtol=1e-5, atol=1e-6)
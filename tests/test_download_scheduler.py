@@ -0,0 +1,114 @@
+import os
+import json
+from precip.objects.classes.file_manager.download_scheduler import DownloadScheduler, BACKFILL, QUEUE_FILE
+
+
+def read_queue(folder):
+    with open(os.path.join(folder, QUEUE_FILE)) as f:
+        return json.load(f)
+
+
+def test_processes_sharing_the_folder_merge_their_queues(tmp_path):
+    folder = str(tmp_path)
+    a = DownloadScheduler(folder)
+    b = DownloadScheduler(folder)
+
+    a.push('http://host/a.nc4', BACKFILL)
+    a.save_queue()
+    b.push('http://host/b.nc4', BACKFILL)
+    b.failed.append('http://host/c.nc4')
+    b.attempts['http://host/c.nc4'] = 8
+    b.save_queue()
+
+    state = read_queue(folder)
+
+    assert set(state['pending']) == {'http://host/a.nc4', 'http://host/b.nc4'}
+    assert state['failed'] == ['http://host/c.nc4']
+    assert state['attempts'] == {'http://host/c.nc4': 8}
+
+
+def test_completed_urls_leave_the_shared_queue(tmp_path):
+    folder = str(tmp_path)
+    a = DownloadScheduler(folder)
+    a.push('http://host/a.nc4', BACKFILL)
+    a.save_queue()
+
+    # Another process downloaded the file in the meantime
+    b = DownloadScheduler(folder)
+    b.done.add('http://host/a.nc4')
+    b.save_queue()
+
+    assert not os.path.exists(os.path.join(folder, QUEUE_FILE))
+
+
+def test_foreground_download_leaves_the_backfill_queued(tmp_path, http_server, write_granule):
+    write_granule(str(tmp_path / 'source.nc4'), [0, 1], [0, 1])
+    http_server['/a.nc4'] = (200, (tmp_path / 'source.nc4').read_bytes())
+    http_server['/b.nc4'] = (200, (tmp_path / 'source.nc4').read_bytes())
+    folder = str(tmp_path / 'gpm')
+
+    results = DownloadScheduler(folder).download([f'{http_server.url}/a.nc4'], backfill=[f'{http_server.url}/b.nc4'])
+
+    assert [r['status'] for r in results] == ['downloaded']
+    assert http_server.requests == ['/a.nc4']
+    assert read_queue(folder)['pending'] == [f'{http_server.url}/b.nc4']
+
+    # The next foreground run does not pick up the persisted backfill either
+    DownloadScheduler(folder).download([f'{http_server.url}/a.nc4'])
+
+    assert http_server.requests == ['/a.nc4']
+    assert read_queue(folder)['pending'] == [f'{http_server.url}/b.nc4']
+
+
+def test_background_download_drains_the_backfill(tmp_path, http_server, write_granule):
+    write_granule(str(tmp_path / 'source.nc4'), [0, 1], [0, 1])
+    http_server['/a.nc4'] = (200, (tmp_path / 'source.nc4').read_bytes())
+    http_server['/b.nc4'] = (200, (tmp_path / 'source.nc4').read_bytes())
+    folder = str(tmp_path / 'gpm')
+
+    scheduler = DownloadScheduler(folder)
+    scheduler.download([f'{http_server.url}/a.nc4'], backfill=[f'{http_server.url}/b.nc4'], background=True)
+    scheduler.backfill_thread.join(10)
+
+    assert sorted(os.listdir(folder)) == ['.locks', 'a.nc4', 'b.nc4']
+
+
+def test_missing_files_are_not_persisted(tmp_path, http_server):
+    folder = str(tmp_path / 'gpm')
+    url = f'{http_server.url}/missing.nc4'
+
+    results = DownloadScheduler(folder, base_delay=0.01).download([url])
+
+    assert results[0]['status'] == 'failed' and results[0]['code'] == 404
+    assert http_server.requests == ['/missing.nc4']
+    assert not os.path.exists(os.path.join(folder, QUEUE_FILE))
+
+
+def test_server_errors_are_kept_for_the_next_run(tmp_path, http_server):
+    folder = str(tmp_path / 'gpm')
+    url = f'{http_server.url}/busy.nc4'
+    http_server['/busy.nc4'] = (503, b'Busy')
+
+    DownloadScheduler(folder, max_attempts=2, base_delay=0.01).download([url])
+
+    assert len(http_server.requests) == 2
+    assert read_queue(folder)['failed'] == [url]
+
+
+def test_missing_backfill_days_do_not_delay_the_host(tmp_path, http_server, write_granule):
+    write_granule(str(tmp_path / 'source.nc4'), [0, 1], [0, 1])
+    folder = str(tmp_path / 'gpm')
+    published = [f'{http_server.url}/day{i}.nc4' for i in range(3)]
+    unpublished = [f'{http_server.url}/late{i}.nc4' for i in range(6)]
+
+    for url in published:
+        http_server[url[len(http_server.url):]] = (200, (tmp_path / 'source.nc4').read_bytes())
+
+    # Any backoff would hold the interactive download for up to a minute
+    scheduler = DownloadScheduler(folder, base_delay=60)
+    scheduler.download(unpublished[:3] + published[:1], backfill=unpublished[3:] + published[1:], background=True)
+    scheduler.backfill_thread.join(10)
+
+    assert not scheduler.backfill_thread.is_alive()
+    assert scheduler.host_errors == {'127.0.0.1': 0} and scheduler.host_ready == {}
+    assert sorted(f for f in os.listdir(folder) if f.endswith('.nc4')) == ['day0.nc4', 'day1.nc4', 'day2.nc4']
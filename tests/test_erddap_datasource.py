@@ -0,0 +1,74 @@
+import os
+from datetime import date
+import numpy as np
+import pytest
+from precip.objects.classes.data_extractor.erddap_datasource import ERDDAPDataSource
+
+LATITUDE = [0.05, 0.05]
+LONGITUDE = [0.05, 0.05]
+DATASET = '/erddap/griddap/imerg'
+
+
+def point(day, value):
+    return f'{day:%Y-%m-%d}T00:00:00Z,0.05,0.05,{value}\n'
+
+
+def query(start, end):
+    return (f'{DATASET}.csv0?prec[({start:%Y-%m-%d}):1:({end:%Y-%m-%d})]'
+            f'[(0.05):1:(0.05)][(0.05):1:(0.05)]')
+
+
+@pytest.fixture
+def erddap(http_server):
+    """ Dataset covering 2020-01-01 to 2020-01-03 with one value per day. """
+    http_server[f'{DATASET}.csv0?time[0]'] = (200, b'2020-01-01T00:00:00Z\n')
+    http_server[f'{DATASET}.csv0?time[last]'] = (200, b'2020-01-03T00:00:00Z\n')
+
+    return http_server
+
+
+def days(first, last):
+    return [date(2020, 1, d) for d in range(first, last + 1)]
+
+
+def test_batches_are_requested_separately(erddap, tmp_path):
+    erddap[query(date(2020, 1, 1), date(2020, 1, 2))] = (200, (point(date(2020, 1, 1), 1.5) + point(date(2020, 1, 2), 2.5)).encode())
+    erddap[query(date(2020, 1, 3), date(2020, 1, 3))] = (200, point(date(2020, 1, 3), 3.5).encode())
+
+    source = ERDDAPDataSource(erddap.url + DATASET, cache=str(tmp_path), batch_days=2)
+    cube = source.get_data(LATITUDE, LONGITUDE, days(1, 3))
+
+    assert cube.shape == (3, 1, 1)
+    np.testing.assert_array_equal(cube.time, np.array(days(1, 3), dtype='datetime64[D]'))
+    np.testing.assert_array_equal(cube.values.ravel(), [1.5, 2.5, 3.5])
+
+
+def test_complete_batches_are_served_from_the_cache(erddap, tmp_path):
+    erddap[query(date(2020, 1, 1), date(2020, 1, 2))] = (200, (point(date(2020, 1, 1), 1.5) + point(date(2020, 1, 2), 2.5)).encode())
+
+    ERDDAPDataSource(erddap.url + DATASET, cache=str(tmp_path)).get_data(LATITUDE, LONGITUDE, days(1, 2))
+    asked = len(erddap.requests)
+
+    cube = ERDDAPDataSource(erddap.url + DATASET, cache=str(tmp_path)).get_data(LATITUDE, LONGITUDE, days(1, 2))
+
+    # Only the coverage is asked again
+    assert erddap.requests[asked:] == [f'{DATASET}.csv0?time[0]', f'{DATASET}.csv0?time[last]']
+    np.testing.assert_array_equal(cube.values.ravel(), [1.5, 2.5])
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_batch_past_the_end_of_the_dataset_keeps_the_valid_days(erddap, tmp_path):
+    # The server rejects any range past 2020-01-03 with a 404
+    erddap[query(date(2020, 1, 2), date(2020, 1, 3))] = (200, (point(date(2020, 1, 2), 2.5) + point(date(2020, 1, 3), 3.5)).encode())
+
+    cube = ERDDAPDataSource(erddap.url + DATASET, cache=str(tmp_path)).get_data(LATITUDE, LONGITUDE, days(2, 9))
+
+    np.testing.assert_array_equal(cube.time, np.array(days(2, 3), dtype='datetime64[D]'))
+    np.testing.assert_array_equal(cube.values.ravel(), [2.5, 3.5])
+
+
+def test_range_outside_the_dataset_is_not_requested(erddap, tmp_path):
+    cube = ERDDAPDataSource(erddap.url + DATASET, cache=str(tmp_path)).get_data(LATITUDE, LONGITUDE, days(5, 9))
+
+    assert len(cube) == 0
+    assert erddap.requests == [f'{DATASET}.csv0?time[0]', f'{DATASET}.csv0?time[last]']
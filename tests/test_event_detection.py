@@ -0,0 +1,115 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import pytest
+from precip.objects.classes.utils.event_detection import detect_events, exceedance_runs
+from precip.objects.classes.utils.site_matrix import SiteMatrix
+
+
+def matrix(values, start=date(2020, 1, 1), ids=None):
+    values = np.atleast_2d(np.asarray(values, dtype='float32'))
+    ids = ids if ids is not None else np.arange(len(values)) + 1000
+    time = np.datetime64(start) + np.arange(values.shape[1])
+
+    return SiteMatrix(values, time, ids, [f'v{i}' for i in ids], np.zeros(len(ids)), np.zeros(len(ids)))
+
+
+def january(day):
+    return date(2020, 1, day)
+
+
+@pytest.mark.parametrize('eruption, lag, precedes', [
+    (january(4), -1, False),   # Inside the run
+    (january(5), 0, True),     # Last day of the run
+    (january(20), 15, True),
+    (date(2020, 2, 20), 46, False),
+])
+def test_lag_and_precedence(eruption, lag, precedes):
+    # Jan 4-5 is the only run above the 90th percentile
+    values = np.ones(60)
+    values[3:5] = [10, 12]
+
+    events = detect_events(matrix(values), {1000: [eruption]}, percentile=90, lead=30)
+
+    assert len(events) == 1
+    assert events.loc[0, 'Start'] == np.datetime64(january(4)) and events.loc[0, 'End'] == np.datetime64(january(5))
+    assert events.loc[0, 'Lag'] == lag
+    assert bool(events.loc[0, 'Precedes']) is precedes
+
+
+def test_runs_of_each_row():
+    mask = np.array([[1, 1, 0, 1], [0, 0, 0, 0], [0, 1, 1, 1]], dtype=bool)
+    rows, starts, ends = exceedance_runs(mask)
+
+    np.testing.assert_array_equal(rows, [0, 0, 2])
+    np.testing.assert_array_equal(starts, [0, 3, 1])
+    np.testing.assert_array_equal(ends, [1, 3, 3])
+
+
+def test_peak_is_the_first_maximum_of_each_run():
+    values = np.ones((2, 12))
+    values[0, 2:5] = [5, 7, 7]      # Tie, the first day is kept
+    values[0, 10:12] = [9, 6]       # Run reaching the end of the row
+    values[1, 0:2] = [8, 4]         # Run starting the row, right after the one above in the flat layout
+
+    events = detect_events(matrix(values), {}, percentile=60)
+
+    assert events['Peak'].tolist() == [7, 9, 8]
+    assert [str(d)[:10] for d in events['Peak date']] == ['2020-01-04', '2020-01-11', '2020-01-01']
+
+
+def test_matches_a_loop_over_the_sites():
+    rng = np.random.default_rng(1)
+    values = rng.gamma(0.4, 6, (12, 3 * 365)).astype('float32')
+    values[rng.random(values.shape) < 0.02] = np.nan
+    values[3] = np.nan
+    m = matrix(values, start=date(2001, 1, 1))
+    catalog = {int(i): sorted({date(2001, 1, 1) + timedelta(days=int(x)) for x in rng.integers(0, values.shape[1], 4)}) for i in m.ids[::2]}
+
+    events = detect_events(m, catalog, [1, 30], 95, 90)
+
+    for window in (1, 30):
+        for site, id in enumerate(m.ids):
+            series = pd.Series(values[site].astype(float))
+            series = series.rolling(window).sum().to_numpy() if window > 1 else series.to_numpy()
+            found = events[(events['Id'] == id) & (events['Window'] == window)].reset_index(drop=True)
+
+            if np.isnan(series).all():
+                assert found.empty
+                continue
+
+            above = series > np.nanpercentile(series, 95)
+            runs = []
+            day = 0
+
+            while day < len(above):
+                if above[day]:
+                    end = day
+
+                    while end + 1 < len(above) and above[end + 1]:
+                        end += 1
+
+                    runs.append((day, end))
+                    day = end + 1
+
+                else:
+                    day += 1
+
+            assert len(runs) == len(found)
+
+            eruptions = [np.datetime64(d, 'D') for d in catalog.get(int(id), [])]
+
+            for (start, end), row in zip(runs, found.itertuples(index=False)):
+                run = series[start:end + 1]
+
+                assert (m.time[start], m.time[end]) == (row.Start, row.End)
+                assert np.isclose(run.max(), row.Peak) and m.time[start + np.argmax(run)] == row[8]
+
+                following = [d for d in eruptions if d >= m.time[start]]
+
+                if following:
+                    lag = (following[0] - m.time[end]).astype(int)
+                    assert following[0] == row.Eruption and lag == row.Lag and row.Precedes == (0 <= lag <= 90)
+
+                else:
+                    assert pd.isna(row.Eruption) and not row.Precedes
@@ -0,0 +1,165 @@
+import json
+import asyncio
+import concurrent.futures
+import types
+from datetime import date
+import numpy as np
+import pytest
+from conftest import granule_name
+import precip.data_extraction_functions as extraction
+import precip.objects.classes.data_extractor.local_nc4_data as local_nc4_data
+from precip.objects.classes.data_extractor.local_nc4_data import LocalNC4Data
+from precip.objects.classes.data_extractor.nc4_datasource import NC4DataSource
+
+LON = np.round(np.arange(-0.45, 0.5, 0.1), 2)
+LAT = np.round(np.arange(-0.25, 0.3, 0.1), 2)
+DAYS = [date(2020, 1, d) for d in range(1, 11)]
+
+
+class Rows:
+    """ Database operations recording the inserted rows. """
+    def __init__(self, fail=False):
+        self.rows = []
+        self.fail = fail
+
+    def insert_many(self, latitude, longitude, batch):
+        if self.fail:
+            raise RuntimeError('database is locked')
+
+        self.rows.extend(batch)
+
+
+def inputs(folder, latitude=(LAT[1], LAT[2]), longitude=(LON[0], LON[1])):
+    return types.SimpleNamespace(latitude=list(latitude), longitude=list(longitude), gpm_dir=str(folder), use_ssh=False, backfill=False)
+
+
+def run(inps, db_ops, dates=DAYS, **kwargs):
+    source = NC4DataSource(LocalNC4Data(inps.gpm_dir))
+    pipeline = extraction.extraction_pipeline(source, db_ops, inps, dates, workers=2, **kwargs)
+
+    # A hung pipeline fails the test instead of blocking it
+    return asyncio.run(asyncio.wait_for(pipeline, 60))
+
+
+@pytest.fixture
+def archive(tmp_path, write_granule):
+    for i, day in enumerate(DAYS):
+        write_granule(str(tmp_path / granule_name(day)), LON, LAT, np.full((1, len(LON), len(LAT)), i, dtype='float32'))
+
+    return tmp_path
+
+
+def test_every_file_is_inserted(archive):
+    db_ops = Rows()
+
+    assert run(inputs(archive), db_ops) == len(DAYS)
+    assert sorted(row[0] for row in db_ops.rows) == [str(day) for day in DAYS]
+    assert np.array(json.loads(db_ops.rows[0][1])).shape == (1, 2, 2)
+
+
+def test_unreadable_file_is_skipped(archive):
+    # netCDF4 raises OSError, not ValueError, on a broken file
+    (archive / granule_name(DAYS[3])).write_bytes(b'not a netCDF file')
+    db_ops = Rows()
+
+    assert run(inputs(archive), db_ops) == len(DAYS) - 1
+    assert str(DAYS[3]) not in {row[0] for row in db_ops.rows}
+
+
+def test_writer_failure_is_raised(archive):
+    with pytest.raises(RuntimeError, match='database is locked'):
+        run(inputs(archive), Rows(fail=True), batch_size=1)
+
+
+def test_writer_failure_stops_the_download(archive, monkeypatch):
+    def download_precipitation(use_ssh, date_list, gpm_dir, on_complete=None, backfill=False):
+        for day in date_list:
+            on_complete({'path': str(archive / granule_name(day))})
+
+    # Half of the archive is 'downloaded' while the extraction runs
+    for day in DAYS[5:]:
+        (archive / granule_name(day)).rename(archive / f'{granule_name(day)}.bak')
+
+    def rename_back(use_ssh, date_list, gpm_dir, **kwargs):
+        for day in date_list:
+            (archive / f'{granule_name(day)}.bak').rename(archive / granule_name(day))
+
+        download_precipitation(use_ssh, date_list, gpm_dir, **kwargs)
+
+    monkeypatch.setattr(extraction, 'download_precipitation', rename_back)
+
+    with pytest.raises(RuntimeError, match='database is locked'):
+        run(inputs(archive), Rows(fail=True), batch_size=1)
+
+
+def test_pool_is_shared_between_locations(archive):
+    first, second = Rows(), Rows()
+
+    with extraction.extraction_pool(2) as executor:
+        run(inputs(archive), first, executor=executor)
+        run(inputs(archive, longitude=(LON[3], LON[5])), second, executor=executor)
+
+    assert len(first.rows) == len(second.rows) == len(DAYS)
+    assert np.array(json.loads(second.rows[0][1])).shape == (1, 3, 2)
+
+
+def test_fill_missing_dates_inside_a_running_loop(archive, database):
+    # As from a Jupyter cell, where asyncio.run raises
+    inps = inputs(archive)
+    inps.date_list = DAYS
+    source = NC4DataSource(LocalNC4Data(inps.gpm_dir))
+
+    async def cell():
+        extraction.fill_missing_dates(database, source, database.database, inps)
+
+    asyncio.run(cell())
+
+    assert len(database.select_data('SELECT Date FROM volcanoes')) == len(DAYS)
+
+
+def test_final_granule_wins_over_the_late_granule(tmp_path, write_granule, database):
+    # Both runs are V07, only the file name tells them apart
+    day = DAYS[0]
+    late = write_granule(str(tmp_path / granule_name(day, 'late')), LON, LAT, np.full((1, len(LON), len(LAT)), 1, dtype='float32'))
+    final = write_granule(str(tmp_path / granule_name(day)), LON, LAT, np.full((1, len(LON), len(LAT)), 2, dtype='float32'))
+    inps = inputs(tmp_path)
+    inps.date_list = [day]
+    source = NC4DataSource(LocalNC4Data(inps.gpm_dir))
+
+    results = extraction.extract_precipitation_data(database, source, database.database, inps)
+
+    assert len(results) == 1
+    assert np.all(np.array(json.loads(results['Precipitation'].iloc[0])) == final[0, 0, 0])
+    assert np.all(np.array(json.loads(results['Precipitation'].iloc[0])) != late[0, 0, 0])
+    assert (tmp_path / granule_name(day, 'late')).exists()
+
+
+def test_site_matrix_opens_each_file_once(archive, database, monkeypatch):
+    opened = []
+    dataset = local_nc4_data.nc.Dataset
+
+    def counting(path, *args, **kwargs):
+        opened.append(path)
+        return dataset(path, *args, **kwargs)
+
+    # Threads instead of processes, so the opened files can be counted
+    monkeypatch.setattr(local_nc4_data.nc, 'Dataset', counting)
+    monkeypatch.setattr(extraction, 'extraction_pool', lambda workers=None: concurrent.futures.ThreadPoolExecutor(
+        2, initializer=extraction.init_extract_worker, initargs=(LON, LAT)))
+
+    volcanoes = {1: {'name': 'North', 'latitude': '0.12', 'longitude': '-0.23'},
+                 2: {'name': 'South', 'latitude': '-0.13', 'longitude': '0.31'}}
+    inps = inputs(archive)
+    inps.date_list = DAYS
+
+    matrix = extraction.get_site_matrix(inps, volcanoes)
+
+    assert sorted(opened) == sorted(str(archive / granule_name(day)) for day in DAYS)
+    np.testing.assert_array_equal(matrix.values, [np.arange(len(DAYS))] * 2)
+
+    # Rows of the dates between those of date_list stay out of the matrix
+    inps.date_list = DAYS[1::3]
+    matrix = extraction.get_site_matrix(inps, volcanoes)
+
+    assert len(opened) == len(DAYS)
+    np.testing.assert_array_equal(matrix.values, [np.arange(1, len(DAYS), 3)] * 2)
@@ -0,0 +1,40 @@
+import os
+import threading
+import time
+from precip.objects.classes.utils.file_lock import FileLock
+
+
+def test_lock_file_is_removed_on_release(tmp_path):
+    path = str(tmp_path / '.locks' / 'granule.nc4.lock')
+
+    with FileLock(path):
+        assert os.path.exists(path)
+
+    assert not os.path.exists(path)
+
+
+def test_waiting_process_gets_the_lock_after_removal(tmp_path):
+    path = str(tmp_path / 'granule.nc4.lock')
+    first = FileLock(path)
+    second = FileLock(path)
+    order = []
+
+    first.acquire()
+
+    def wait():
+        second.acquire()
+        order.append('second')
+        second.release()
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    time.sleep(0.2)
+
+    assert not FileLock(path).acquire(blocking=False)
+
+    order.append('first')
+    first.release()
+    thread.join(5)
+
+    assert order == ['first', 'second']
+    assert not os.path.exists(path)
@@ -0,0 +1,170 @@
+import os
+import json
+import gc
+import shutil
+from precip.objects.classes.utils.granule_cache import GranuleCache, CACHES
+
+
+class LocalSFTP:
+    """ SFTP client reading from a local folder. """
+    def __init__(self):
+        self.gets = 0
+
+    def stat(self, path):
+        return os.stat(path)
+
+    def get(self, remote, local):
+        self.gets += 1
+        shutil.copy(remote, local)
+
+
+def remote_file(folder, name, size=100):
+    path = os.path.join(folder, name)
+
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+
+    return path
+
+
+def read_index(cache):
+    with open(cache.index_path) as f:
+        return json.load(f)
+
+
+def test_hit_is_served_from_cache(tmp_path):
+    remote = remote_file(tmp_path, '3B-DAY.20200101.nc4')
+    cache = GranuleCache(str(tmp_path / 'cache'))
+    sftp = LocalSFTP()
+
+    first = cache.get(remote, sftp)
+    second = cache.get(remote, sftp)
+
+    assert first == second
+    assert sftp.gets == 1
+
+
+def test_hit_access_time_is_written_lazily(tmp_path):
+    remote = remote_file(tmp_path, '3B-DAY.20200101.nc4')
+    cache = GranuleCache(str(tmp_path / 'cache'))
+    sftp = LocalSFTP()
+
+    cache.get(remote, sftp)
+    cache.flush()
+    saved = read_index(cache)['3B-DAY.20200101.nc4']['atime']
+
+    cache.get(remote, sftp)
+    assert read_index(cache)['3B-DAY.20200101.nc4']['atime'] == saved
+
+    cache.flush()
+    assert read_index(cache)['3B-DAY.20200101.nc4']['atime'] > saved
+
+
+def test_processes_sharing_the_folder_keep_each_other_entries(tmp_path):
+    first = remote_file(tmp_path, '3B-DAY.20200101.nc4')
+    second = remote_file(tmp_path, '3B-DAY.20200102.nc4')
+    folder = str(tmp_path / 'cache')
+
+    # Two instances opened before either inserts anything, like two jobs started together
+    a = GranuleCache(folder)
+    b = GranuleCache(folder)
+
+    a.get(first, LocalSFTP())
+    b.get(second, LocalSFTP())
+    a.close()
+    b.close()
+
+    assert set(read_index(a)) == {'3B-DAY.20200101.nc4', '3B-DAY.20200102.nc4'}
+
+
+def test_discarded_entry_is_not_restored_by_the_merge(tmp_path):
+    remote = remote_file(tmp_path, '3B-DAY.20200101.nc4')
+    folder = str(tmp_path / 'cache')
+
+    a = GranuleCache(folder)
+    a.get(remote, LocalSFTP())
+    a.close()
+
+    b = GranuleCache(folder)
+    b.discard(remote)
+    b.close()
+
+    assert read_index(b) == {}
+    assert not os.path.exists(os.path.join(folder, '3B-DAY.20200101.nc4'))
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    files = [remote_file(tmp_path, f'3B-DAY.2020010{i}.nc4') for i in range(1, 4)]
+    cache = GranuleCache(str(tmp_path / 'cache'), max_size=250)
+    sftp = LocalSFTP()
+
+    cache.get(files[0], sftp)
+    cache.get(files[1], sftp)
+    cache.get(files[0], sftp)
+    cache.get(files[2], sftp)
+
+    assert set(read_index(cache)) == {'3B-DAY.20200101.nc4', '3B-DAY.20200103.nc4'}
+
+
+def test_index_is_written_in_batches(tmp_path):
+    files = [remote_file(tmp_path, f'3B-DAY.202001{i:02d}.nc4') for i in range(1, 6)]
+    cache = GranuleCache(str(tmp_path / 'cache'))
+    cache.SAVE_EVERY = 3
+
+    for file in files[:2]:
+        cache.get(file, LocalSFTP())
+
+    assert not os.path.exists(cache.index_path)
+
+    cache.get(files[2], LocalSFTP())
+    assert len(read_index(cache)) == 3
+
+    cache.get(files[3], LocalSFTP())
+    cache.close()
+    assert len(read_index(cache)) == 4
+
+
+def test_hit_of_another_process_is_not_evicted(tmp_path):
+    files = [remote_file(tmp_path, f'3B-DAY.2020010{i}.nc4') for i in range(1, 4)]
+    folder = str(tmp_path / 'cache')
+
+    a = GranuleCache(folder, max_size=250)
+    a.get(files[0], LocalSFTP())
+    a.get(files[1], LocalSFTP())
+    a.close()
+
+    # b hits the oldest entry, its access time is not written yet when a evicts
+    b = GranuleCache(folder, max_size=250)
+    path = b.get(files[0], LocalSFTP())
+    a.get(files[2], LocalSFTP())
+
+    assert os.path.exists(path)
+    assert set(read_index(a)) == {'3B-DAY.20200101.nc4', '3B-DAY.20200103.nc4'}
+
+
+def test_files_missing_from_the_index_are_evicted(tmp_path):
+    files = [remote_file(tmp_path, f'3B-DAY.2020010{i}.nc4') for i in range(1, 4)]
+    folder = str(tmp_path / 'cache')
+
+    # Inserted by a process that died before writing the index
+    crashed = GranuleCache(folder, max_size=250)
+    crashed.get(files[0], LocalSFTP())
+    CACHES.discard(crashed)
+
+    cache = GranuleCache(folder, max_size=250)
+    cache.get(files[1], LocalSFTP())
+    cache.get(files[2], LocalSFTP())
+    cache.close()
+
+    assert set(read_index(cache)) == {'3B-DAY.20200102.nc4', '3B-DAY.20200103.nc4'}
+    assert not os.path.exists(os.path.join(folder, '3B-DAY.20200101.nc4'))
+
+
+def test_caches_are_not_kept_alive_for_the_exit_flush(tmp_path):
+    cache = GranuleCache(str(tmp_path / 'cache'))
+    assert cache in CACHES
+
+    del cache
+    gc.collect()
+
+    assert not any(c.folder == str(tmp_path / 'cache') for c in CACHES)
@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta
+import numpy as np
+import pandas as pd
+from precip.helper_functions import date_to_decimal_year, decimal_years, check_missing_dates, missing_date_ranges, adapt_events, derived_frame, volcano_rain_frame
+
+
+def loop_decimal_year(day):
+    """ Day by day conversion the vectorized one replaces. """
+    length = 366.0 if (day.year % 4 == 0 and day.year % 100 != 0) or day.year % 400 == 0 else 365.0
+
+    return round(day.year + (day.timetuple().tm_yday - 1) / length, 4)
+
+
+def test_decimal_years_match_the_day_by_day_conversion():
+    days = [date(1999, 1, 1) + timedelta(days=i) for i in range(0, 10000, 7)] + [date(2000, 12, 31), date(2100, 3, 1)]
+
+    np.testing.assert_array_equal(decimal_years(days), [loop_decimal_year(d) for d in days])
+
+
+def test_decimal_year_accepts_the_former_inputs():
+    assert date_to_decimal_year('2022-01-01') == 2022.0
+    assert date_to_decimal_year('20240701') == loop_decimal_year(date(2024, 7, 1))
+    assert date_to_decimal_year(date(2024, 7, 1)) == loop_decimal_year(date(2024, 7, 1))
+    assert date_to_decimal_year(None) is None
+    assert np.isnan(decimal_years([pd.NaT, '2020-01-01'])[0])
+
+
+def test_missing_dates_match_a_scan_of_the_column():
+    rng = np.random.default_rng(0)
+    date_list = [date(2020, 1, 1) + timedelta(days=i) for i in range(400)]
+    column = pd.Series([str(d) for d in date_list if rng.random() < 0.7])
+
+    available = pd.to_datetime(column).dt.date.tolist()
+
+    assert check_missing_dates(date_list, column) == [d for d in date_list if d not in available]
+    assert check_missing_dates(date_list, pd.Series([], dtype=str)) == date_list
+
+
+def test_missing_ranges_are_the_gaps():
+    date_list = [date(2020, 1, d) for d in range(1, 11)]
+    column = [date(2020, 1, d) for d in (1, 2, 5, 9)]
+
+    assert missing_date_ranges(date_list, column) == [(date(2020, 1, 3), date(2020, 1, 4)), (date(2020, 1, 6), date(2020, 1, 8)), (date(2020, 1, 10), date(2020, 1, 10))]
+    assert missing_date_ranges(date_list, date_list) == []
+
+
+def test_events_snap_to_the_period_holding_them():
+    # Start of each averaging period, as in the bar plots
+    periods = pd.Series(pd.to_datetime(['2020-01-01', '2020-02-01', '2020-03-01', '2020-04-01']))
+    events = [datetime(2020, 1, 15, 13), date(2020, 3, 1), date(2020, 4, 1), date(2020, 4, 2), date(2019, 12, 31)]
+
+    snapped = adapt_events(events, periods)
+
+    # The last period extends up to its own date, events before the first one are out of range
+    assert snapped == [pd.Timestamp('2020-01-01'), pd.Timestamp('2020-03-01'), pd.Timestamp('2020-04-01')]
+
+
+def test_derived_frames_are_cached_per_series_and_window():
+    data = pd.DataFrame({'Date': pd.date_range('2020-01-01', periods=200).date, 'Precipitation': np.random.default_rng(0).random(200)})
+
+    frame, quantiles = derived_frame(data, 10)
+    frame['roll'] = 0
+
+    again, same = derived_frame(data.copy(), 10)
+    _, other = derived_frame(data, 20)
+
+    # Callers get a copy, the cached frame is the one of volcano_rain_frame
+    assert same is quantiles and other is not quantiles
+    pd.testing.assert_frame_equal(again, volcano_rain_frame(data, 10))
@@ -0,0 +1,82 @@
+import numpy as np
+from precip.objects.classes.utils.rolling_engine import RollingEngine
+from precip.objects.classes.utils.site_matrix import SiteMatrix
+from precip.objects.classes.utils.lag_correlation import lag_correlation
+
+DAYS = 500
+
+
+def matrix(seed=0):
+    values = np.random.default_rng(seed).gamma(0.5, 8, (3, DAYS)).astype('float32')
+    values[0, 100:110] = np.nan
+    time = np.datetime64('2020-01-01') + np.arange(DAYS)
+
+    return SiteMatrix(values, time, [100, 101, 102], ['a', 'b', 'c'], np.zeros(3), np.zeros(3))
+
+
+def direct(rain, onsets, lag):
+    """ Correlation of the rain with the onsets `lag` days later, over the whole period with missing days at the mean. """
+    x = np.where(np.isnan(rain), 0, rain - np.nanmean(rain))
+    y = onsets - onsets.mean()
+    cross = np.sum(x[:len(x) - lag] * y[lag:]) if lag >= 0 else np.sum(x[-lag:] * y[:len(y) + lag])
+
+    return cross / np.sqrt(np.sum(x ** 2) * np.sum(y ** 2))
+
+
+def test_correlation_matches_the_direct_sums():
+    sites = matrix()
+    catalog = {100: [np.datetime64('2020-03-01'), np.datetime64('2020-09-20')], 102: [np.datetime64('2020-06-10')]}
+
+    summary, lags, correlation, p_value = lag_correlation(sites, catalog, max_lag=30, window=5, surrogates=50, seed=1)
+
+    assert list(summary['Id']) == [100, 102]
+    rain = RollingEngine(sites.values.T).window(5).T
+
+    for row, site in enumerate([0, 2]):
+        onsets = np.zeros(DAYS)
+        onsets[sites.eruptions({sites.ids[site]: catalog[sites.ids[site]]})[1]] = 1
+        expected = [direct(rain[site], onsets, lag) for lag in lags]
+
+        np.testing.assert_allclose(correlation[row], expected, atol=1e-10)
+
+
+def test_p_values_match_shifted_onsets():
+    sites = matrix()
+    catalog = {100: [np.datetime64('2020-03-01'), np.datetime64('2020-09-20')], 101: [np.datetime64('2020-06-10')]}
+    surrogates = 40
+
+    summary, lags, correlation, p_value = lag_correlation(sites, catalog, max_lag=20, surrogates=surrogates, seed=7)
+
+    # Same shifts as the single batch of lag_correlation
+    shifts = np.random.default_rng(7).integers(1, DAYS, (surrogates, 2))
+
+    for row, site in enumerate([0, 1]):
+        columns = sites.eruptions({sites.ids[site]: catalog[sites.ids[site]]})[1]
+        exceed = np.zeros(len(lags))
+
+        for shift in shifts[:, row]:
+            onsets = np.zeros(DAYS)
+            onsets[(columns + shift) % DAYS] = 1
+            exceed += np.abs([direct(sites.values[site], onsets, lag) for lag in lags]) >= np.abs(correlation[row]) - 1e-12
+
+        np.testing.assert_allclose(p_value[row], (exceed + 1) / (surrogates + 1))
+
+
+def test_planted_lag_is_recovered():
+    sites = matrix()
+    eruptions = np.array([40, 95, 170, 190, 260, 340, 365, 430, 480])
+    sites.values[1, eruptions - 12] += 200
+
+    summary, *_ = lag_correlation(sites, {101: list(sites.time[eruptions])}, max_lag=30, surrogates=200, seed=0)
+
+    # Shifts within max_lag of zero move the peak to another lag, so only the p-value of the lag is small
+    assert summary['Peak lag'].iloc[0] == 12
+    assert summary['Peak correlation'].iloc[0] > 0.9 and summary['p-value'].iloc[0] < 0.01
+
+
+def test_catalog_without_eruptions_at_the_sites():
+    summary, lags, correlation, p_value = lag_correlation(matrix(), {999: [np.datetime64('2020-03-01')]}, max_lag=10, surrogates=20)
+
+    assert summary.empty and list(summary.columns)[:3] == ['Id', 'Volcano', 'Eruptions']
+    np.testing.assert_array_equal(lags, np.arange(-10, 11))
+    assert correlation.shape == p_value.shape == (0, 21)
@@ -0,0 +1,47 @@
+import os
+from datetime import date
+import numpy as np
+from conftest import granule_name
+import precip.download_functions as download_functions
+from precip.objects.classes.file_manager.http_downloader import HTTPDownloader
+from precip.objects.classes.file_manager.local_file_manager import LocalFileManager
+from precip.objects.classes.utils.verification_ledger import VerificationLedger
+from precip.config import VERIFICATION_LEDGER
+
+
+def test_check_files_skips_files_validated_by_the_downloader(tmp_path, monkeypatch, http_server, write_granule, capsys):
+    name = granule_name(date(2020, 1, 1))
+    write_granule(str(tmp_path / name), np.arange(3), np.arange(2))
+    http_server['/' + name] = (200, (tmp_path / name).read_bytes())
+
+    # Relative folder with a trailing slash, as typed on the command line
+    monkeypatch.chdir(tmp_path)
+    folder = 'gpm/'
+    os.makedirs(folder)
+
+    ledger = VerificationLedger(os.path.join(folder, VERIFICATION_LEDGER)).load()
+    result = HTTPDownloader(attempts=1, ledger=ledger).fetch(f'{http_server.url}/{name}', folder)
+    ledger.save()
+
+    assert result['status'] == 'downloaded'
+    assert os.listdir(os.path.join(folder, '.locks')) == []
+
+    capsys.readouterr()
+    LocalFileManager(folder).check_files()
+
+    assert '1 files already verified, 0 to check' in capsys.readouterr().out
+
+
+def test_check_files_skips_files_of_dload_site_list_parallel(tmp_path, monkeypatch, http_server, write_granule, capsys):
+    name = granule_name(date(2020, 1, 1))
+    write_granule(str(tmp_path / name), np.arange(3), np.arange(2))
+    http_server['/' + name] = (200, (tmp_path / name).read_bytes())
+    monkeypatch.setattr(download_functions, 'generate_urls_list', lambda date_list: [f'{http_server.url}/{name}'])
+    folder = str(tmp_path / 'gpm')
+
+    download_functions.dload_site_list_parallel(folder, [date(2020, 1, 1)])
+
+    capsys.readouterr()
+    LocalFileManager(folder).check_files()
+
+    assert '1 files already verified, 0 to check' in capsys.readouterr().out
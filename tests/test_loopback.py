@@ -0,0 +1,158 @@
+import os
+import types
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from conftest import granule_name
+from precip.objects.classes.providers.loopback import LoopbackCredentials, LoopbackProvider
+from precip.objects.classes.providers.session_manager import SessionManager
+from precip.objects.classes.providers.jetstream import JetStream
+from precip.objects.classes.file_manager.cloud_file_manager import CloudFileManager
+from precip.objects.classes.data_extractor.cloud_nc4_data import CloudNC4Data
+from precip.objects.classes.utils.granule_cache import GranuleCache
+from precip.objects.classes.utils.verification_ledger import VerificationLedger
+
+LON = np.round(np.arange(-0.45, 0.5, 0.1), 2)
+LAT = np.round(np.arange(-0.25, 0.3, 0.1), 2)
+
+
+@pytest.fixture
+def provider(tmp_path):
+    remote = tmp_path / 'remote'
+    provider = SessionManager.get_provider(LoopbackCredentials(str(remote)), LoopbackProvider)
+
+    yield provider
+
+    SessionManager.close_all()
+
+
+def test_session_manager_builds_the_loopback_provider(provider, tmp_path):
+    again = SessionManager.get_provider(LoopbackCredentials(str(tmp_path / 'remote')), LoopbackProvider)
+
+    assert isinstance(provider, LoopbackProvider)
+    assert again is provider
+    assert provider.path == str(tmp_path / 'remote')
+    assert provider.check_connected() and provider.sftp is not None
+
+
+class UnreachableProvider(LoopbackProvider):
+    def connect(self):
+        raise ConnectionError('Could not connect to localhost')
+
+
+def test_failed_connection_is_not_registered(tmp_path):
+    credential = LoopbackCredentials(str(tmp_path / 'remote'))
+
+    with pytest.raises(ConnectionError):
+        SessionManager.get_provider(credential, UnreachableProvider)
+
+    assert not any(isinstance(p, UnreachableProvider) for p in SessionManager._providers.values())
+
+    # Later calls are not handed the broken provider
+    with pytest.raises(ConnectionError):
+        SessionManager.get_provider(credential, UnreachableProvider)
+
+
+def test_jetstream_raises_the_connection_error_after_the_last_attempt(monkeypatch):
+    attempts = []
+
+    def refuse(self, **kwargs):
+        attempts.append(kwargs['hostname'])
+        raise ConnectionRefusedError(111, 'Connection refused')
+
+    monkeypatch.setattr('paramiko.SSHClient.connect', refuse)
+    credential = types.SimpleNamespace(path='/data', hostname='unreachable.example', user='precip', rsa_key='.ssh/id_rsa')
+
+    with pytest.raises(ConnectionError, match='after 3 attempts') as error:
+        SessionManager.get_provider(credential, JetStream)
+
+    assert len(attempts) == 3
+    assert isinstance(error.value.__cause__, ConnectionRefusedError)
+    assert not any(isinstance(p, JetStream) for p in SessionManager._providers.values())
+
+
+def test_cloud_file_manager_lists_and_skips_present_files(provider, write_granule):
+    days = [date(2020, 1, 1), date(2020, 1, 2)]
+
+    for day in days:
+        write_granule(os.path.join(provider.path, granule_name(day)), LON, LAT)
+
+    manager = CloudFileManager(provider)
+
+    assert manager.list_remote_files() == {granule_name(day) for day in days}
+    assert len(manager.download(days)['skipped']) == 2
+
+
+def test_large_listing_does_not_block(provider):
+    # ~150 KB of output, more than a pipe or channel window holds
+    names = {granule_name(date(2000, 1, 1) + timedelta(days=i)) for i in range(3000)}
+
+    for name in names:
+        open(os.path.join(provider.path, name), 'wb').close()
+
+    assert CloudFileManager(provider).list_remote_files() == names
+
+
+def test_exit_status_before_reading_a_large_output(provider):
+    # paramiko buffers the output, waiting first must not block on a full pipe
+    stdin, stdout, stderr = provider.ssh.exec_command('head -c 1000000 /dev/zero; echo done >&2')
+
+    assert stdout.channel.recv_exit_status() == 0
+    assert len(stdout.read()) == 1000000
+    assert stderr.readline() == 'done\n'
+    assert stderr.read() == b''
+
+
+def test_verify_local_removes_corrupted_files_without_filling_the_cache(provider, write_granule, tmp_path):
+    good = os.path.join(provider.path, granule_name(date(2020, 1, 1)))
+    bad = os.path.join(provider.path, granule_name(date(2020, 1, 2)))
+    write_granule(good, LON, LAT)
+
+    with open(bad, 'wb') as f:
+        f.write(b'not a netCDF file')
+
+    cache = GranuleCache(str(tmp_path / 'cache'))
+    corrupted = CloudFileManager(provider, cache).verify_local()
+
+    assert [os.path.basename(f) for f in corrupted] == [os.path.basename(bad)]
+    assert os.path.exists(good) and not os.path.exists(bad)
+    assert cache.index == {}
+
+
+def test_verify_remote_records_the_checked_files(provider, write_granule):
+    write_granule(os.path.join(provider.path, granule_name(date(2020, 1, 1))), LON, LAT)
+
+    manager = CloudFileManager(provider)
+
+    assert manager.verify_remote(parallel=1) == []
+    assert os.path.exists(os.path.join(provider.path, 'verification_ledger.json'))
+
+
+def test_cloud_nc4_data_reads_the_subset_through_the_cache(provider, write_granule, tmp_path):
+    day = date(2020, 1, 1)
+    values = write_granule(os.path.join(provider.path, granule_name(day)), LON, LAT)
+
+    cache = GranuleCache(str(tmp_path / 'cache'))
+    data = CloudNC4Data(provider, cache)
+    data.list_files(provider.path)
+
+    assert len(data.files) == 1
+
+    result = data.process_file(data.files[0], [day], LON, LAT, [LON[1], LON[3]], [LAT[0], LAT[2]])
+
+    assert result[0] == str(day)
+    np.testing.assert_array_equal(result[1], values[:, 1:4, 0:3])
+    assert granule_name(day) in cache.index
+
+
+def test_verify_remote_deep_mode_is_run_on_the_server(provider, write_granule):
+    path = os.path.join(provider.path, granule_name(date(2020, 1, 1)))
+    write_granule(path, LON, LAT)
+
+    manager = CloudFileManager(provider)
+
+    # Every CPU of the server by default
+    assert manager.verify_remote(mode='deep') == []
+
+    ledger = VerificationLedger(os.path.join(provider.path, 'verification_ledger.json')).load()
+    assert ledger.entries[path]['mode'] == 'deep'
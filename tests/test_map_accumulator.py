@@ -0,0 +1,69 @@
+import os
+import json
+import types
+from datetime import date, timedelta
+import numpy as np
+import pytest
+from conftest import granule_name
+from precip.data_extraction_functions import get_precipitation_map, reextract_dates
+from precip.objects.classes.utils.map_accumulator import MapAccumulator
+
+LATITUDE = [0.05, 0.15]
+LONGITUDE = [0.05, 0.25]
+YEAR = [date(2019, 1, 1) + timedelta(days=i) for i in range(365)]
+
+
+def test_empty_period_gives_a_nan_map():
+    accumulator = MapAccumulator((2, 3))
+
+    assert np.isnan(accumulator.result('sum')).all()
+    assert np.isnan(accumulator.result('mean')).all()
+    assert accumulator.result().shape == (2, 3)
+
+
+def test_empty_accumulator_without_shape_raises():
+    with pytest.raises(ValueError, match='no data'):
+        MapAccumulator().result()
+
+
+def test_accumulators_merge_like_a_single_pass():
+    grids = np.random.default_rng(0).random((10, 2, 3))
+    grids[3, 0, 0] = np.nan
+    first, second = MapAccumulator(), MapAccumulator((2, 3))
+
+    for grid in grids[:4]:
+        first.add(grid)
+
+    for grid in grids[4:]:
+        second.add(grid)
+
+    first.merge(second)
+
+    np.testing.assert_allclose(first.result('sum'), np.nansum(grids, axis=0))
+    np.testing.assert_allclose(first.result('max'), np.nanmax(grids, axis=0))
+    np.testing.assert_array_equal(first.result('count'), (~np.isnan(grids)).sum(axis=0))
+
+
+def test_reextraction_invalidates_the_persisted_years(database, tmp_path, write_granule):
+    # One Late value of 1 mm per day and cell, stored as (1, lon, lat)
+    database.insert_many(LATITUDE, LONGITUDE, [(day, json.dumps(np.ones((1, 3, 2)).tolist()), 6) for day in YEAR])
+    inps = types.SimpleNamespace(latitude=LATITUDE, longitude=LONGITUDE, date_list=YEAR, gpm_dir=str(tmp_path), use_ssh=False)
+
+    np.testing.assert_array_equal(get_precipitation_map(inps, persist=True).result('sum'), np.full((2, 3), 365))
+    assert os.path.exists(tmp_path / 'map_accumulators' / '0.05_0.15_0.05_0.25' / '2019.npz')
+
+    # The Final run of one day replaces its Late value
+    write_granule(str(tmp_path / granule_name(date(2019, 3, 1))), [0.05, 0.15, 0.25], LATITUDE, np.full((1, 3, 2), 11, dtype='float32'))
+    reextract_dates(str(tmp_path), [date(2019, 3, 1)])
+
+    np.testing.assert_array_equal(get_precipitation_map(inps, persist=True).result('sum'), np.full((2, 3), 375))
+
+
+def test_period_without_data_gives_a_nan_map(database, tmp_path, monkeypatch):
+    import precip.data_extraction_functions as extraction
+
+    # Nothing in the database and nothing to extract
+    monkeypatch.setattr(extraction, 'fill_missing_dates', lambda *args, **kwargs: None)
+    inps = types.SimpleNamespace(latitude=LATITUDE, longitude=LONGITUDE, date_list=YEAR[:10], gpm_dir=str(tmp_path), use_ssh=False)
+
+    assert np.isnan(get_precipitation_map(inps).result('mean')).all()
@@ -0,0 +1,92 @@
+import json
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from precip.objects.classes.utils.precip_cube import PrecipCube
+
+LATITUDE = [0.05, 0.15]
+LONGITUDE = [0.05, 0.25]
+
+
+def stored(values):
+    """ Database layout of a (lat, lon) grid: (1, lon, lat). """
+    return values.T[np.newaxis]
+
+
+def test_rows_are_transposed_to_time_lat_lon():
+    grid = np.arange(6, dtype='float32').reshape(2, 3)
+    rows = [(date(2020, 1, 2), stored(grid + 10), 7), (date(2020, 1, 1), np.ma.masked_invalid(stored(np.where(grid == 4, np.nan, grid))), 6)]
+
+    cube = PrecipCube.from_rows(rows, LATITUDE, LONGITUDE)
+
+    assert cube.shape == (2, 2, 3)
+    np.testing.assert_array_equal(cube.time, np.array(['2020-01-01', '2020-01-02'], dtype='datetime64[D]'))
+    np.testing.assert_array_equal(cube.latitude, [0.05, 0.15])
+    np.testing.assert_array_equal(cube.longitude, [0.05, 0.15, 0.25])
+    np.testing.assert_array_equal(cube.values[1], grid + 10)
+    assert np.isnan(cube.values[0, 1, 1]) and cube.values[0, 1, 2] == 5
+    np.testing.assert_array_equal(cube.version, [6, 7])
+
+
+def test_database_round_trip():
+    rng = np.random.default_rng(0)
+    cube = PrecipCube(rng.random((5, 2, 3)), np.datetime64('2020-01-01') + np.arange(5), [0.05, 0.15], [0.05, 0.15, 0.25], [7] * 5)
+    rows = cube.to_rows()
+
+    assert np.shape(json.loads(rows[0][1])) == (1, 3, 2)
+
+    # Records come back in any order
+    rows = rows[::-1]
+    again = PrecipCube.from_records([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows], LATITUDE, LONGITUDE)
+
+    np.testing.assert_array_equal(again.values, cube.values)
+    np.testing.assert_array_equal(again.time, cube.time)
+
+
+def test_shape_must_match_the_coordinates():
+    with pytest.raises(ValueError):
+        PrecipCube(np.zeros((2, 2, 2)), ['2020-01-01', '2020-01-02'], [0.05, 0.15], [0.05, 0.15, 0.25])
+
+
+@pytest.mark.parametrize('period, rule', [('W', 'W'), ('M', 'ME'), ('Y', 'YE')])
+@pytest.mark.parametrize('how', ['mean', 'sum'])
+def test_resample_matches_pandas(period, rule, how):
+    time = pd.date_range('2019-11-03', '2021-02-10').values
+    values = np.random.default_rng(1).random((len(time), 1, 1)).astype('float32')
+    values[100:110] = np.nan
+    series = pd.Series(values[:, 0, 0].astype(float), index=time).resample(rule)
+    expected = series.mean() if how == 'mean' else series.sum(min_count=1)
+
+    cube = PrecipCube(values, time, [0.05], [0.05]).resample(period, how)
+
+    np.testing.assert_array_equal(cube.time, expected.index.values.astype('datetime64[D]'))
+    np.testing.assert_allclose(cube.values[:, 0, 0], expected.to_numpy(), rtol=1e-5)
+
+
+def test_reductions_ignore_missing_values():
+    values = np.array([[[1, np.nan], [3, 4]], [[np.nan, np.nan], [np.nan, np.nan]]], dtype='float32')
+    cube = PrecipCube(values, ['2020-01-01', '2020-01-02'], [0.05, 0.15], [0.05, 0.15])
+
+    np.testing.assert_allclose(cube.spatial_reduce('mean'), [8 / 3, np.nan])
+    np.testing.assert_allclose(cube.reduce_time('sum'), [[1, 0], [3, 4]])
+    np.testing.assert_allclose(cube.cumulate().values[:, 0, 0], [1, 1])
+    assert np.isnan(PrecipCube.empty(LATITUDE, LONGITUDE).reduce_time('mean')).all()
+
+
+def test_plotted_series_is_the_area_average():
+    # Single cell queries, as for a volcano, keep the stored value; larger boxes are averaged
+    # instead of using their first cell as the masked array series did
+    grid = np.array([[1, 2, np.nan], [3, 4, 5]], dtype='float32')
+    cube = PrecipCube(np.stack([grid, grid * 2]), np.array(['2020-01-01', '2020-01-02'], dtype='datetime64[D]'), LATITUDE, [0.05, 0.15, 0.25])
+    single = PrecipCube(cube.values[:, :1, :1], cube.time, [0.05], [0.05])
+
+    np.testing.assert_allclose(cube.to_frame()['Precipitation'], [3, 6])
+    np.testing.assert_allclose(single.to_frame()['Precipitation'], [1, 2])
+    assert list(cube.to_frame()['Date']) == list(pd.to_datetime(cube.time))
+
+
+def test_rows_are_written_at_float32_precision():
+    cube = PrecipCube([[[0.1, np.nan]]], ['2020-01-01'], [0.05], [0.05, 0.15], [7])
+
+    assert cube.to_rows()[0][1] == '[[[0.1], [NaN]]]'
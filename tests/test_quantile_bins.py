@@ -0,0 +1,60 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+import pytest
+from precip.helper_functions import map_eruption_colors, volcano_rain_frame
+from precip.objects.classes.utils.quantile_bins import QuantileBins, SCOPES
+
+
+def frame(seed=0):
+    dates = pd.date_range('2000-06-01', '2006-05-31')
+
+    # Rounded so there are many ties
+    return pd.DataFrame({'Date': dates, 'Precipitation': np.round(np.random.default_rng(seed).random(len(dates)) * 20)})
+
+
+def rank_bins(values, groups, count):
+    """ Bins of the former rank(method='first') formula, within each group. """
+    values = pd.Series(values)
+    rank = values.groupby(groups).rank(method='first')
+    size = values.groupby(groups).transform('size')
+
+    return (rank * count / size).astype(int).clip(upper=count - 1).to_numpy()
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 4, 7, 10])
+def test_bins_match_ranks_within_each_scope(count):
+    data = frame()
+    dates = data['Date']
+    quantiles = QuantileBins(data['Precipitation'], dates)
+    groups = {'global': np.zeros(len(data)), 'year': dates.dt.year.to_numpy(), 'season': (dates.dt.month.to_numpy() % 12) // 3}
+
+    for scope in SCOPES:
+        bins = quantiles.bins(count, scope)
+
+        assert bins.dtype == np.uint8
+        np.testing.assert_array_equal(bins, rank_bins(data['Precipitation'], groups[scope], count))
+
+
+def test_invalid_arguments():
+    quantiles = QuantileBins([1, 2], ['2020-01-01', '2020-01-02'])
+
+    with pytest.raises(ValueError):
+        quantiles.bins(0)
+
+    with pytest.raises(ValueError):
+        quantiles.bins(2, 'month')
+
+
+def test_colors_match_the_former_ranking():
+    data = frame(1)
+    colors = ['red', 'green', 'blue']
+
+    mapped = map_eruption_colors(data, 30, [date(2003, 5, 5)], 3, colors)
+
+    # Former implementation: rank of the 'roll' column over the whole series
+    former = volcano_rain_frame(data, 30)
+    former_bins = ((former['roll'].rank(method='first') * 3) / len(former)).astype(int).clip(upper=2)
+
+    np.testing.assert_array_equal(mapped['color'], former_bins.map(lambda x: colors[x]))
+    assert mapped['Eruptions'].notna().sum() == 1
@@ -0,0 +1,42 @@
+import os
+from datetime import date
+import numpy as np
+from conftest import granule_name
+from precip.download_functions import generate_subset_url
+from precip.helper_functions import generate_coordinate_array
+from precip.objects.classes.file_manager.local_file_manager import LocalFileManager
+from precip.objects.classes.data_extractor.local_nc4_data import LocalNC4Data
+
+DAY = date(2020, 1, 1)
+LATITUDE = [0.05, 0.15]
+LONGITUDE = [0.05, 0.25]
+PATH = f'/GPM_3IMERGDF.07/2020/01/{granule_name(DAY)}.nc4'
+CONSTRAINT = 'precipitation[0:0][1800:1802][900:901],time[0:0],lon[1800:1802],lat[900:901]'
+
+
+def test_subset_url_constraint():
+    url = generate_subset_url(DAY, LATITUDE, LONGITUDE, 'http://server/opendap/')
+
+    assert url == f'http://server/opendap{PATH}?{CONSTRAINT}'
+
+
+def test_download_regions_reads_the_subset_on_its_own_grid(tmp_path, http_server, write_granule):
+    values = write_granule(str(tmp_path / 'subset.nc4'), [0.05, 0.15, 0.25], LATITUDE)
+    http_server[f'{PATH}?{CONSTRAINT}'] = (200, (tmp_path / 'subset.nc4').read_bytes())
+    data = str(tmp_path / 'gpm')
+
+    results = LocalFileManager(data).download_regions([DAY], [(LATITUDE, LONGITUDE)], opendap_url=http_server.url + '/')
+
+    folder = os.path.join(data, 'regions', '0.05_0.15_0.05_0.25')
+    path = os.path.join(folder, granule_name(DAY))
+
+    assert list(results) == [folder]
+    assert results[folder][0]['status'] == 'downloaded'
+    assert os.path.exists(path)
+
+    # Global grid given, the file's own lon/lat must be used to cut it
+    lon, lat = generate_coordinate_array()
+    extracted, subset, version = LocalNC4Data(folder).process_file(path, [DAY], lon, lat, [0.15, 0.25], [0.15, 0.15])
+
+    assert extracted == str(DAY) and version == 7
+    np.testing.assert_array_equal(subset, values[:, 1:3, 1:2])
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from precip.helper_functions import volcano_rain_frame
+from precip.objects.classes.utils.rolling_engine import RollingEngine, rolling_sum
+
+
+def series(length=400, seed=0):
+    values = np.random.default_rng(seed).gamma(0.5, 8, length)
+    values[[3, length // 3, length // 3 + 1, length - 1]] = np.nan
+
+    return values
+
+
+@pytest.mark.parametrize('centered', [False, True])
+@pytest.mark.parametrize('window', [1, 2, 7, 30, 31, 400])
+def test_windows_match_pandas(window, centered):
+    values = series()
+    expected = pd.Series(values).rolling(window, center=centered).sum().to_numpy()
+
+    np.testing.assert_allclose(RollingEngine(values).window(window, centered), expected, rtol=1e-10, atol=1e-9)
+
+
+def test_trailing_axes_roll_independently():
+    values = series(120).reshape(40, 3)
+    engine = RollingEngine(values)
+
+    for column in range(3):
+        expected = pd.Series(values[:, column]).rolling(5, center=True).sum().to_numpy()
+        np.testing.assert_allclose(engine.window(5, True)[:, column], expected, rtol=1e-10)
+
+    assert engine.sweep([5, 9], True)[5] is engine.window(5, True)
+
+
+def test_engines_are_shared_by_content():
+    values = series()
+
+    assert RollingEngine.get(values) is RollingEngine.get(values.copy())
+    assert rolling_sum(values, 30) is rolling_sum(values.copy(), 30)
+
+    with pytest.raises(ValueError):
+        rolling_sum(values, 30)[0] = 1
+
+
+def test_volcano_rain_frame_keeps_the_pandas_roll():
+    data = pd.DataFrame({'Date': pd.date_range('2020-01-01', periods=400).date, 'Precipitation': series()})
+    expected = data['Precipitation'].rolling(30).sum()
+
+    frame = volcano_rain_frame(data, 30)
+
+    np.testing.assert_allclose(frame['roll'].to_numpy(), expected.dropna().to_numpy(), rtol=1e-10)
+    np.testing.assert_array_equal(frame.index, expected.dropna().index)
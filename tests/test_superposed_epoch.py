@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from precip.objects.classes.utils.site_matrix import SiteMatrix
+from precip.objects.classes.utils.superposed_epoch import epoch_windows, bootstrap_means, superposed_epoch
+
+
+def matrix(sites=3, days=300, seed=0):
+    values = np.random.default_rng(seed).random((sites, days)).astype('float32')
+    values[1, 40:45] = np.nan
+    time = np.datetime64('2020-01-01') + np.arange(days)
+
+    return SiteMatrix(values, time, np.arange(sites) + 100, [f'v{i}' for i in range(sites)], np.zeros(sites), np.zeros(sites))
+
+
+def test_windows_match_slices_of_each_site():
+    values = matrix().values
+    rows, columns = np.array([0, 1, 2, 2]), np.array([5, 50, 150, 297])
+
+    windows = epoch_windows(values, rows, columns, 10, 4)
+
+    for window, row, column in zip(windows, rows, columns):
+        expected = [values[row, day] if 0 <= day < values.shape[1] else np.nan for day in range(column - 10, column + 5)]
+        np.testing.assert_array_equal(window, np.asarray(expected, dtype=float))
+
+
+def test_bootstrap_matches_resampling_the_windows():
+    windows = np.random.default_rng(1).random((12, 4))
+    windows[0, 1] = np.nan
+    samples = 200
+
+    mean, lower, upper, count = bootstrap_means(windows, samples, 0.9, seed=3)
+
+    # Same multinomial draws, applied by gathering the resampled windows
+    weights = np.random.default_rng(3).multinomial(12, np.full(12, 1 / 12), size=samples)
+    resampled = np.array([np.nanmean(np.repeat(windows, w, axis=0), axis=0) for w in weights])
+
+    np.testing.assert_allclose(mean, np.nanmean(windows, axis=0))
+    np.testing.assert_allclose(lower, np.nanquantile(resampled, 0.05, axis=0))
+    np.testing.assert_allclose(upper, np.nanquantile(resampled, 0.95, axis=0))
+    np.testing.assert_array_equal(count, [12, 11, 12, 12])
+
+
+def test_composite_of_the_catalog():
+    sites = matrix()
+    catalog = {100: [np.datetime64('2020-03-01')], 101: [np.datetime64('2020-02-15'), np.datetime64('2021-06-01')], 102: [np.datetime64('2020-06-01')], 999: [np.datetime64('2020-06-01')]}
+
+    composite, summary = superposed_epoch(sites, catalog, 20, 5, samples=100, seed=0)
+
+    # Only the eruptions inside the time axis of known sites count
+    rows, columns = sites.eruptions(catalog)
+    windows = np.array([sites.values[r, c - 20:c + 6] for r, c in zip(rows, columns)], dtype=float)
+
+    assert summary['eruptions'] == 3 and summary['volcanoes'] == 3 and summary['days'] == 20
+    np.testing.assert_array_equal(composite['Lag'], np.arange(-20, 6))
+    np.testing.assert_allclose(composite['Mean'], np.nanmean(windows, axis=0), rtol=1e-6)
+    assert summary['mean'] == pytest.approx(np.mean(np.nanmean(windows[:, :20], axis=1)))
+    assert (composite['Lower'] <= composite['Mean']).all() and (composite['Mean'] <= composite['Upper']).all()
+
+
+def test_empty_catalog():
+    composite, summary = superposed_epoch(matrix(), {}, 5, 2, samples=10)
+
+    assert composite['Mean'].isna().all() and (composite['Count'] == 0).all()
+    assert summary['eruptions'] == 0
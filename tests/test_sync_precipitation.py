@@ -0,0 +1,83 @@
+import json
+import math
+from datetime import date, datetime, timedelta
+import numpy as np
+import pytest
+from conftest import granule_name
+import precip.download_functions as download_functions
+from precip.cli.sync_precipitation import sync_precipitation
+from precip.data_extraction_functions import reextract_dates
+from precip.download_functions import latest_final_date, local_catalog
+
+LON = [0.05, 0.15, 0.25]
+LAT = [0.05, 0.15]
+DAYS = [date(2020, 1, 1) + timedelta(days=i) for i in range(10)]
+
+
+@pytest.fixture
+def gesdisc(http_server, monkeypatch):
+    """
+    GES DISC stand-in: the granule URLs point to the test server, which has no granule until published.
+    """
+    def generate_url_download(day, run=None):
+        return f'{http_server.url}/{run}/{granule_name(day, run or "final")}'
+
+    monkeypatch.setattr(download_functions, 'generate_url_download', generate_url_download)
+
+    def publish(day, body=b'', run='final'):
+        http_server[f'/{run}/{granule_name(day, run)}'] = (200, body)
+
+    http_server.publish = publish
+
+    return http_server
+
+
+@pytest.mark.parametrize('published', [0, 1, 5, len(DAYS)])
+def test_latest_final_date_finds_the_boundary(gesdisc, published):
+    for day in DAYS[:published]:
+        gesdisc.publish(day)
+
+    assert latest_final_date(DAYS) == (DAYS[published - 1] if published else None)
+    assert len(gesdisc.requests) <= math.ceil(math.log2(len(DAYS) + 1))
+
+
+def test_upgrade_removes_only_the_superseded_late_granules(gesdisc, database, tmp_path, write_granule):
+    folder = tmp_path / 'gpm'
+    folder.mkdir()
+    yesterday = datetime.today().date() - timedelta(days=1)
+    older = yesterday - timedelta(days=5)
+    late_days = [yesterday - timedelta(days=i) for i in (2, 1, 0)]
+
+    write_granule(str(folder / granule_name(older)), LON, LAT)
+
+    for day in late_days:
+        write_granule(str(folder / granule_name(day, 'late')), LON, LAT)
+
+    # The Final run is out for the first two Late days only
+    write_granule(str(tmp_path / 'final.nc4'), LON, LAT)
+
+    for day in late_days[:2]:
+        gesdisc.publish(day, (tmp_path / 'final.nc4').read_bytes())
+
+    upgraded = sync_precipitation(str(folder), older, parallel=2)
+    catalog = local_catalog(str(folder))
+
+    assert upgraded == late_days[:2]
+    assert sorted(catalog['final']) == [older] + late_days[:2]
+    assert sorted(catalog['late']) == late_days[2:]
+
+
+def test_reextract_dates_replaces_only_the_given_dates(database, tmp_path, write_granule):
+    latitude, longitude = [0.05, 0.15], [0.05, 0.25]
+    stored = json.dumps(np.ones((1, 3, 2)).tolist())
+    database.insert_many(latitude, longitude, [(day, stored, 6) for day in DAYS[:3]])
+
+    for day in DAYS[:3]:
+        write_granule(str(tmp_path / granule_name(day)), LON, LAT, np.full((1, 3, 2), 11, dtype='float32'))
+
+    reextract_dates(str(tmp_path), [DAYS[1]])
+
+    rows = database.select_data('SELECT Date, Precipitation FROM volcanoes ORDER BY Date')
+
+    assert [row[0] for row in rows] == [str(day) for day in DAYS[:3]]
+    assert [np.array(json.loads(row[1])).max() for row in rows] == [1, 11, 1]